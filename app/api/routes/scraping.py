@@ -1,16 +1,25 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, BackgroundTasks
 from fastapi.responses import StreamingResponse
 from app.schemas.scraping_schemas import (
-    ScrapingRequest, ScrapingResponse, ReviewData, RequirementsData,
+    ScrapingRequest, ScrapingResponse,
     SingleCommentRequest, SingleCommentResponse, RequirementData,
-    PDFGenerationRequest
+    PDFGenerationRequest, ScrapingJobCreatedResponse, ScrapingJobStatusResponse,
+    MulticlassModelEnum
 )
-from app.services.scraping_service import PlayStoreScraper
 from app.services.bert_classifier_service import get_bert_classifier
 from app.services.openrouter_service import get_requirements_generator
 from app.services.pdf_generator_service import get_pdf_generator
-from app.core.redis_client import get_redis_client
+from app.services.scrape_pipeline_service import ScrapePipeline, get_cached_scrape_response
+from app.services.job_service import get_job_manager
+from app.services.classification_cache import get_models_generation
+from app.core.redis_client import CACHE_NAMESPACES, get_redis_client
+from app.core.review_store import get_review_store
+from app.core.model_config import get_model_generation
+from app.core.executors import Stage, run_in_stage
+import asyncio
 import io
+import json
+from typing import Optional
 
 router = APIRouter()
 
@@ -29,139 +38,149 @@ async def scrape_playstore_reviews(payload: ScrapingRequest):
     7. Retorna comentarios clasificados y requisitos generados
     """
     try:
-        # Obtener cliente Redis
-        redis_client = get_redis_client()
-
-        # Generar cache key basado en los parámetros de la petición
-        cache_key_data = {
-            "app_id": payload.app_id,
-            "max_reviews": payload.max_reviews,
-            "max_rating": payload.max_rating,
-            "criterios_busqueda": payload.criterios_busqueda,
-            "multiclass_model": payload.multiclass_model
-        }
-        cache_key = redis_client.generate_cache_key("scrape", cache_key_data)
-
         # Intentar obtener del caché
-        cached_result = redis_client.get_cached(cache_key)
-        if cached_result:
-            print(f"\n{'='*60}")
-            print("⚡ RESULTADO OBTENIDO DESDE CACHÉ")
-            print(f"{'='*60}\n")
+        cached_response = await get_cached_scrape_response(payload)
+        if cached_response:
+            return cached_response
 
-            # Convertir datos cacheados a modelos Pydantic
-            reviews_data = [ReviewData(**r) for r in cached_result['reviews']]
-            requirements_data = None
-            if cached_result.get('requirements'):
-                requirements_data = RequirementsData(**cached_result['requirements'])
-
-            return ScrapingResponse(
-                success=True,
-                app_id=cached_result['app_id'],
-                total_reviews=cached_result['total_reviews'],
-                reviews=reviews_data,
-                stats=cached_result['stats'],
-                requirements=requirements_data,
-                from_cache=True
-            )
-        # Paso 1: Scraping de comentarios
-        print(f"\n{'='*60}")
-        print("🚀 INICIANDO PROCESO DE SCRAPING Y CLASIFICACIÓN")
-        print(f"{'='*60}")
-
-        scraper = PlayStoreScraper()
-        scraping_result = scraper.scrape_negative_reviews(
-            app_id=payload.app_id,
-            num_comentarios_negativos=payload.max_reviews,
-            filtro_estrellas=payload.max_rating,
-            criterio_busqueda=payload.criterios_busqueda,
-            lang='es',
-            country='pe'
-        )
+        # Ejecutar el pipeline completo (guarda el resultado en caché)
+        response_data = await ScrapePipeline(payload).run()
 
-        print(f"\n✅ Scraping completado: {scraping_result['total_found']} comentarios extraídos")
+        # Convertir de nuevo a modelos Pydantic para la respuesta
+        return ScrapingResponse(**response_data)
+    except Exception as e:
+        print(f"\n❌ ERROR: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Paso 2 y 3: Filtrado binario + Clasificación multiclase
-        print(f"\n{'='*60}")
-        print("🤖 INICIANDO CLASIFICACIÓN CON MODELOS BERT")
-        print(f"{'='*60}")
 
-        classifier = get_bert_classifier()
-        classified_reviews = classifier.filter_and_classify(
-            reviews=scraping_result['reviews'],
-            batch_size=32,
-            multiclass_model=payload.multiclass_model
-        )
+def _format_sse(evento: str, data: dict) -> str:
+    """Serializa un evento en formato Server-Sent Events."""
+    return f"event: {evento}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-        print(f"\n{'='*60}")
-        print("✅ CLASIFICACIÓN COMPLETADA")
-        print(f"{'='*60}")
-        print(f"Total scrapeado: {scraping_result['total_found']}")
-        print(f"Total relevante: {len(classified_reviews)}")
-        print(f"Tasa de relevancia: {len(classified_reviews)/scraping_result['total_found']*100:.1f}%")
-        print(f"{'='*60}\n")
 
-        # Paso 4: Generación de requisitos No Funcionales
-        requirements_data = None
+@router.post("/scrape/stream")
+async def stream_playstore_reviews(payload: ScrapingRequest):
+    """
+    Variante en streaming de /scrape usando Server-Sent Events.
+
+    Emite los resultados a medida que cada etapa avanza en lugar de esperar
+    al ScrapingResponse completo:
+    - pagina: comentarios negativos de cada página descargada de Play Store
+    - scraping_completado: total extraído y estadísticas del scraping
+    - lote_binario: progreso del filtro binario
+    - lote_clasificado: comentarios relevantes clasificados de cada lote
+    - requisito: cada requisito validado en cuanto el LLM termina de escribirlo
+    - requisitos: requisitos No Funcionales generados (ids y resumen finales)
+    - completado: estadísticas finales (sin repetir la lista de comentarios)
+    - error: mensaje de error si el pipeline falla
+
+    Si el resultado está en caché se emiten directamente los eventos
+    lote_clasificado, requisitos y completado.
+    """
+    async def event_stream():
+        cached_response = await get_cached_scrape_response(payload)
+        if cached_response:
+            cached = cached_response.dict()
+            yield _format_sse("lote_clasificado", {
+                "procesados": cached['total_reviews'],
+                "total": cached['total_reviews'],
+                "reviews": cached['reviews']
+            })
+            yield _format_sse("requisitos", {"requirements": cached['requirements']})
+            yield _format_sse("completado", {
+                "app_id": cached['app_id'],
+                "total_reviews": cached['total_reviews'],
+                "stats": cached['stats'],
+                "from_cache": True
+            })
+            return
+
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def on_event(evento: str, data: dict):
+            await queue.put((evento, data))
+
+        async def run_pipeline():
+            try:
+                result = await ScrapePipeline(payload, on_event=on_event).run()
+                await queue.put(("completado", {
+                    "app_id": result['app_id'],
+                    "total_reviews": result['total_reviews'],
+                    "stats": result['stats'],
+                    "from_cache": False
+                }))
+            except Exception as e:
+                print(f"\n❌ ERROR: {str(e)}")
+                await queue.put(("error", {"detail": str(e)}))
+            finally:
+                await queue.put(None)
+
+        task = asyncio.create_task(run_pipeline())
         try:
-            generator = get_requirements_generator()
-            requirements_result = generator.generate_requirements(classified_reviews)
-
-            # Convertir a RequirementsData si la generación fue exitosa
-            if requirements_result and 'requisitos' in requirements_result:
-                requirements_data = RequirementsData(**requirements_result)
-
-                print(f"\n{'='*60}")
-                print("✅ REQUISITOS GENERADOS EXITOSAMENTE")
-                print(f"{'='*60}")
-                print(f"Total de requisitos: {requirements_data.resumen.total_requisitos}")
-                print(f"Por categoría: {requirements_data.resumen.por_categoria}")
-                print(f"{'='*60}\n")
-        except Exception as e:
-            print(f"\n⚠️  Error al generar requisitos: {str(e)}")
-            print("Continuando sin requisitos...\n")
-
-        # Convertir a ReviewData
-        reviews_data = [ReviewData(**r) for r in classified_reviews]
-
-        # Actualizar estadísticas
-        stats = scraping_result['stats'].copy()
-        stats['comentarios_antes_filtro'] = scraping_result['total_found']
-        stats['comentarios_relevantes'] = len(classified_reviews)
-        stats['tasa_relevancia'] = round(len(classified_reviews) / scraping_result['total_found'], 4) if scraping_result['total_found'] > 0 else 0
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                evento, data = item
+                if evento == "clasificacion_completada":
+                    continue
+                yield _format_sse(evento, data)
+        finally:
+            # Si el cliente se desconecta, detener el pipeline
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
 
-        # Agregar distribución de categorías
-        category_distribution = {}
-        for review in classified_reviews:
-            cat = review['categoria']
-            category_distribution[cat] = category_distribution.get(cat, 0) + 1
-        stats['distribucion_categorias'] = category_distribution
 
-        print(f"\n{'='*60}")
-        print("✅ PROCESO COMPLETO FINALIZADO")
-        print(f"{'='*60}\n")
+@router.post("/jobs", response_model=ScrapingJobCreatedResponse, status_code=202)
+async def create_scraping_job(payload: ScrapingRequest, background_tasks: BackgroundTasks):
+    """
+    Endpoint para lanzar el pipeline de /scrape como trabajo asíncrono.
 
-        # Preparar respuesta
-        response_data = {
-            "success": True,
-            "app_id": payload.app_id,
-            "total_reviews": len(classified_reviews),
-            "reviews": [r.dict() if hasattr(r, 'dict') else r for r in reviews_data],
-            "stats": stats,
-            "requirements": requirements_data.dict() if requirements_data else None,
-            "from_cache": False
-        }
+    Retorna inmediatamente un job_id; el progreso y el resultado final se
+    consultan con GET /jobs/{job_id}. El estado se guarda en Redis, por lo que
+    cualquier réplica de la API puede responder a la consulta.
+    """
+    try:
+        job_manager = get_job_manager()
+        job = await job_manager.create_job(payload)
+        background_tasks.add_task(job_manager.run_job, job, payload)
 
-        # Guardar en caché (TTL: 1 hora = 3600 segundos)
-        redis_client.set_cached(cache_key, response_data, ttl=3600)
+        print(f"📥 Trabajo de scraping creado: {job['job_id']} ({payload.app_id})")
 
-        # Convertir de nuevo a modelos Pydantic para la respuesta
-        return ScrapingResponse(**response_data)
+        return ScrapingJobCreatedResponse(
+            job_id=job['job_id'],
+            status=job['status'],
+            status_url=f"/api/scraping/jobs/{job['job_id']}"
+        )
     except Exception as e:
-        print(f"\n❌ ERROR: {str(e)}")
+        print(f"\n❌ ERROR al crear trabajo: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/jobs/{job_id}", response_model=ScrapingJobStatusResponse)
+async def get_scraping_job(job_id: str):
+    """
+    Endpoint para consultar el estado y progreso de un trabajo de scraping.
+
+    Returns:
+        Estado, etapa en curso, progreso por etapa y, si terminó, el
+        ScrapingResponse final
+    """
+    job = await get_job_manager().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo '{job_id}' no encontrado")
+    return ScrapingJobStatusResponse(**job)
+
+
 @router.post("/classify-single", response_model=SingleCommentResponse)
 async def classify_single_comment(payload: SingleCommentRequest):
     """
@@ -185,12 +204,15 @@ async def classify_single_comment(payload: SingleCommentRequest):
         cache_key_data = {
             "comentario": payload.comentario,
             "calificacion": payload.calificacion,
-            "multiclass_model": payload.multiclass_model
+            "multiclass_model": payload.multiclass_model,
+            "modelos": get_models_generation(payload.multiclass_model)
         }
-        cache_key = redis_client.generate_cache_key("classify", cache_key_data)
+        cache_key = redis_client.generate_cache_key(
+            await redis_client.versioned_prefix("classify"), cache_key_data
+        )
 
         # Intentar obtener del caché
-        cached_result = redis_client.get_cached(cache_key)
+        cached_result = await redis_client.get_cached(cache_key)
         if cached_result:
             print(f"\n{'='*60}")
             print("⚡ RESULTADO OBTENIDO DESDE CACHÉ")
@@ -226,8 +248,8 @@ async def classify_single_comment(payload: SingleCommentRequest):
         print("🤖 APLICANDO FILTRO BINARIO (Relevancia)")
         print(f"{'='*60}")
 
-        is_relevant_list = classifier.classify_binary([payload.comentario])
-        is_relevant = is_relevant_list[0]
+        # Las peticiones concurrentes se agrupan en un solo lote (micro-batching)
+        is_relevant = await classifier.classify_binary_single(payload.comentario)
 
         print(f"Resultado: {'✅ RELEVANTE' if is_relevant else '❌ NO RELEVANTE'}")
 
@@ -247,7 +269,7 @@ async def classify_single_comment(payload: SingleCommentRequest):
             }
 
             # Guardar en caché (TTL: 2 horas = 7200 segundos para comentarios no relevantes)
-            redis_client.set_cached(cache_key, response_not_relevant, ttl=7200)
+            await redis_client.set_cached(cache_key, response_not_relevant, ttl=7200)
 
             return SingleCommentResponse(**response_not_relevant)
 
@@ -256,11 +278,10 @@ async def classify_single_comment(payload: SingleCommentRequest):
         print("🤖 APLICANDO CLASIFICACIÓN MULTICLASE (ISO 25010)")
         print(f"{'='*60}")
 
-        classification_result = classifier.classify_multiclass(
-            [payload.comentario],
+        categoria, confianza = await classifier.classify_multiclass_single(
+            payload.comentario,
             model_name=payload.multiclass_model
         )
-        categoria, confianza = classification_result[0]
 
         print(f"Categoría: {categoria}")
         print(f"Confianza: {confianza:.4f}")
@@ -271,7 +292,9 @@ async def classify_single_comment(payload: SingleCommentRequest):
 
         try:
             generator = get_requirements_generator()
-            requisito_result = generator.generate_single_requirement(
+            requisito_result = await run_in_stage(
+                Stage.LLM,
+                generator.generate_single_requirement,
                 comentario=payload.comentario,
                 categoria=categoria,
                 confianza=confianza,
@@ -309,7 +332,7 @@ async def classify_single_comment(payload: SingleCommentRequest):
         }
 
         # Guardar en caché (TTL: 1 hora = 3600 segundos para comentarios relevantes)
-        redis_client.set_cached(cache_key, response_relevant, ttl=3600)
+        await redis_client.set_cached(cache_key, response_relevant, ttl=3600)
 
         # Retornar respuesta completa
         return SingleCommentResponse(
@@ -393,6 +416,55 @@ async def generate_requirements_pdf(payload: PDFGenerationRequest):
         raise HTTPException(status_code=500, detail=f"Error al generar PDF: {str(e)}")
 
 
+@router.get("/reviews/{app_id}")
+async def get_stored_reviews(
+    app_id: str,
+    max_rating: Optional[int] = None,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    multiclass_model: Optional[MulticlassModelEnum] = None,
+    limit: int = 1000
+):
+    """
+    Endpoint para consultar los comentarios guardados en el repositorio local,
+    sin volver a hacer scraping.
+
+    Args:
+        app_id: ID de la aplicación (ej: com.bcp.bank.bcp)
+        max_rating: Calificación máxima (≤ este valor)
+        desde: Fecha mínima (YYYY-MM-DD)
+        hasta: Fecha máxima (YYYY-MM-DD)
+        multiclass_model: Si se indica, incluye la categoría asignada por este modelo
+        limit: Número máximo de comentarios (del más nuevo al más antiguo)
+
+    Returns:
+        Dict con los comentarios guardados
+    """
+    try:
+        store = get_review_store()
+        modelo = multiclass_model.value if multiclass_model else None
+        reviews = await run_in_stage(
+            Stage.SCRAPING,
+            store.get_reviews,
+            app_id,
+            max_rating=max_rating,
+            desde=desde,
+            hasta=hasta,
+            modelo=modelo,
+            generacion=get_model_generation(modelo) if modelo else None,
+            limit=limit
+        )
+
+        return {
+            "success": True,
+            "app_id": app_id,
+            "total_reviews": len(reviews),
+            "reviews": reviews
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al consultar comentarios: {str(e)}")
+
+
 @router.get("/cache/stats")
 async def get_cache_stats():
     """
@@ -403,7 +475,7 @@ async def get_cache_stats():
     """
     try:
         redis_client = get_redis_client()
-        stats = redis_client.get_stats()
+        stats = await redis_client.get_stats()
 
         return {
             "success": True,
@@ -414,12 +486,21 @@ async def get_cache_stats():
 
 
 @router.delete("/cache/clear")
-async def clear_cache(pattern: str = "*"):
+async def clear_cache(pattern: Optional[str] = None):
     """
     Endpoint para limpiar el caché de Redis.
 
+    Las keys se recorren con SCAN y se eliminan por lotes con UNLINK para no
+    bloquear Redis. Para invalidar un namespace completo es preferible
+    /cache/invalidate, que no recorre el keyspace.
+
+    Sin patrón solo se eliminan los namespaces de caché (scrape, classify y
+    clf). Las generaciones (cache_gen:*), los jobs (job:*), el historial de
+    scraping (reviews:*) y el limitador (ratelimit:*) no son caché: borrarlos
+    requiere indicar un patrón explícito.
+
     Args:
-        pattern: Patrón de keys a eliminar (default: "*" para todo)
+        pattern: Patrón de keys a eliminar (default: los namespaces de caché)
                  Ejemplos: "scrape:*", "classify:*"
 
     Returns:
@@ -434,13 +515,52 @@ async def clear_cache(pattern: str = "*"):
                 "message": "Redis no está disponible"
             }
 
-        deleted_count = redis_client.clear_pattern(pattern)
+        patterns = [pattern] if pattern else [f"{namespace}:*" for namespace in CACHE_NAMESPACES]
+        deleted_count = 0
+        for key_pattern in patterns:
+            deleted_count += await redis_client.clear_pattern(key_pattern)
 
         return {
             "success": True,
             "message": f"Se eliminaron {deleted_count} keys del caché",
             "deleted_count": deleted_count,
-            "pattern": pattern
+            "pattern": pattern,
+            "patterns": patterns
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al limpiar caché: {str(e)}")
+
+
+@router.post("/cache/invalidate")
+async def invalidate_cache(namespace: str):
+    """
+    Endpoint para invalidar un namespace del caché en O(1).
+
+    Incrementa la generación del namespace: las keys anteriores dejan de
+    leerse y expiran con su TTL.
+
+    Args:
+        namespace: Namespace a invalidar
+                   Ejemplos: "scrape", "classify", "clf:binary", "clf:beto"
+
+    Returns:
+        Dict con la nueva generación del namespace
+    """
+    try:
+        redis_client = get_redis_client()
+
+        generation = await redis_client.bump_generation(namespace)
+        if generation is None:
+            return {
+                "success": False,
+                "message": "Redis no está disponible"
+            }
+
+        return {
+            "success": True,
+            "message": f"Namespace '{namespace}' invalidado",
+            "namespace": namespace,
+            "generation": generation
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al invalidar caché: {str(e)}")
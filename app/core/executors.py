@@ -0,0 +1,161 @@
+"""
+Pools de ejecución acotados para las etapas bloqueantes del pipeline.
+
+Cada etapa (scraping, clasificación, LLM) tiene su propio ThreadPoolExecutor
+con un tamaño configurable mediante variables de entorno. Así el trabajo
+bloqueante no corre en el event loop de uvicorn y un trabajo largo no puede
+ocupar todos los hilos del proceso.
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class Stage(str, Enum):
+    """Etapas del pipeline con pool de ejecución propio"""
+    SCRAPING = "scraping"
+    CLASSIFICATION = "classification"
+    LLM = "llm"
+
+
+# Tamaño por defecto de cada pool (número de hilos)
+DEFAULT_POOL_SIZES = {
+    Stage.SCRAPING: 2,
+    Stage.CLASSIFICATION: 4,
+    Stage.LLM: 2,
+}
+
+# Variables de entorno para sobrescribir el tamaño de cada pool
+POOL_SIZE_ENV_VARS = {
+    Stage.SCRAPING: "SCRAPING_WORKERS",
+    Stage.CLASSIFICATION: "CLASSIFICATION_WORKERS",
+    Stage.LLM: "LLM_WORKERS",
+}
+
+
+class StageExecutors:
+    """
+    Gestor de los pools de hilos por etapa.
+
+    Los pools se crean de forma perezosa la primera vez que se usan y se
+    cierran al apagar la aplicación.
+    """
+
+    def __init__(self, pool_sizes: Optional[Dict[Stage, int]] = None):
+        self._pool_sizes = dict(DEFAULT_POOL_SIZES)
+        for stage, env_var in POOL_SIZE_ENV_VARS.items():
+            value = os.getenv(env_var)
+            if value:
+                self._pool_sizes[stage] = max(1, int(value))
+        if pool_sizes:
+            self._pool_sizes.update(pool_sizes)
+
+        self._executors: Dict[Stage, ThreadPoolExecutor] = {}
+        self._in_flight: Dict[Stage, int] = {stage: 0 for stage in Stage}
+        self._lock = threading.Lock()
+
+    def get_pool_size(self, stage: Stage) -> int:
+        """Obtiene el número de hilos configurado para una etapa"""
+        return self._pool_sizes[Stage(stage)]
+
+    def get_executor(self, stage: Stage) -> ThreadPoolExecutor:
+        """
+        Obtiene (o crea) el pool de hilos de una etapa.
+
+        Args:
+            stage: Etapa del pipeline
+
+        Returns:
+            ThreadPoolExecutor de la etapa
+        """
+        stage = Stage(stage)
+        with self._lock:
+            executor = self._executors.get(stage)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=self._pool_sizes[stage],
+                    thread_name_prefix=f"{stage.value}-worker"
+                )
+                self._executors[stage] = executor
+            return executor
+
+    async def run(self, stage: Stage, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Ejecuta una función bloqueante en el pool de la etapa indicada.
+
+        Args:
+            stage: Etapa del pipeline
+            func: Función bloqueante a ejecutar
+            *args, **kwargs: Argumentos de la función
+
+        Returns:
+            Resultado de la función
+        """
+        stage = Stage(stage)
+        executor = self.get_executor(stage)
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            self._in_flight[stage] += 1
+        try:
+            return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+        finally:
+            with self._lock:
+                self._in_flight[stage] -= 1
+
+    def get_stats(self) -> dict:
+        """
+        Obtiene el tamaño y la ocupación de cada pool.
+
+        Returns:
+            Diccionario con estadísticas por etapa
+        """
+        with self._lock:
+            return {
+                stage.value: {
+                    "pool_size": self._pool_sizes[stage],
+                    "en_curso": self._in_flight[stage],
+                }
+                for stage in Stage
+            }
+
+    def shutdown(self, wait: bool = False):
+        """Cierra todos los pools de hilos."""
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# Singleton para compartir los pools en todo el proceso
+_stage_executors = None
+
+def get_stage_executors() -> StageExecutors:
+    """Obtiene la instancia singleton del gestor de pools."""
+    global _stage_executors
+    if _stage_executors is None:
+        _stage_executors = StageExecutors()
+    return _stage_executors
+
+
+async def run_in_stage(stage: Stage, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Atajo para ejecutar una función bloqueante en el pool de una etapa.
+
+    Args:
+        stage: Etapa del pipeline (scraping, classification, llm)
+        func: Función bloqueante a ejecutar
+        *args, **kwargs: Argumentos de la función
+
+    Returns:
+        Resultado de la función
+    """
+    return await get_stage_executors().run(stage, func, *args, **kwargs)
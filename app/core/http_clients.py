@@ -0,0 +1,35 @@
+"""
+Utilidades compartidas por los clientes asíncronos con pool de conexiones.
+
+Los clientes de Play Store, de Hugging Face y de Redis se crean por event
+loop: sus conexiones solo pueden usarse (y cerrarse) desde el loop que las
+abrió. En la API hay un único loop y los clientes se cierran en el evento
+"shutdown"; el loop cambia en scripts y pruebas que llaman varias veces a
+asyncio.run.
+"""
+import asyncio
+from typing import Any, Optional
+
+
+def close_client_from_other_loop(
+    client: Any,
+    loop: Optional[asyncio.AbstractEventLoop]
+) -> bool:
+    """
+    Cierra un cliente creado en otro event loop antes de reemplazarlo.
+
+    Si ese loop sigue en ejecución (en otro hilo) el cierre se programa en él.
+    Si ya terminó, sus transportes no pueden cerrarse desde otro loop: el
+    cliente solo se descarta y sus sockets se liberan al recolectarlo.
+
+    Args:
+        client: Cliente con aclose() (httpx.AsyncClient, redis.asyncio.Redis)
+        loop: Event loop en el que se creó el cliente
+
+    Returns:
+        True si se programó el cierre en el loop original
+    """
+    if loop is None or loop.is_closed() or not loop.is_running():
+        return False
+    asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    return True
@@ -2,7 +2,9 @@
 Configuración centralizada de modelos de clasificación.
 Este archivo facilita la gestión y adición de nuevos modelos.
 """
-from typing import Dict, List
+import hashlib
+import os
+from typing import Dict, List, Optional
 from enum import Enum
 
 class ModelType(str, Enum):
@@ -15,13 +17,66 @@ class MulticlassModel(str, Enum):
     BETO = "beto"
     ROBERTUITO = "robertuito"
 
+class InferenceBackend(str, Enum):
+    """Backends de inferencia disponibles"""
+    REMOTE = "remote"  # Hugging Face Inference Endpoint
+    LOCAL = "local"    # ONNX Runtime en CPU (pesos int8 cuantizados)
+
+# Configuración HTTP por defecto para los endpoints de Hugging Face
+# (pool de conexiones keep-alive y timeouts por petición, en segundos)
+DEFAULT_HTTP_CONFIG = {
+    "connect_timeout": 10.0,
+    "read_timeout": 60.0,
+    "pool_timeout": 30.0,
+    "max_connections": 10,
+    "max_keepalive_connections": 10,
+    "keepalive_expiry": 120.0,
+    "http2": True
+}
+
+# Configuración por defecto del tamaño de lote adaptativo (ver AdaptiveBatcher)
+DEFAULT_BATCHING_CONFIG = {
+    "initial_size": 32,        # Tamaño de lote inicial
+    "min_size": 4,             # Tamaño mínimo de lote
+    "max_size": 128,           # Tamaño máximo de lote
+    "target_latency": 2.0,     # Latencia objetivo por lote (segundos)
+    "max_tokens": 8192         # Tokens estimados máximos por lote
+}
+
+# Configuración por defecto del backend local (ONNX Runtime en CPU)
+# La sección "local" de un modelo puede incluir "id2label" ({0: "etiqueta",
+# ...}) si su config.json solo tiene etiquetas genéricas (LABEL_0, ...).
+DEFAULT_LOCAL_CONFIG = {
+    "onnx_file": "model_quantized.onnx",  # Modelo exportado y cuantizado a int8
+    # Igual que el endpoint remoto (512 tokens, el máximo de los modelos
+    # BERT): truncar antes cambiaría las predicciones de comentarios largos
+    "max_length": 512,
+    "intra_op_threads": 0                 # 0 = decide ONNX Runtime
+}
+
 # Configuración de modelos
+# "backend" elige dónde se ejecuta la inferencia de cada modelo ("remote" o
+# "local"); puede sobrescribirse con la variable de entorno <MODELO>_BACKEND
+# (ej: BINARY_BACKEND=local). El endpoint remoto siempre queda como respaldo.
+# "cache_version" forma parte de las cache keys de sus predicciones: al
+# reentrenar un modelo sin cambiar de endpoint, incrementarlo invalida el caché.
+# Las predicciones locales y remotas usan cache keys distintas
+# (ver get_model_generation).
 MODEL_REGISTRY = {
     # Modelo binario (único)
     "binary": {
         "endpoint": "https://y2whvh4mzq1gtwcl.us-east-1.aws.endpoints.huggingface.cloud",
         "description": "Modelo BERT para clasificación binaria (relevante/no_relevante)",
-        "labels": ["relevante", "no_relevante"]
+        "labels": ["relevante", "no_relevante"],
+        "cache_version": 1,
+        "backend": "remote",
+        "local": {
+            "path": "app/models/modelo_bert_binario"
+        },
+        "http": {
+            "read_timeout": 60.0,
+            "max_connections": 10
+        }
     },
 
     # Modelos multiclase (múltiples opciones)
@@ -37,7 +92,16 @@ MODEL_REGISTRY = {
                 "no_repudio",
                 "resistencia",
                 "responsabilidad"
-            ]
+            ],
+            "cache_version": 1,
+            "backend": "remote",
+            "local": {
+                "path": "app/models/modelo_bert_multiclase"
+            },
+            "http": {
+                "read_timeout": 60.0,
+                "max_connections": 10
+            }
         },
         "robertuito": {
             "endpoint": "https://ddqh9l52kwsfynev.us-east-1.aws.endpoints.huggingface.cloud",
@@ -50,7 +114,16 @@ MODEL_REGISTRY = {
                 "no_repudio",
                 "resistencia",
                 "responsabilidad"
-            ]
+            ],
+            "cache_version": 1,
+            "backend": "remote",
+            "local": {
+                "path": "app/models/modelo_robertuito_multiclase"
+            },
+            "http": {
+                "read_timeout": 60.0,
+                "max_connections": 10
+            }
         }
     }
 }
@@ -81,6 +154,131 @@ def get_multiclass_endpoint(model_name: str) -> str:
         )
     return MODEL_REGISTRY["multiclass"][model_name]["endpoint"]
 
+def _get_model_by_endpoint(endpoint_url: str) -> Dict:
+    """Busca la configuración del modelo registrado para un endpoint."""
+    models = [MODEL_REGISTRY["binary"]] + list(MODEL_REGISTRY["multiclass"].values())
+    for model in models:
+        if model["endpoint"] == endpoint_url:
+            return model
+    return {}
+
+def get_endpoint_http_config(endpoint_url: str) -> Dict:
+    """
+    Obtiene la configuración HTTP (pool y timeouts) de un endpoint.
+
+    Combina DEFAULT_HTTP_CONFIG con la sección "http" del modelo registrado
+    para ese endpoint.
+
+    Args:
+        endpoint_url: URL del endpoint de Hugging Face
+
+    Returns:
+        Diccionario con la configuración HTTP
+    """
+    config = dict(DEFAULT_HTTP_CONFIG)
+    config.update(_get_model_by_endpoint(endpoint_url).get("http", {}))
+    return config
+
+def get_endpoint_batching_config(endpoint_url: str) -> Dict:
+    """
+    Obtiene la configuración de lotes adaptativos de un endpoint.
+
+    Combina DEFAULT_BATCHING_CONFIG con la sección "batching" del modelo
+    registrado para ese endpoint.
+
+    Args:
+        endpoint_url: URL del endpoint de Hugging Face
+
+    Returns:
+        Diccionario con la configuración de lotes
+    """
+    config = dict(DEFAULT_BATCHING_CONFIG)
+    config.update(_get_model_by_endpoint(endpoint_url).get("batching", {}))
+    return config
+
+def _get_model_config(model_name: str) -> Dict:
+    """Obtiene la configuración del modelo binario o de un modelo multiclase."""
+    model_name = model_name.lower()
+    if model_name == ModelType.BINARY.value:
+        return MODEL_REGISTRY["binary"]
+    return get_model_info(model_name)
+
+# Backend con el que el clasificador sirve cada modelo. Difiere del
+# configurado si el modelo local no se pudo cargar (se usa el endpoint remoto)
+_active_backends: Dict[str, InferenceBackend] = {}
+
+def set_active_backend(model_name: str, backend: InferenceBackend):
+    """
+    Registra el backend con el que el clasificador sirve un modelo.
+
+    Args:
+        model_name: "binary" o nombre del modelo multiclase
+        backend: Backend efectivamente usado
+    """
+    _active_backends[model_name.lower()] = backend
+
+def get_model_backend(model_name: str) -> InferenceBackend:
+    """
+    Obtiene el backend de inferencia configurado para un modelo.
+
+    La variable de entorno <MODELO>_BACKEND (ej: BETO_BACKEND=local) tiene
+    prioridad sobre el valor de MODEL_REGISTRY.
+
+    Args:
+        model_name: "binary" o nombre del modelo multiclase
+
+    Returns:
+        Backend de inferencia del modelo
+    """
+    config = _get_model_config(model_name)
+    backend = os.getenv(f"{model_name.upper()}_BACKEND", config.get("backend", "remote"))
+    return InferenceBackend(backend.lower())
+
+def get_local_model_config(model_name: str) -> Optional[Dict]:
+    """
+    Obtiene la configuración del backend local de un modelo.
+
+    Args:
+        model_name: "binary" o nombre del modelo multiclase
+
+    Returns:
+        Diccionario con path, onnx_file, max_length, etc. o None si el modelo
+        no tiene backend local configurado
+    """
+    config = _get_model_config(model_name)
+    if "local" not in config:
+        return None
+    local_config = dict(DEFAULT_LOCAL_CONFIG)
+    local_config.update(config["local"])
+    local_config["labels"] = config["labels"]
+    return local_config
+
+def get_model_generation(model_name: str) -> str:
+    """
+    Obtiene la generación de caché de un modelo.
+
+    Cambia al incrementar "cache_version" en MODEL_REGISTRY, al desplegar el
+    modelo en otro endpoint o al servirlo con el backend local (ONNX int8),
+    de modo que las predicciones de un backend nunca se devuelven como si
+    fueran del otro y solo se invalidan las entradas de ese modelo.
+
+    Args:
+        model_name: "binary" o nombre del modelo multiclase
+
+    Returns:
+        Generación en formato "<cache_version>.<hash del origen>", donde el
+        origen es el endpoint remoto o la ruta y el archivo del modelo local
+    """
+    config = _get_model_config(model_name)
+    backend = _active_backends.get(model_name.lower(), get_model_backend(model_name))
+    local_config = get_local_model_config(model_name)
+    if backend == InferenceBackend.LOCAL and local_config:
+        source = f"local:{local_config['path']}/{local_config['onnx_file']}"
+    else:
+        source = config["endpoint"]
+    source_hash = hashlib.sha256(source.encode()).hexdigest()[:8]
+    return f"{config.get('cache_version', 1)}.{source_hash}"
+
 def get_available_multiclass_models() -> List[str]:
     """Obtiene la lista de modelos multiclase disponibles"""
     return list(MODEL_REGISTRY["multiclass"].keys())
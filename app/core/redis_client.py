@@ -1,22 +1,261 @@
 """
 Redis client configuration and management for caching.
 """
+import asyncio
 import os
-import redis
-from typing import Optional
+import time
+import zlib
+import redis.asyncio as aioredis
+from redis.exceptions import ResponseError
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
 import json
 import hashlib
 from dotenv import load_dotenv
+from app.core.http_clients import close_client_from_other_loop
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
 
 load_dotenv()
 
 
+# Serializers and compressors, identified by the bits of the codec header byte
+SERIALIZER_JSON = 1
+SERIALIZER_MSGPACK = 2
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+COMPRESSION_LZ4 = 3
+
+SERIALIZERS = {"json": SERIALIZER_JSON, "msgpack": SERIALIZER_MSGPACK}
+COMPRESSORS = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "zstd": COMPRESSION_ZSTD, "lz4": COMPRESSION_LZ4}
+
+# GCRA (generic cell rate algorithm) reservation, evaluated atomically on the server.
+# KEYS[1] holds the theoretical arrival time (TAT) in microseconds of server time.
+#   ARGV[1] -> emission interval (microseconds between requests)
+#   ARGV[2] -> burst (requests allowed back to back)
+# Always reserves a slot and returns how many microseconds the caller must wait.
+GCRA_RESERVE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000000 + tonumber(t[2])
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+local wait = tat - (burst - 1) * interval - now
+if wait < 0 then
+    wait = 0
+end
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], string.format('%d', new_tat), 'PX', math.ceil((new_tat - now) / 1000) + 1000)
+return wait
+"""
+
+# Namespaces holding cached responses and predictions, safe to delete. Other
+# keys hold state, not cache: cache_gen:* (namespace generations), job:*
+# (background jobs), reviews:* (incremental scraping history) and
+# ratelimit:* (distributed rate limiter).
+CACHE_NAMESPACES = ("scrape", "classify", "clf")
+
+# Header byte layout: 1vvv sscc
+#   1    -> never the first byte of legacy plain JSON (always ASCII)
+#   vvv  -> codec format version
+#   ss   -> serializer
+#   cc   -> compressor
+CODEC_FORMAT_VERSION = 0
+_HEADER_FLAG = 0x80
+
+
+class CacheCodec:
+    """
+    Encodes cached values as a header byte followed by the serialized payload.
+
+    The header records the format version, serializer and compressor used, so
+    entries written with any codec (or before codecs existed, as plain JSON
+    text) can still be decoded after the configuration changes. Values smaller
+    than `min_compress_size` are stored uncompressed.
+    """
+
+    def __init__(self, serializer: str = "json", compression: str = "zlib", min_compress_size: int = 1024):
+        if serializer == "msgpack" and msgpack is None:
+            print("[WARNING] msgpack not installed, falling back to JSON serialization")
+            serializer = "json"
+        if (compression == "zstd" and zstandard is None) or (compression == "lz4" and lz4 is None):
+            print(f"[WARNING] {compression} not installed, falling back to zlib compression")
+            compression = "zlib"
+
+        self.serializer = SERIALIZERS[serializer]
+        self.compression = COMPRESSORS[compression]
+        self.min_compress_size = min_compress_size
+        self.name = f"{serializer}+{compression}"
+
+        self._zstd_compressor = zstandard.ZstdCompressor(level=3) if zstandard else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+    @classmethod
+    def from_name(cls, name: str, min_compress_size: int = 1024) -> 'CacheCodec':
+        """
+        Create a codec from a name such as 'msgpack+zstd' or 'json'.
+
+        Args:
+            name: '<serializer>[+<compressor>]'
+            min_compress_size: Minimum payload size (bytes) to compress
+
+        Returns:
+            CacheCodec instance
+        """
+        serializer, _, compression = name.lower().partition("+")
+        return cls(serializer, compression or "none", min_compress_size)
+
+    def _serialize(self, data: Any) -> bytes:
+        if self.serializer == SERIALIZER_MSGPACK:
+            return msgpack.packb(data, use_bin_type=True)
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    def _compress(self, compression: int, payload: bytes) -> bytes:
+        if compression == COMPRESSION_ZSTD:
+            return self._zstd_compressor.compress(payload)
+        if compression == COMPRESSION_LZ4:
+            return lz4.frame.compress(payload)
+        if compression == COMPRESSION_ZLIB:
+            return zlib.compress(payload, 6)
+        return payload
+
+    def _decompress(self, compression: int, payload: bytes) -> bytes:
+        if compression == COMPRESSION_ZSTD:
+            if zstandard is None:
+                raise ValueError("zstandard is required to decode this cache entry")
+            return self._zstd_decompressor.decompress(payload)
+        if compression == COMPRESSION_LZ4:
+            if lz4 is None:
+                raise ValueError("lz4 is required to decode this cache entry")
+            return lz4.frame.decompress(payload)
+        if compression == COMPRESSION_ZLIB:
+            return zlib.decompress(payload)
+        return payload
+
+    def encode(self, data: Any) -> bytes:
+        """
+        Encode a value for storage in Redis.
+
+        Args:
+            data: JSON-compatible value
+
+        Returns:
+            Header byte followed by the (optionally compressed) payload
+        """
+        payload = self._serialize(data)
+        compression = self.compression if len(payload) >= self.min_compress_size else COMPRESSION_NONE
+        header = _HEADER_FLAG | (CODEC_FORMAT_VERSION << 4) | (self.serializer << 2) | compression
+        return bytes([header]) + self._compress(compression, payload)
+
+    def decode(self, value: Union[bytes, str]) -> Any:
+        """
+        Decode a value read from Redis, whichever codec wrote it.
+
+        Args:
+            value: Raw value from Redis
+
+        Returns:
+            Decoded value
+        """
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+
+        header = value[0]
+        if not header & _HEADER_FLAG:
+            # Legacy entry stored as plain JSON text
+            return json.loads(value)
+
+        version = (header >> 4) & 0x07
+        if version != CODEC_FORMAT_VERSION:
+            raise ValueError(f"Unsupported cache codec version: {version}")
+
+        payload = self._decompress(header & 0x03, value[1:])
+        if (header >> 2) & 0x03 == SERIALIZER_MSGPACK:
+            if msgpack is None:
+                raise ValueError("msgpack is required to decode this cache entry")
+            return msgpack.unpackb(payload, raw=False)
+        return json.loads(payload)
+
+
+def _default_codec_name() -> str:
+    """Best codec available with the installed optional dependencies."""
+    serializer = "msgpack" if msgpack is not None else "json"
+    compression = "zstd" if zstandard is not None else "zlib"
+    return f"{serializer}+{compression}"
+
+
+class CircuitBreaker:
+    """
+    Tracks Redis failures so an unavailable server is skipped without a round-trip.
+
+    After `failure_threshold` consecutive failures the circuit opens and cache
+    operations are skipped for `reset_timeout` seconds. Then operations are
+    let through again on trial (half-open): the first success closes the
+    circuit, the first failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+
+    def allow_request(self) -> bool:
+        """Check whether an operation may be sent to Redis."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+        return True
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            print("[OK] Redis reachable again, cache re-enabled")
+        self.state = self.CLOSED
+        self._failures = 0
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                print(f"[WARNING] Redis unavailable, cache disabled for {self.reset_timeout:g}s")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
 class RedisClient:
     """
-    Singleton Redis client manager for caching operations.
+    Singleton asyncio Redis client manager for caching operations.
+
+    Commands share a connection pool and availability is tracked with a
+    circuit breaker instead of a PING before every operation.
     """
     _instance: Optional['RedisClient'] = None
-    _client: Optional[redis.Redis] = None
+    _initialized = False
+
+    GENERATION_KEY_PREFIX = "cache_gen"
 
     def __new__(cls):
         if cls._instance is None:
@@ -24,49 +263,109 @@ class RedisClient:
         return cls._instance
 
     def __init__(self):
-        if self._client is None:
-            self._connect()
-
-    def _connect(self):
-        """Connect to Redis using URL from environment variables."""
-        redis_url = os.getenv('REDIS_URL')
-
-        if not redis_url:
-            print("WARNING: REDIS_URL not configured. Caching disabled.")
-            self._client = None
+        if self._initialized:
             return
+        self._initialized = True
+
+        self._redis_url = os.getenv('REDIS_URL')
+        self._max_connections = int(os.getenv('REDIS_MAX_CONNECTIONS', '20'))
+        self.codec = CacheCodec.from_name(
+            os.getenv('REDIS_CACHE_CODEC', _default_codec_name()),
+            min_compress_size=int(os.getenv('REDIS_COMPRESS_MIN_BYTES', '1024'))
+        )
+        self._client: Optional[aioredis.Redis] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv('REDIS_FAILURE_THRESHOLD', '3')),
+            reset_timeout=float(os.getenv('REDIS_RESET_TIMEOUT', '30'))
+        )
+
+        # Namespace generation counters cached per process: {namespace: (generation, read_at)}
+        self._generations: Dict[str, tuple] = {}
+        self._generation_refresh = float(os.getenv('REDIS_GENERATION_REFRESH', '5'))
+
+        # Lua scripts registered on the current client: {source: AsyncScript}
+        self._scripts: Dict[str, Any] = {}
+
+        if not self._redis_url:
+            print("WARNING: REDIS_URL not configured. Caching disabled.")
 
-        try:
-            # Crear cliente Redis con configuración optimizada
-            self._client = redis.from_url(
-                redis_url,
-                decode_responses=True,  # Decodificar respuestas automáticamente
+    def _get_client(self) -> aioredis.Redis:
+        """
+        Get the pooled client bound to the running event loop.
+
+        The pool connects lazily, so creating the client does not block.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            # Connections from another event loop cannot be reused
+            if self._client is not None:
+                close_client_from_other_loop(self._client, self._client_loop)
+            self._client = aioredis.from_url(
+                self._redis_url,
+                decode_responses=False,  # Values are binary (see CacheCodec)
+                max_connections=self._max_connections,
                 socket_connect_timeout=5,
                 socket_timeout=5,
                 retry_on_timeout=True,
                 health_check_interval=30
             )
+            self._client_loop = loop
+        return self._client
 
-            # Verificar conexión
-            self._client.ping()
-            print("[OK] Redis connected successfully")
+    async def _execute(self, command: Callable[[aioredis.Redis], Awaitable[Any]]) -> Any:
+        """
+        Run a command with the pooled client, recording the outcome in the circuit breaker.
 
-        except Exception as e:
-            print(f"[ERROR] Error connecting to Redis: {str(e)}")
-            print("WARNING: Caching disabled. Application will continue without cache.")
-            self._client = None
+        Args:
+            command: Coroutine function receiving the Redis client
+
+        Returns:
+            Command result
+        """
+        try:
+            result = await command(self._get_client())
+        except ResponseError:
+            # The server answered, so it is available
+            self._breaker.record_success()
+            raise
+        except Exception:
+            self._breaker.record_failure()
+            raise
+        self._breaker.record_success()
+        return result
 
     def is_available(self) -> bool:
-        """Check if Redis is available."""
-        if self._client is None:
+        """Check if Redis is configured and the circuit breaker allows operations."""
+        if not self._redis_url:
+            return False
+        return self._breaker.allow_request()
+
+    async def ping(self) -> bool:
+        """
+        Check the connection with a PING (used at startup).
+
+        Returns:
+            True if Redis answered
+        """
+        if not self._redis_url:
             return False
 
         try:
-            self._client.ping()
+            await self._execute(lambda client: client.ping())
+            print("[OK] Redis connected successfully")
             return True
-        except:
+        except Exception as e:
+            print(f"[ERROR] Error connecting to Redis: {str(e)}")
+            print("WARNING: Caching disabled. Application will continue without cache.")
             return False
 
+    async def close(self):
+        """Close the pooled connections."""
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
     def generate_cache_key(self, prefix: str, data: dict) -> str:
         """
         Generate a deterministic cache key from data.
@@ -86,7 +385,7 @@ class RedisClient:
 
         return f"{prefix}:{hash_hex}"
 
-    def get_cached(self, key: str) -> Optional[dict]:
+    async def get_cached(self, key: str) -> Optional[dict]:
         """
         Get cached data by key.
 
@@ -100,17 +399,17 @@ class RedisClient:
             return None
 
         try:
-            cached = self._client.get(key)
+            cached = await self._execute(lambda client: client.get(key))
             if cached:
                 print(f"[CACHE HIT] {key}")
-                return json.loads(cached)
+                return self.codec.decode(cached)
             print(f"[CACHE MISS] {key}")
             return None
         except Exception as e:
             print(f"[WARNING] Error reading from cache: {str(e)}")
             return None
 
-    def set_cached(self, key: str, data: dict, ttl: int = 3600) -> bool:
+    async def set_cached(self, key: str, data: dict, ttl: int = 3600) -> bool:
         """
         Store data in cache with TTL.
 
@@ -126,15 +425,72 @@ class RedisClient:
             return False
 
         try:
-            json_data = json.dumps(data)
-            self._client.setex(key, ttl, json_data)
-            print(f"[CACHED] {key} (TTL: {ttl}s)")
+            encoded = self.codec.encode(data)
+            await self._execute(lambda client: client.setex(key, ttl, encoded))
+            print(f"[CACHED] {key} (TTL: {ttl}s, {len(encoded)} bytes, {self.codec.name})")
             return True
         except Exception as e:
             print(f"[WARNING] Error writing to cache: {str(e)}")
             return False
 
-    def delete_cached(self, key: str) -> bool:
+    async def get_many(self, keys: List[str], chunk_size: int = 1000) -> List[Optional[dict]]:
+        """
+        Get several cached values in a single round-trip (pipelined MGET).
+
+        Args:
+            keys: Cache keys
+            chunk_size: Maximum number of keys per MGET command
+
+        Returns:
+            List with the cached dict (or None) for each key, in order
+        """
+        if not keys or not self.is_available():
+            return [None] * len(keys)
+
+        async def mget(client: aioredis.Redis):
+            pipe = client.pipeline(transaction=False)
+            for i in range(0, len(keys), chunk_size):
+                pipe.mget(keys[i:i + chunk_size])
+            return await pipe.execute()
+
+        try:
+            chunks = await self._execute(mget)
+            values = [value for chunk in chunks for value in chunk]
+            return [self.codec.decode(value) if value else None for value in values]
+        except Exception as e:
+            print(f"[WARNING] Error reading many keys from cache: {str(e)}")
+            return [None] * len(keys)
+
+    async def set_many(self, items: Dict[str, dict], ttl: int = 3600) -> bool:
+        """
+        Store several values with the same TTL in a single round-trip.
+
+        MSET cannot set a TTL, so the SETEX commands are pipelined instead.
+
+        Args:
+            items: Mapping of cache key to data
+            ttl: Time to live in seconds (default: 1 hour)
+
+        Returns:
+            True if successful, False otherwise
+        """
+        if not items or not self.is_available():
+            return False
+
+        async def setex_all(client: aioredis.Redis):
+            pipe = client.pipeline(transaction=False)
+            for key, data in items.items():
+                pipe.setex(key, ttl, self.codec.encode(data))
+            return await pipe.execute()
+
+        try:
+            await self._execute(setex_all)
+            return True
+        except Exception as e:
+            print(f"[WARNING] Error writing many keys to cache: {str(e)}")
+            return False
+
+    async def delete_cached(self, key: str) -> bool:
         """
         Delete cached data by key.
 
@@ -148,19 +504,24 @@ class RedisClient:
             return False
 
         try:
-            self._client.delete(key)
+            await self._execute(lambda client: client.delete(key))
             print(f"[DELETED] {key}")
             return True
         except Exception as e:
             print(f"[WARNING] Error deleting from cache: {str(e)}")
             return False
 
-    def clear_pattern(self, pattern: str) -> int:
+    async def clear_pattern(self, pattern: str, batch_size: int = 500) -> int:
         """
-        Delete all keys matching a pattern.
+        Delete all keys matching a pattern without blocking Redis.
+
+        Keys are found with incremental SCAN and removed in batches with
+        UNLINK, which frees memory in a background thread, instead of a
+        single KEYS + DELETE.
 
         Args:
             pattern: Redis pattern (e.g., 'scrape:*')
+            batch_size: Keys per SCAN step and per UNLINK command
 
         Returns:
             Number of keys deleted
@@ -168,18 +529,133 @@ class RedisClient:
         if not self.is_available():
             return 0
 
+        async def scan_and_unlink(client: aioredis.Redis) -> int:
+            deleted = 0
+            batch = []
+            async for key in client.scan_iter(match=pattern, count=batch_size):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    deleted += await client.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += await client.unlink(*batch)
+            return deleted
+
         try:
-            keys = self._client.keys(pattern)
-            if keys:
-                deleted = self._client.delete(*keys)
-                print(f"[DELETED] {deleted} keys matching pattern: {pattern}")
-                return deleted
-            return 0
+            deleted = await self._execute(scan_and_unlink)
+            print(f"[DELETED] {deleted} keys matching pattern: {pattern}")
+            return deleted
         except Exception as e:
             print(f"[WARNING] Error clearing cache pattern: {str(e)}")
             return 0
 
-    def get_stats(self) -> dict:
+    async def get_generation(self, namespace: str) -> int:
+        """
+        Get the current generation number of a cache namespace.
+
+        The value is cached in-process for REDIS_GENERATION_REFRESH seconds,
+        so a bump made by another replica is picked up within that window.
+
+        Args:
+            namespace: Cache namespace (e.g., 'scrape', 'clf:beto')
+
+        Returns:
+            Generation number (0 if never bumped or Redis is unavailable)
+        """
+        cached = self._generations.get(namespace)
+        if cached is not None and time.monotonic() - cached[1] < self._generation_refresh:
+            return cached[0]
+
+        generation = 0
+        if self.is_available():
+            try:
+                value = await self._execute(
+                    lambda client: client.get(f"{self.GENERATION_KEY_PREFIX}:{namespace}")
+                )
+                generation = int(value) if value else 0
+            except Exception as e:
+                print(f"[WARNING] Error reading cache generation: {str(e)}")
+                return cached[0] if cached else 0
+
+        self._generations[namespace] = (generation, time.monotonic())
+        return generation
+
+    async def bump_generation(self, namespace: str) -> Optional[int]:
+        """
+        Invalidate a whole cache namespace in O(1) by incrementing its generation.
+
+        Keys of older generations are no longer read and expire with their TTL.
+
+        Args:
+            namespace: Cache namespace (e.g., 'scrape', 'clf:beto')
+
+        Returns:
+            New generation number, or None if Redis is unavailable
+        """
+        if not self.is_available():
+            return None
+
+        try:
+            generation = await self._execute(
+                lambda client: client.incr(f"{self.GENERATION_KEY_PREFIX}:{namespace}")
+            )
+            self._generations[namespace] = (generation, time.monotonic())
+            print(f"[INVALIDATED] {namespace} (generation {generation})")
+            return generation
+        except Exception as e:
+            print(f"[WARNING] Error bumping cache generation: {str(e)}")
+            return None
+
+    async def versioned_prefix(self, namespace: str) -> str:
+        """
+        Get the key prefix of the current generation of a namespace.
+
+        Args:
+            namespace: Cache namespace (e.g., 'scrape')
+
+        Returns:
+            Prefix such as 'scrape:v3'
+        """
+        return f"{namespace}:v{await self.get_generation(namespace)}"
+
+    def _get_script(self, client: aioredis.Redis, source: str):
+        """Get a Lua script bound to the client (sent once, then run with EVALSHA)."""
+        script = self._scripts.get(source)
+        if script is None or script.registered_client is not client:
+            script = client.register_script(source)
+            self._scripts[source] = script
+        return script
+
+    async def reserve_rate_slot(self, key: str, interval: float, burst: int = 1) -> Optional[float]:
+        """
+        Reserve a request slot in a rate limit shared by every process (GCRA).
+
+        The slot is reserved even when the caller has to wait, so concurrent
+        callers are queued in arrival order.
+
+        Args:
+            key: Rate limit key (e.g., 'ratelimit:play.google.com')
+            interval: Seconds between requests at the allowed rate
+            burst: Requests allowed back to back
+
+        Returns:
+            Seconds to wait before sending the request, or None if Redis is unavailable
+        """
+        if not self.is_available():
+            return None
+
+        try:
+            wait = await self._execute(
+                lambda client: self._get_script(client, GCRA_RESERVE_SCRIPT)(
+                    keys=[key], args=[int(interval * 1_000_000), max(1, int(burst))], client=client
+                )
+            )
+            return int(wait) / 1_000_000
+        except Exception as e:
+            print(f"[WARNING] Error reserving rate limit slot: {str(e)}")
+            return None
+
+    async def get_stats(self) -> dict:
         """
         Get Redis cache statistics.
 
@@ -189,13 +665,15 @@ class RedisClient:
         if not self.is_available():
             return {
                 "available": False,
-                "message": "Redis not available"
+                "message": "Redis not available",
+                "circuit_breaker": self._breaker.state
             }
 
         try:
-            info = self._client.info('stats')
+            info = await self._execute(lambda client: client.info('stats'))
             return {
                 "available": True,
+                "circuit_breaker": self._breaker.state,
                 "total_connections_received": info.get('total_connections_received', 0),
                 "total_commands_processed": info.get('total_commands_processed', 0),
                 "keyspace_hits": info.get('keyspace_hits', 0),
@@ -0,0 +1,271 @@
+"""
+Repositorio local persistente de comentarios y clasificaciones (SQLite).
+
+PlayStoreScraper guarda aquí cada comentario extraído y el pipeline guarda
+las predicciones de cada modelo, de modo que los comentarios siguen
+disponibles después de que expire el caché de Redis y pueden consultarse
+por app, fecha y calificación sin volver a hacer scraping. El scraping
+incremental completa cada extracción con los comentarios guardados aquí; su
+cursor (high-water mark) está en Redis (ver
+app.services.review_history_service) y solo avanza tras guardar aquí.
+
+Las operaciones son bloqueantes: desde código asíncrono deben ejecutarse en
+un pool (ver app.core.executors).
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Ruta de la base de datos SQLite
+REVIEW_DB_PATH = os.getenv('REVIEW_DB_PATH', 'data/reviews.db')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id_original  TEXT PRIMARY KEY,
+    app_id       TEXT NOT NULL,
+    lang         TEXT NOT NULL,
+    country      TEXT NOT NULL,
+    comentario   TEXT NOT NULL,
+    calificacion INTEGER NOT NULL,
+    fecha        TEXT NOT NULL,
+    usuario      TEXT,
+    extraido_en  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reviews_app_fecha ON reviews (app_id, fecha);
+CREATE INDEX IF NOT EXISTS idx_reviews_calificacion ON reviews (calificacion);
+
+CREATE TABLE IF NOT EXISTS classifications (
+    id_original TEXT NOT NULL,
+    modelo      TEXT NOT NULL,
+    generacion  TEXT NOT NULL,
+    relevante   INTEGER,
+    categoria   TEXT,
+    confianza   REAL,
+    PRIMARY KEY (id_original, modelo, generacion)
+);
+"""
+
+_UPSERT_REVIEW = """
+INSERT INTO reviews (id_original, app_id, lang, country, comentario, calificacion, fecha, usuario, extraido_en)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id_original) DO UPDATE SET
+    comentario = excluded.comentario,
+    calificacion = excluded.calificacion,
+    fecha = excluded.fecha,
+    usuario = excluded.usuario,
+    extraido_en = excluded.extraido_en
+"""
+
+_UPSERT_CLASSIFICATION = """
+INSERT INTO classifications (id_original, modelo, generacion, relevante, categoria, confianza)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (id_original, modelo, generacion) DO UPDATE SET
+    relevante = excluded.relevante,
+    categoria = excluded.categoria,
+    confianza = excluded.confianza
+"""
+
+
+class ReviewStore:
+    """
+    Acceso a la base SQLite de comentarios.
+
+    Cada hilo usa su propia conexión. La base usa WAL para que las lecturas
+    no bloqueen a las escrituras, y las inserciones masivas se hacen con
+    executemany dentro de una sola transacción.
+    """
+
+    def __init__(self, db_path: str = REVIEW_DB_PATH):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+
+        self._connection().executescript(_SCHEMA)
+        print(f"✅ Repositorio de comentarios: {db_path}")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def upsert_reviews(self, app_id: str, lang: str, country: str, reviews: Iterable[Dict[str, Any]]) -> int:
+        """
+        Inserta o actualiza comentarios en una sola transacción.
+
+        Args:
+            app_id: ID de la aplicación
+            lang: Idioma de los comentarios
+            country: País de origen
+            reviews: Comentarios con id_original, comentario, calificacion, fecha
+                     y usuario, del más nuevo al más antiguo
+
+        Returns:
+            Número de comentarios escritos
+        """
+        extraido_en = datetime.now().isoformat()
+        rows = [
+            (
+                r['id_original'], app_id, lang, country, r['comentario'],
+                r['calificacion'], r['fecha'], r.get('usuario'), extraido_en
+            )
+            for r in reviews
+        ]
+        # Se insertan del más antiguo al más nuevo: a igual fecha, el rowid
+        # más alto es el comentario más reciente (ver get_reviews)
+        rows.reverse()
+        if not rows:
+            return 0
+
+        with self._transaction() as conn:
+            conn.executemany(_UPSERT_REVIEW, rows)
+        return len(rows)
+
+    def save_classifications(
+        self,
+        modelo: str,
+        generacion: str,
+        results: Sequence[Tuple[str, Optional[bool], Optional[str], Optional[float]]]
+    ) -> int:
+        """
+        Guarda las predicciones de un modelo en una sola transacción.
+
+        Args:
+            modelo: "binary" o nombre del modelo multiclase
+            generacion: Generación del modelo (ver get_model_generation)
+            results: Tuplas (id_original, relevante, categoría, confianza);
+                     los campos que el modelo no produce van en None
+
+        Returns:
+            Número de predicciones escritas
+        """
+        rows = [
+            (id_original, modelo, generacion,
+             None if relevante is None else int(relevante), categoria, confianza)
+            for id_original, relevante, categoria, confianza in results
+        ]
+        if not rows:
+            return 0
+
+        with self._transaction() as conn:
+            conn.executemany(_UPSERT_CLASSIFICATION, rows)
+        return len(rows)
+
+    def get_reviews(
+        self,
+        app_id: str,
+        max_rating: Optional[int] = None,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        modelo: Optional[str] = None,
+        generacion: Optional[str] = None,
+        limit: Optional[int] = None,
+        lang: Optional[str] = None,
+        country: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Consulta los comentarios guardados de una app, del más nuevo al más antiguo.
+
+        Args:
+            app_id: ID de la aplicación
+            max_rating: Calificación máxima (≤ este valor)
+            desde: Fecha mínima (YYYY-MM-DD, inclusive)
+            hasta: Fecha máxima (YYYY-MM-DD, inclusive)
+            modelo: Si se indica, agrega la predicción de este modelo
+                    (campos relevante, categoria y confianza)
+            generacion: Generación del modelo (obligatoria si se indica modelo)
+            limit: Número máximo de comentarios
+            lang: Si se indica, solo comentarios de este idioma
+            country: Si se indica, solo comentarios de este país
+
+        Returns:
+            Lista de comentarios
+        """
+        columns = "r.id_original, r.comentario, r.calificacion, r.fecha, r.usuario"
+        join = ""
+        params: List[Any] = []
+        if modelo:
+            columns += ", c.relevante, c.categoria, c.confianza"
+            join = ("LEFT JOIN classifications c ON c.id_original = r.id_original "
+                    "AND c.modelo = ? AND c.generacion = ?")
+            params += [modelo, generacion]
+
+        conditions = ["r.app_id = ?"]
+        params.append(app_id)
+        if lang:
+            conditions.append("r.lang = ?")
+            params.append(lang)
+        if country:
+            conditions.append("r.country = ?")
+            params.append(country)
+        if max_rating is not None:
+            conditions.append("r.calificacion <= ?")
+            params.append(max_rating)
+        if desde:
+            conditions.append("r.fecha >= ?")
+            params.append(desde)
+        if hasta:
+            conditions.append("r.fecha <= ?")
+            params.append(hasta)
+
+        query = (f"SELECT {columns} FROM reviews r {join} "
+                 f"WHERE {' AND '.join(conditions)} ORDER BY r.fecha DESC, r.rowid DESC")
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        rows = self._connection().execute(query, params).fetchall()
+        reviews = []
+        for row in rows:
+            review = dict(row)
+            if 'relevante' in review and review['relevante'] is not None:
+                review['relevante'] = bool(review['relevante'])
+            reviews.append(review)
+        return reviews
+
+    def count_reviews(self, app_id: str) -> int:
+        """Número de comentarios guardados de una app."""
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM reviews WHERE app_id = ?", (app_id,)
+        ).fetchone()
+        return row[0]
+
+
+# Singleton para compartir la base entre servicios
+_review_store_instance = None
+
+def get_review_store() -> ReviewStore:
+    """
+    Obtiene la instancia singleton del repositorio de comentarios.
+
+    Returns:
+        Instancia de ReviewStore
+    """
+    global _review_store_instance
+    if _review_store_instance is None:
+        _review_store_instance = ReviewStore()
+    return _review_store_instance
@@ -2,7 +2,7 @@ from pydantic import BaseModel, Field, validator
 from typing import List, Optional
 from enum import Enum
 import re
-from datetime import datetime
+from datetime import date, datetime
 
 class CriteriosBusqueda(str, Enum):
     """Criterios de ordenamiento para comentarios de Google Play Store"""
@@ -19,6 +19,22 @@ class ScrapingRequest(BaseModel):
     max_reviews: int = Field(default=9000, description="Número máximo de comentarios a extraer")
     max_rating: int = Field(default=3, description="Calificación máxima a filtrar (≤ este valor)")
     criterios_busqueda: CriteriosBusqueda = Field(..., description="Criterio de ordenamiento: 'recientes' (más nuevos) o 'relevantes' (más útiles según Google)")
+    criterios_adicionales: List[CriteriosBusqueda] = Field(
+        default_factory=list,
+        description="Criterios adicionales que se extraen en paralelo con criterios_busqueda"
+    )
+    paises: List[str] = Field(
+        default=["pe"],
+        description="Países de Play Store que se extraen en paralelo (ej: ['pe', 'mx', 'co'])"
+    )
+    idioma: str = Field(default="es", description="Idioma de los comentarios")
+    since: Optional[date] = Field(default=None, description="Fecha mínima de los comentarios (YYYY-MM-DD, inclusive)")
+    until: Optional[date] = Field(default=None, description="Fecha máxima de los comentarios (YYYY-MM-DD, inclusive)")
+    objetivo_relevantes: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Número de comentarios relevantes a obtener. El scraping se detiene al alcanzarlo (max_reviews sigue siendo el límite de comentarios extraídos)"
+    )
     multiclass_model: Optional[MulticlassModelEnum] = Field(
         default=MulticlassModelEnum.BETO,
         description="Modelo multiclase a utilizar para clasificación ISO 25010 (beto o robertuito)"
@@ -30,6 +46,20 @@ class ScrapingRequest(BaseModel):
             raise ValueError('URL debe ser de Google Play Store')
         return v
 
+    @validator('paises')
+    def validate_paises(cls, v):
+        paises = [p.strip().lower() for p in v]
+        if not paises or not all(re.fullmatch(r'[a-z]{2}', p) for p in paises):
+            raise ValueError('Los países deben ser códigos ISO de 2 letras (ej: pe, mx, co)')
+        return list(dict.fromkeys(paises))
+
+    @validator('until')
+    def validate_until(cls, v, values):
+        since = values.get('since')
+        if v is not None and since is not None and v < since:
+            raise ValueError('until debe ser igual o posterior a since')
+        return v
+
     @property
     def app_id(self) -> str:
         """Extrae el app_id de la URL"""
@@ -81,6 +111,41 @@ class ScrapingResponse(BaseModel):
     requirements: Optional[RequirementsData] = Field(None, description="Requisitos No Funcionales generados (opcional)")
     from_cache: bool = Field(default=False, description="Indica si el resultado proviene del caché de Redis")
 
+# ===== Schemas para trabajos asíncronos de scraping =====
+
+class JobStatus(str, Enum):
+    """Estados de un trabajo asíncrono de scraping"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class JobProgress(BaseModel):
+    """Progreso por etapa de un trabajo de scraping"""
+    paginas_procesadas: int = Field(default=0, description="Páginas de Play Store descargadas")
+    comentarios_extraidos: int = Field(default=0, description="Comentarios negativos extraídos")
+    comentarios_clasificados: int = Field(default=0, description="Comentarios procesados por el filtro binario")
+    comentarios_relevantes: int = Field(default=0, description="Comentarios relevantes clasificados en ISO 25010")
+    requisitos_generados: int = Field(default=0, description="Requisitos No Funcionales generados")
+
+class ScrapingJobCreatedResponse(BaseModel):
+    """Response al crear un trabajo asíncrono de scraping"""
+    job_id: str = Field(..., description="Identificador del trabajo")
+    status: JobStatus = Field(..., description="Estado del trabajo")
+    status_url: str = Field(..., description="Ruta para consultar el estado del trabajo")
+
+class ScrapingJobStatusResponse(BaseModel):
+    """Estado de un trabajo asíncrono de scraping"""
+    job_id: str = Field(..., description="Identificador del trabajo")
+    status: JobStatus = Field(..., description="Estado del trabajo")
+    etapa: Optional[str] = Field(None, description="Etapa en curso (scraping, clasificacion, requisitos, finalizado)")
+    app_id: str = Field(..., description="ID de la aplicación scrapeada")
+    progreso: JobProgress = Field(..., description="Progreso por etapa")
+    result: Optional[ScrapingResponse] = Field(None, description="Resultado final (solo si el trabajo terminó)")
+    error: Optional[str] = Field(None, description="Mensaje de error si el trabajo falló")
+    created_at: str = Field(..., description="Fecha de creación (ISO 8601)")
+    updated_at: Optional[str] = Field(None, description="Fecha de la última actualización (ISO 8601)")
+
 # ===== Schemas para clasificación de comentario individual =====
 
 class SingleCommentRequest(BaseModel):
@@ -0,0 +1,167 @@
+"""
+Tamaño de lote adaptativo para las llamadas de inferencia a Hugging Face.
+
+El tamaño óptimo de lote depende de la longitud de los comentarios y de la
+carga del endpoint. AdaptiveBatcher mide la latencia y el tamaño (tokens
+estimados) de cada llamada y ajusta el tamaño de lote hacia una latencia
+objetivo, limitando además el total de tokens por lote.
+"""
+import threading
+from typing import Dict, Sequence
+
+# Los modelos BERT truncan la entrada a 512 tokens
+MAX_TOKENS_PER_TEXT = 512
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estima el número de tokens de un comentario para el tokenizer WordPiece.
+
+    Usa la aproximación de ~4 caracteres por token más los tokens especiales
+    [CLS] y [SEP], truncando a la longitud máxima del modelo.
+
+    Args:
+        text: Texto del comentario
+
+    Returns:
+        Número estimado de tokens
+    """
+    return min(MAX_TOKENS_PER_TEXT, len(text or '') // 4 + 2)
+
+
+class AdaptiveBatcher:
+    """
+    Ajusta el tamaño de lote de un endpoint hacia una latencia objetivo.
+
+    Tras cada llamada exitosa estima el costo por token (latencia / tokens) y
+    calcula el tamaño de lote que alcanzaría la latencia objetivo con la
+    longitud media observada de los comentarios. El tamaño se acerca a ese
+    valor de forma gradual (como máximo se duplica en cada paso). Los errores
+    de sobrecarga (413, 5xx, timeout) reducen el tamaño a la mitad; un 413
+    además fija un techo en 3/4 del lote rechazado.
+    """
+
+    def __init__(
+        self,
+        initial_size: int = 32,
+        min_size: int = 4,
+        max_size: int = 128,
+        target_latency: float = 2.0,
+        max_tokens: int = 8192,
+        smoothing: float = 0.3
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_latency = target_latency
+        self.max_tokens = max_tokens
+        self.smoothing = smoothing
+        self._size = float(max(min_size, min(initial_size, max_size)))
+        # Techo aprendido a partir de lotes rechazados por tamaño (HTTP 413)
+        self._ceiling = max_size
+
+        # Medias móviles exponenciales de las observaciones
+        self._seconds_per_token = None
+        self._tokens_per_text = None
+        self._latency = None
+
+        self._calls = 0
+        self._failures = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'AdaptiveBatcher':
+        """Crea un batcher a partir de un diccionario de configuración."""
+        return cls(
+            initial_size=config["initial_size"],
+            min_size=config["min_size"],
+            max_size=config["max_size"],
+            target_latency=config["target_latency"],
+            max_tokens=config["max_tokens"]
+        )
+
+    @property
+    def batch_size(self) -> int:
+        """Tamaño de lote actual"""
+        return int(round(self._size))
+
+    def take(self, texts: Sequence[str]) -> int:
+        """
+        Calcula cuántos textos (desde el inicio) incluir en el siguiente lote.
+
+        Respeta el tamaño de lote actual y el máximo de tokens por lote; el
+        lote siempre incluye al menos un texto.
+
+        Args:
+            texts: Textos candidatos en orden
+
+        Returns:
+            Número de textos a incluir en el lote
+        """
+        limit = min(self.batch_size, len(texts))
+        tokens = 0
+        for count, text in enumerate(texts[:limit]):
+            tokens += estimate_tokens(text)
+            if tokens > self.max_tokens and count > 0:
+                return count
+        return limit
+
+    def _ewma(self, previous, value):
+        if previous is None:
+            return value
+        return self.smoothing * value + (1 - self.smoothing) * previous
+
+    def record_success(self, num_texts: int, num_tokens: int, latency: float):
+        """
+        Registra una llamada exitosa y ajusta el tamaño de lote.
+
+        Args:
+            num_texts: Número de textos del lote
+            num_tokens: Tokens estimados del lote
+            latency: Latencia de la llamada en segundos
+        """
+        if num_texts <= 0 or num_tokens <= 0:
+            return
+
+        with self._lock:
+            self._calls += 1
+            self._latency = self._ewma(self._latency, latency)
+            self._seconds_per_token = self._ewma(self._seconds_per_token, latency / num_tokens)
+            self._tokens_per_text = self._ewma(self._tokens_per_text, num_tokens / num_texts)
+
+            if self._seconds_per_token <= 0:
+                return
+
+            desired = self.target_latency / (self._seconds_per_token * self._tokens_per_text)
+            desired = min(desired, self._size * 2)
+            self._size += 0.5 * (desired - self._size)
+            self._size = max(self.min_size, min(self._size, self._ceiling))
+
+    def record_failure(self, num_texts: int, payload_too_large: bool = False):
+        """
+        Registra un error de sobrecarga y reduce el tamaño de lote a la mitad.
+
+        Args:
+            num_texts: Número de textos del lote que falló
+            payload_too_large: True si el endpoint rechazó el lote por tamaño (413)
+        """
+        with self._lock:
+            self._failures += 1
+            if payload_too_large:
+                self._ceiling = max(self.min_size, min(self._ceiling, num_texts * 3 // 4))
+            self._size = max(self.min_size, min(self._size / 2, self._ceiling))
+
+    def get_stats(self) -> Dict:
+        """
+        Obtiene el estado actual del batcher.
+
+        Returns:
+            Diccionario con tamaño de lote, latencia media y llamadas
+        """
+        with self._lock:
+            return {
+                "batch_size": self.batch_size,
+                "latencia_media": round(self._latency, 3) if self._latency is not None else None,
+                "tokens_por_comentario": round(self._tokens_per_text, 1) if self._tokens_per_text is not None else None,
+                "llamadas": self._calls,
+                "fallos": self._failures
+            }
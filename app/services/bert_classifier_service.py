@@ -1,5 +1,7 @@
-import requests
-from typing import List, Dict, Tuple, Optional
+import asyncio
+import time
+import httpx
+from typing import AsyncIterable, List, Dict, Tuple, Optional, Callable
 import os
 from dotenv import load_dotenv
 from app.core.model_config import (
@@ -7,8 +9,20 @@ from app.core.model_config import (
     get_multiclass_endpoint,
     get_available_multiclass_models,
     get_multiclass_categories,
+    get_endpoint_http_config,
+    get_endpoint_batching_config,
+    get_model_backend,
+    get_local_model_config,
+    set_active_backend,
+    InferenceBackend,
     DEFAULT_MULTICLASS_MODEL
 )
+from app.core.executors import Stage, run_in_stage
+from app.core.http_clients import close_client_from_other_loop
+from app.services.adaptive_batcher import AdaptiveBatcher, estimate_tokens
+from app.services.classification_cache import ClassificationCache, BINARY_MODEL_NAME
+from app.services.local_inference_service import LocalOnnxClassifier
+from app.services.micro_batcher import MicroBatcher
 
 # Cargar variables de entorno
 load_dotenv()
@@ -19,6 +33,9 @@ class BERTClassifier:
     Implementa un sistema de filtrado en cascada:
     1. Clasificación binaria (relevante/no relevante)
     2. Clasificación multiclase (categorías ISO 25010) - Soporte para múltiples modelos
+
+    Cada modelo puede ejecutarse localmente en CPU (ONNX Runtime, int8) según
+    el "backend" de MODEL_REGISTRY, con el endpoint remoto como respaldo.
     """
 
     def __init__(self, default_multiclass_model: str = DEFAULT_MULTICLASS_MODEL):
@@ -47,12 +64,162 @@ class BERTClassifier:
         # Obtener modelos disponibles
         self.available_models = get_available_multiclass_models()
 
+        # Lotes simultáneos por endpoint en filter_and_classify
+        self.max_concurrent_batches = max(1, int(os.getenv('HF_MAX_CONCURRENT_BATCHES', '4')))
+
+        # Headers comunes a todas las peticiones
+        self._headers = {
+            "Accept": "application/json",
+            "Authorization": f"Bearer {self.hf_token}",
+            "Content-Type": "application/json"
+        }
+
+        # Clientes HTTP con pool keep-alive, uno por endpoint. Se crean de forma
+        # perezosa y están ligados al event loop en el que se crearon.
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._clients_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Tamaño de lote adaptativo por endpoint (persiste entre peticiones)
+        self._batchers: Dict[str, AdaptiveBatcher] = {}
+
+        # Micro-batching de comentarios individuales (/classify-single): las
+        # peticiones concurrentes se agrupan hasta N comentarios o unos ms
+        self.micro_batch_size = max(1, int(os.getenv('MICRO_BATCH_MAX_SIZE', '32')))
+        self.micro_batch_wait = float(os.getenv('MICRO_BATCH_MAX_WAIT_MS', '10')) / 1000
+        self._micro_batchers: Dict[str, MicroBatcher] = {}
+
+        # Caché de predicciones por comentario (hash del texto + modelo)
+        self.cache = ClassificationCache()
+
+        # Modelos con backend local (ONNX Runtime en CPU); None si el modelo
+        # usa el endpoint remoto o no se pudo cargar
+        self._local_backends: Dict[str, Optional[LocalOnnxClassifier]] = {
+            model_name: self._load_local_backend(model_name)
+            for model_name in [BINARY_MODEL_NAME] + self.available_models
+        }
+
         print("✅ Cliente de Hugging Face configurado exitosamente")
         print(f"✅ Modelo multiclase por defecto: {default_multiclass_model}")
         print(f"✅ Modelos multiclase disponibles: {self.available_models}")
         print(f"✅ Categorías ISO 25010 disponibles: {self.categories}")
 
-    def _query_hf_endpoint(self, endpoint_url: str, texts: List[str]) -> List[Dict]:
+    def _load_local_backend(self, model_name: str) -> Optional[LocalOnnxClassifier]:
+        """
+        Carga el backend local de un modelo si está configurado en MODEL_REGISTRY.
+
+        Si el modelo usa el backend remoto, o si faltan el modelo ONNX o las
+        dependencias opcionales, el modelo se sirve desde el endpoint remoto.
+
+        Args:
+            model_name: "binary" o nombre del modelo multiclase
+
+        Returns:
+            Clasificador local o None si se usa el endpoint remoto
+        """
+        if get_model_backend(model_name) != InferenceBackend.LOCAL:
+            return None
+
+        config = get_local_model_config(model_name)
+        try:
+            backend = LocalOnnxClassifier(
+                path=config["path"],
+                labels=config["labels"],
+                onnx_file=config["onnx_file"],
+                max_length=config["max_length"],
+                intra_op_threads=config["intra_op_threads"],
+                id2label=config.get("id2label")
+            )
+            print(f"✅ Modelo '{model_name}' cargado para inferencia local (ONNX, CPU)")
+            set_active_backend(model_name, InferenceBackend.LOCAL)
+            return backend
+        except Exception as e:
+            print(f"⚠️ No se pudo cargar el modelo local '{model_name}': {e}")
+            print(f"⚠️ Usando endpoint remoto para '{model_name}'")
+            # Las predicciones se guardan con la generación del endpoint remoto
+            set_active_backend(model_name, InferenceBackend.REMOTE)
+            return None
+
+    def _get_client(self, endpoint_url: str) -> httpx.AsyncClient:
+        """
+        Obtiene el cliente HTTP (pool keep-alive, HTTP/2) de un endpoint.
+
+        Los límites del pool y los timeouts provienen de la sección "http" del
+        modelo en MODEL_REGISTRY.
+
+        Args:
+            endpoint_url: URL del endpoint de Hugging Face
+
+        Returns:
+            Cliente httpx asíncrono reutilizable
+        """
+        loop = asyncio.get_running_loop()
+        if self._clients_loop is not loop:
+            # Los clientes de otro event loop no se pueden reutilizar
+            for client in self._clients.values():
+                close_client_from_other_loop(client, self._clients_loop)
+            self._clients = {}
+            self._clients_loop = loop
+
+        client = self._clients.get(endpoint_url)
+        if client is None:
+            config = get_endpoint_http_config(endpoint_url)
+            client = httpx.AsyncClient(
+                headers=self._headers,
+                http2=config["http2"],
+                limits=httpx.Limits(
+                    max_connections=config["max_connections"],
+                    max_keepalive_connections=config["max_keepalive_connections"],
+                    keepalive_expiry=config["keepalive_expiry"]
+                ),
+                timeout=httpx.Timeout(
+                    config["read_timeout"],
+                    connect=config["connect_timeout"],
+                    pool=config["pool_timeout"]
+                )
+            )
+            self._clients[endpoint_url] = client
+        return client
+
+    def _get_batcher(self, endpoint_url: str) -> AdaptiveBatcher:
+        """
+        Obtiene el batcher adaptativo de un endpoint.
+
+        Args:
+            endpoint_url: URL del endpoint de Hugging Face
+
+        Returns:
+            AdaptiveBatcher configurado desde MODEL_REGISTRY
+        """
+        batcher = self._batchers.get(endpoint_url)
+        if batcher is None:
+            batcher = AdaptiveBatcher.from_config(get_endpoint_batching_config(endpoint_url))
+            self._batchers[endpoint_url] = batcher
+        return batcher
+
+    def get_batching_stats(self) -> Dict[str, Dict]:
+        """
+        Obtiene el estado de los lotes adaptativos de cada modelo usado.
+
+        Returns:
+            Diccionario {modelo: estadísticas del batcher}
+        """
+        endpoints = {"binary": self.binary_endpoint}
+        for model_name in self.available_models:
+            endpoints[model_name] = get_multiclass_endpoint(model_name)
+        return {
+            name: self._batchers[endpoint].get_stats()
+            for name, endpoint in endpoints.items()
+            if endpoint in self._batchers
+        }
+
+    async def aclose(self):
+        """Cierra los clientes HTTP y sus conexiones keep-alive."""
+        clients = list(self._clients.values())
+        self._clients = {}
+        for client in clients:
+            await client.aclose()
+
+    async def _query_hf_endpoint(self, endpoint_url: str, texts: List[str]) -> List[Dict]:
         """
         Realiza una consulta al endpoint de Hugging Face.
 
@@ -63,12 +230,6 @@ class BERTClassifier:
         Returns:
             Respuesta del modelo en formato JSON
         """
-        headers = {
-            "Accept": "application/json",
-            "Authorization": f"Bearer {self.hf_token}",
-            "Content-Type": "application/json"
-        }
-
         # Hugging Face espera el input en este formato
         payload = {
             "inputs": texts,
@@ -76,20 +237,98 @@ class BERTClassifier:
         }
 
         try:
-            response = requests.post(endpoint_url, headers=headers, json=payload)
+            start = time.perf_counter()
+            response = await self._get_client(endpoint_url).post(endpoint_url, json=payload)
             response.raise_for_status()
-            return response.json()
+            results = response.json()
 
-        except requests.exceptions.RequestException as e:
+            # Registrar latencia y tamaño del lote para ajustar el siguiente
+            self._get_batcher(endpoint_url).record_success(
+                len(texts),
+                sum(estimate_tokens(text) for text in texts),
+                time.perf_counter() - start
+            )
+            return results
+
+        except httpx.HTTPError as e:
             print(f"❌ Error al consultar endpoint de Hugging Face: {e}")
             raise
 
-    def classify_binary(self, texts: List[str]) -> List[bool]:
+    async def _query_with_split(self, endpoint_url: str, texts: List[str]) -> List[Dict]:
+        """
+        Consulta el endpoint dividiendo el lote si el endpoint está sobrecargado.
+
+        Ante HTTP 413, 5xx o timeout el lote se divide en dos mitades que se
+        reintentan por separado, en lugar de descartar todo el lote. Si un
+        comentario individual sigue fallando, su posición se devuelve como None.
+
+        Args:
+            endpoint_url: URL del endpoint de Hugging Face
+            texts: Lista de textos a clasificar
+
+        Returns:
+            Respuesta del modelo en formato JSON, en el mismo orden que texts
+            (None para los comentarios que no se pudieron clasificar)
+        """
+        try:
+            return await self._query_hf_endpoint(endpoint_url, texts)
+        except (httpx.HTTPStatusError, httpx.TimeoutException) as e:
+            too_large = isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 413
+            overloaded = (
+                too_large
+                or isinstance(e, httpx.TimeoutException)
+                or e.response.status_code >= 500
+            )
+            if not overloaded:
+                raise
+
+            self._get_batcher(endpoint_url).record_failure(len(texts), payload_too_large=too_large)
+            if len(texts) <= 1:
+                print(f"❌ No se pudo clasificar el comentario tras dividir el lote: {e}")
+                return [None]
+
+            middle = len(texts) // 2
+            print(f"⚠️ Dividiendo lote de {len(texts)} comentarios en {middle} + {len(texts) - middle}")
+            first = await self._query_with_split(endpoint_url, texts[:middle])
+            second = await self._query_with_split(endpoint_url, texts[middle:])
+            return first + second
+
+    async def _query_model(self, model_name: str, endpoint_url: str, texts: List[str]) -> List[Dict]:
+        """
+        Clasifica un lote con el backend configurado para el modelo.
+
+        Con backend local la inferencia se ejecuta en el pool de clasificación;
+        si falla, o si el modelo usa el backend remoto, se consulta el endpoint
+        de Hugging Face.
+
+        Args:
+            model_name: "binary" o nombre del modelo multiclase
+            endpoint_url: URL del endpoint remoto del modelo
+            texts: Lista de textos a clasificar
+
+        Returns:
+            Predicciones {"label", "score"} en el mismo orden que texts
+            (None para los comentarios que no se pudieron clasificar)
+        """
+        backend = self._local_backends.get(model_name)
+        if backend is not None:
+            try:
+                return await run_in_stage(Stage.CLASSIFICATION, backend.predict, texts)
+            except Exception as e:
+                print(f"⚠️ Error en inferencia local de '{model_name}', usando endpoint remoto: {e}")
+
+        return await self._query_with_split(endpoint_url, texts)
+
+    async def classify_binary(self, texts: List[str], cache_lookup: bool = True) -> List[bool]:
         """
         Clasifica textos usando el modelo binario de Hugging Face.
 
+        Solo los comentarios que no están en la caché por comentario se envían
+        al endpoint; las predicciones nuevas se guardan en la caché.
+
         Args:
             texts: Lista de comentarios a clasificar
+            cache_lookup: Si es False, no consulta la caché (el llamador ya lo hizo)
 
         Returns:
             Lista de booleanos indicando si cada comentario es relevante (True) o no (False)
@@ -97,44 +336,63 @@ class BERTClassifier:
         if not texts:
             return []
 
+        predictions = await self.cache.get_binary(texts) if cache_lookup else [None] * len(texts)
+        missing = [i for i, prediction in enumerate(predictions) if prediction is None]
+        if not missing:
+            return predictions
+
         try:
-            # Consultar endpoint de Hugging Face
-            results = self._query_hf_endpoint(self.binary_endpoint, texts)
+            # Consultar modelo (local o endpoint de Hugging Face)
+            results = await self._query_model(
+                BINARY_MODEL_NAME, self.binary_endpoint, [texts[i] for i in missing]
+            )
 
             # Procesar respuesta del modelo
             # Formato: [{"label": "relevante", "score": 0.998}] o [{"label": "no_relevante", "score": 0.998}]
             # Hugging Face devuelve solo la predicción principal (mayor score)
-            predictions = []
+            new_predictions = {}
+
+            for index, result in zip(missing, results):
+                # Comentario que falló incluso en un lote individual
+                if result is None:
+                    predictions[index] = False
+                    continue
 
-            for result in results:
                 # Cada resultado es ya la predicción con mayor score
                 label = result['label']
 
                 # Convertir a booleano
                 # El modelo devuelve "relevante" o "no_relevante"
                 is_relevant = label.lower() == "relevante"
-                predictions.append(is_relevant)
+                predictions[index] = is_relevant
+                new_predictions[texts[index]] = is_relevant
 
+            await self.cache.set_binary(new_predictions)
             return predictions
 
         except Exception as e:
             print(f"❌ Error en clasificación binaria: {e}")
             import traceback
             traceback.print_exc()
-            return [False] * len(texts)
+            return [prediction if prediction is not None else False for prediction in predictions]
 
-    def classify_multiclass(
+    async def classify_multiclass(
         self,
         texts: List[str],
-        model_name: Optional[str] = None
+        model_name: Optional[str] = None,
+        cache_lookup: bool = True
     ) -> List[Tuple[str, float]]:
         """
         Clasifica textos usando el modelo multiclase de Hugging Face.
 
+        Solo los comentarios que no están en la caché por comentario se envían
+        al endpoint; las predicciones nuevas se guardan en la caché.
+
         Args:
             texts: Lista de comentarios a clasificar
             model_name: Nombre del modelo a usar (beto, robertuito, etc.).
                        Si es None, usa el modelo por defecto.
+            cache_lookup: Si es False, no consulta la caché (el llamador ya lo hizo)
 
         Returns:
             Lista de tuplas (categoría, confianza) para cada comentario
@@ -142,57 +400,150 @@ class BERTClassifier:
         if not texts:
             return []
 
-        try:
-            # Determinar qué modelo usar
-            if model_name is None:
-                model_name = self.default_multiclass_model
+        # Determinar qué modelo usar (los enums se reducen a su nombre en minúsculas)
+        if model_name is None:
+            model_name = self.default_multiclass_model
+        model_name = model_name.lower()
+
+        predictions = await self.cache.get_multiclass(model_name, texts) if cache_lookup else [None] * len(texts)
+        missing = [i for i, prediction in enumerate(predictions) if prediction is None]
+        if not missing:
+            return predictions
 
+        try:
             # Obtener endpoint del modelo seleccionado
             endpoint = get_multiclass_endpoint(model_name)
 
             print(f"📊 Usando modelo multiclase: {model_name}")
 
-            # Consultar endpoint de Hugging Face
-            results = self._query_hf_endpoint(endpoint, texts)
+            # Consultar modelo (local o endpoint de Hugging Face)
+            results = await self._query_model(model_name, endpoint, [texts[i] for i in missing])
 
             # Procesar respuesta del modelo
             # Formato: [{"label": "autenticidad", "score": 0.994}]
             # Hugging Face devuelve solo la predicción principal (mayor score)
-            predictions = []
+            new_predictions = {}
+
+            for index, result in zip(missing, results):
+                # Comentario que falló incluso en un lote individual
+                if result is None:
+                    predictions[index] = ("error", 0.0)
+                    continue
 
-            for result in results:
                 # Cada resultado es ya la predicción con mayor score
                 category = result['label']
                 score = result['score']
 
                 # El modelo ya devuelve las categorías legibles directamente
                 # (autenticidad, confidencialidad, integridad, no_repudio, resistencia, responsabilidad)
-                predictions.append((category, score))
+                predictions[index] = (category, score)
+                new_predictions[texts[index]] = (category, score)
 
+            await self.cache.set_multiclass(model_name, new_predictions)
             return predictions
 
         except Exception as e:
             print(f"❌ Error en clasificación multiclase: {e}")
             import traceback
             traceback.print_exc()
-            return [("error", 0.0)] * len(texts)
+            return [prediction if prediction is not None else ("error", 0.0) for prediction in predictions]
+
+    def _get_micro_batcher(self, model_name: str) -> MicroBatcher:
+        """
+        Obtiene el micro-batcher de comentarios individuales de un modelo.
+
+        Args:
+            model_name: "binary" o nombre del modelo multiclase
+
+        Returns:
+            MicroBatcher que clasifica los lotes con classify_binary o classify_multiclass
+        """
+        micro_batcher = self._micro_batchers.get(model_name)
+        if micro_batcher is None:
+            if model_name == BINARY_MODEL_NAME:
+                process_batch = self.classify_binary
+            else:
+                async def process_batch(texts: List[str]) -> List[Tuple[str, float]]:
+                    return await self.classify_multiclass(texts, model_name=model_name)
+
+            micro_batcher = MicroBatcher(
+                process_batch,
+                max_batch_size=self.micro_batch_size,
+                max_wait=self.micro_batch_wait
+            )
+            self._micro_batchers[model_name] = micro_batcher
+        return micro_batcher
+
+    async def classify_binary_single(self, text: str) -> bool:
+        """
+        Clasifica un comentario con el modelo binario, agrupándolo con otras
+        peticiones concurrentes en un solo lote.
+
+        Args:
+            text: Comentario a clasificar
+
+        Returns:
+            True si el comentario es relevante
+        """
+        return await self._get_micro_batcher(BINARY_MODEL_NAME).submit(text)
 
-    def filter_and_classify(
+    async def classify_multiclass_single(self, text: str, model_name: Optional[str] = None) -> Tuple[str, float]:
+        """
+        Clasifica un comentario con el modelo multiclase, agrupándolo con otras
+        peticiones concurrentes del mismo modelo en un solo lote.
+
+        Args:
+            text: Comentario a clasificar
+            model_name: Nombre del modelo a usar. Si es None, usa el modelo por defecto.
+
+        Returns:
+            Tupla (categoría, confianza)
+        """
+        if model_name is None:
+            model_name = self.default_multiclass_model
+        return await self._get_micro_batcher(model_name.lower()).submit(text)
+
+    def get_micro_batching_stats(self) -> Dict[str, Dict]:
+        """
+        Obtiene las estadísticas de micro-batching de cada modelo usado.
+
+        Returns:
+            Diccionario {modelo: estadísticas del micro-batcher}
+        """
+        return {name: batcher.get_stats() for name, batcher in self._micro_batchers.items()}
+
+    async def filter_and_classify(
         self,
         reviews: List[Dict],
-        batch_size: int = 32,
-        multiclass_model: Optional[str] = None
+        batch_size: Optional[int] = None,
+        multiclass_model: Optional[str] = None,
+        on_batch: Optional[Callable[[str, int, int, List[Dict]], None]] = None,
+        max_concurrency: Optional[int] = None,
+        stats: Optional[Dict] = None
     ) -> List[Dict]:
         """
         Aplica el filtrado en cascada:
         1. Filtra comentarios relevantes usando modelo binario
         2. Clasifica comentarios relevantes usando modelo multiclase
 
+        Hasta `max_concurrency` lotes por endpoint se envían en paralelo. La
+        clasificación multiclase arranca en cuanto se acumula un lote de
+        comentarios relevantes, sin esperar a que termine el filtro binario.
+        Los comentarios presentes en la caché por comentario se resuelven antes
+        de formar los lotes, de modo que solo los fallos de caché se envían a
+        Hugging Face. El resultado conserva el orden original de los reviews.
+
         Args:
             reviews: Lista de diccionarios con información de reviews
-            batch_size: Tamaño de lote para procesamiento por lotes
+            batch_size: Tamaño de lote fijo. Si es None, el tamaño se adapta por
+                        endpoint según la latencia observada (AdaptiveBatcher).
             multiclass_model: Nombre del modelo multiclase a usar (beto, robertuito, etc.).
                             Si es None, usa el modelo por defecto.
+            on_batch: Callback opcional invocado tras cada lote con
+                      (etapa 'binary'|'multiclass', procesados, total, reviews clasificados del lote)
+            max_concurrency: Lotes simultáneos por endpoint. Si es None, usa
+                            self.max_concurrent_batches.
+            stats: Diccionario opcional donde se registran los aciertos de caché
 
         Returns:
             Lista de reviews relevantes con su clasificación multiclase
@@ -200,52 +551,146 @@ class BERTClassifier:
         if not reviews:
             return []
 
-        print(f"\n🔍 Iniciando filtrado en cascada para {len(reviews)} comentarios")
+        if max_concurrency is None:
+            max_concurrency = self.max_concurrent_batches
+        if multiclass_model is None:
+            multiclass_model = self.default_multiclass_model
+        multiclass_model = multiclass_model.lower()
+        multiclass_semaphore = asyncio.Semaphore(max_concurrency)
 
-        # Paso 1: Clasificación binaria
-        print("📊 Paso 1: Clasificación binaria (relevante/no relevante)")
-        all_texts = [review['comentario'] for review in reviews]
+        binary_batcher = self._get_batcher(self.binary_endpoint)
+        multiclass_batcher = self._get_batcher(get_multiclass_endpoint(multiclass_model))
 
-        # Procesar en lotes para eficiencia
-        binary_results = []
-        for i in range(0, len(all_texts), batch_size):
-            batch_texts = all_texts[i:i + batch_size]
-            batch_results = self.classify_binary(batch_texts)
-            binary_results.extend(batch_results)
-            print(f"  Procesados {min(i + batch_size, len(all_texts))}/{len(all_texts)} comentarios")
+        def next_batch_length(texts: List[str], batcher: AdaptiveBatcher) -> int:
+            if batch_size is not None:
+                return min(batch_size, len(texts))
+            return batcher.take(texts)
 
-        # Filtrar solo comentarios relevantes
-        relevant_reviews = [
-            review for review, is_relevant in zip(reviews, binary_results)
-            if is_relevant
-        ]
+        def full_batch_size(batcher: AdaptiveBatcher) -> int:
+            return batch_size if batch_size is not None else batcher.batch_size
 
-        print(f"✅ Comentarios relevantes: {len(relevant_reviews)}/{len(reviews)} "
-              f"({len(relevant_reviews)/len(reviews)*100:.1f}%)")
+        print(f"\n🔍 Iniciando filtrado en cascada para {len(reviews)} comentarios "
+              f"(hasta {max_concurrency} lotes en paralelo, "
+              f"lote {'fijo de ' + str(batch_size) if batch_size is not None else 'adaptativo'})")
+        print("📊 Paso 1: Clasificación binaria (relevante/no relevante)")
+        print("📊 Paso 2: Clasificación multiclase (categorías ISO 25010)")
 
-        if not relevant_reviews:
+        # Estado compartido entre los lotes en vuelo
+        all_texts = [review['comentario'] for review in reviews]
+        total = len(reviews)
+        pending_relevant: List[int] = []  # Índices relevantes aún sin lote multiclase
+        classified_by_index: Dict[int, Dict] = {}
+        multiclass_tasks: List[asyncio.Task] = []
+
+        def add_classifications(indices: List[int], results: List[Tuple[str, float]]) -> List[Dict]:
+            batch_classified = []
+            for index, (category, confidence) in zip(indices, results):
+                review_with_classification = reviews[index].copy()
+                review_with_classification['categoria'] = category
+                review_with_classification['confianza'] = round(confidence, 4)
+                classified_by_index[index] = review_with_classification
+                batch_classified.append(review_with_classification)
+            return batch_classified
+
+        # Resolver desde la caché por comentario antes de formar los lotes
+        cached_binary = await self.cache.get_binary(all_texts)
+        binary_queue = [i for i, prediction in enumerate(cached_binary) if prediction is None]
+        cached_relevant = [i for i, prediction in enumerate(cached_binary) if prediction]
+        binary_done = total - len(binary_queue)
+        relevant_count = len(cached_relevant)
+
+        cached_multiclass = await self.cache.get_multiclass(
+            multiclass_model, [all_texts[i] for i in cached_relevant]
+        )
+        hit_indices = []
+        hit_results = []
+        for index, prediction in zip(cached_relevant, cached_multiclass):
+            if prediction is None:
+                pending_relevant.append(index)
+            else:
+                hit_indices.append(index)
+                hit_results.append(prediction)
+        cached_classified = add_classifications(hit_indices, hit_results)
+
+        print(f"⚡ Caché por comentario: {binary_done}/{total} binarios, "
+              f"{len(cached_classified)}/{relevant_count} multiclase")
+        if stats is not None:
+            stats['cache_binario'] = binary_done
+            stats['cache_multiclase'] = len(cached_classified)
+        if on_batch and binary_done:
+            on_batch('binary', binary_done, total, [])
+        if on_batch and cached_classified:
+            on_batch('multiclass', len(classified_by_index), relevant_count, cached_classified)
+
+        async def run_multiclass_batch(indices: List[int]):
+            async with multiclass_semaphore:
+                batch_texts = [all_texts[i] for i in indices]
+                batch_results = await self.classify_multiclass(
+                    batch_texts, model_name=multiclass_model, cache_lookup=False
+                )
+
+            batch_classified = add_classifications(indices, batch_results)
+
+            print(f"  Clasificados {len(classified_by_index)}/{relevant_count} comentarios relevantes")
+            if on_batch:
+                on_batch('multiclass', len(classified_by_index), relevant_count, batch_classified)
+
+        def dispatch_multiclass(flush: bool = False):
+            # Lanza lotes multiclase completos (o el resto si flush=True)
+            while pending_relevant:
+                candidates = [all_texts[i] for i in pending_relevant[:multiclass_batcher.max_size]]
+                length = next_batch_length(candidates, multiclass_batcher)
+                is_full = length < len(pending_relevant) or len(pending_relevant) >= full_batch_size(multiclass_batcher)
+                if not (is_full or flush):
+                    return
+                indices = pending_relevant[:length]
+                del pending_relevant[:length]
+                multiclass_tasks.append(asyncio.create_task(run_multiclass_batch(indices)))
+
+        next_position = 0
+
+        async def binary_worker():
+            # Cada worker toma el siguiente lote de fallos de caché hasta agotarlos
+            nonlocal next_position, binary_done, relevant_count
+            while next_position < len(binary_queue):
+                start = next_position
+                candidates = [all_texts[i] for i in binary_queue[start:start + binary_batcher.max_size]]
+                length = next_batch_length(candidates, binary_batcher)
+                next_position = start + length
+                indices = binary_queue[start:start + length]
+
+                batch_results = await self.classify_binary(
+                    [all_texts[i] for i in indices], cache_lookup=False
+                )
+
+                binary_done += len(indices)
+                relevant = [i for i, is_relevant in zip(indices, batch_results) if is_relevant]
+                relevant_count += len(relevant)
+                pending_relevant.extend(relevant)
+                print(f"  Procesados {binary_done}/{total} comentarios")
+                if on_batch:
+                    on_batch('binary', binary_done, total, [])
+                dispatch_multiclass()
+
+        dispatch_multiclass()
+        try:
+            await asyncio.gather(*(binary_worker() for _ in range(max_concurrency)))
+            dispatch_multiclass(flush=True)
+            await asyncio.gather(*multiclass_tasks)
+        finally:
+            for task in multiclass_tasks:
+                if not task.done():
+                    task.cancel()
+
+        print(f"✅ Comentarios relevantes: {relevant_count}/{total} "
+              f"({relevant_count/total*100:.1f}%)")
+
+        if not classified_by_index:
             print("⚠️ No hay comentarios relevantes después del filtro binario")
             return []
 
-        # Paso 2: Clasificación multiclase
-        print("📊 Paso 2: Clasificación multiclase (categorías ISO 25010)")
-        relevant_texts = [review['comentario'] for review in relevant_reviews]
-
-        # Procesar en lotes
-        multiclass_results = []
-        for i in range(0, len(relevant_texts), batch_size):
-            batch_texts = relevant_texts[i:i + batch_size]
-            batch_results = self.classify_multiclass(batch_texts, model_name=multiclass_model)
-            multiclass_results.extend(batch_results)
-            print(f"  Clasificados {min(i + batch_size, len(relevant_texts))}/{len(relevant_texts)} comentarios")
-
-        # Agregar clasificación a los reviews
-        classified_reviews = []
-        for review, (category, confidence) in zip(relevant_reviews, multiclass_results):
-            review_with_classification = review.copy()
-            review_with_classification['categoria'] = category
-            review_with_classification['confianza'] = round(confidence, 4)
-            classified_reviews.append(review_with_classification)
+        # Reensamblar en el orden original
+        classified_reviews = [classified_by_index[i] for i in sorted(classified_by_index)]
 
         # Estadísticas de categorías
         category_counts = {}
@@ -261,6 +706,69 @@ class BERTClassifier:
 
         return classified_reviews
 
+    async def classify_stream(
+        self,
+        pages: AsyncIterable[List[Dict]],
+        multiclass_model: Optional[str] = None,
+        on_batch: Optional[Callable[[str, int, int, List[Dict]], None]] = None,
+        stats: Optional[Dict] = None,
+        max_relevant: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Aplica filter_and_classify a un flujo de páginas de comentarios.
+
+        Cada página se clasifica en cuanto llega, mientras el productor (p. ej.
+        un ReviewPageStream) descarga la siguiente, de modo que el tiempo de
+        scraping y el de inferencia se solapan. Los contadores de on_batch son
+        acumulados sobre todas las páginas.
+
+        Args:
+            pages: Iterable asíncrono de listas de reviews
+            multiclass_model: Nombre del modelo multiclase a usar
+            on_batch: Callback de progreso (ver filter_and_classify)
+            stats: Diccionario opcional donde se suman los aciertos de caché
+            max_relevant: Si se indica, deja de consumir (y cierra el flujo)
+                          al reunir este número de comentarios relevantes
+
+        Returns:
+            Lista de reviews relevantes clasificados, en orden de llegada
+            (como máximo max_relevant)
+        """
+        classified_reviews: List[Dict] = []
+        offsets = {'binary': [0, 0], 'multiclass': [0, 0]}
+
+        def page_on_batch(etapa: str, procesados: int, total: int, clasificados: List[Dict]):
+            base_procesados, base_total = offsets[etapa]
+            on_batch(etapa, base_procesados + procesados, base_total + total, clasificados)
+
+        async for page in pages:
+            page_stats = {}
+            page_classified = await self.filter_and_classify(
+                reviews=page,
+                multiclass_model=multiclass_model,
+                on_batch=page_on_batch if on_batch else None,
+                stats=page_stats
+            )
+            classified_reviews.extend(page_classified)
+            offsets['binary'][0] += len(page)
+            offsets['binary'][1] += len(page)
+            offsets['multiclass'][0] += len(page_classified)
+            offsets['multiclass'][1] += len(page_classified)
+            if stats is not None:
+                for key, value in page_stats.items():
+                    stats[key] = stats.get(key, 0) + value
+
+            if max_relevant and len(classified_reviews) >= max_relevant:
+                print(f"🎯 Objetivo de {max_relevant} comentarios relevantes alcanzado")
+                aclose = getattr(pages, 'aclose', None)
+                if aclose:
+                    await aclose()
+                break
+
+        if max_relevant:
+            classified_reviews = classified_reviews[:max_relevant]
+        return classified_reviews
+
 
 # Singleton para evitar cargar los modelos múltiples veces
 _classifier_instance = None
@@ -275,3 +783,8 @@ def get_bert_classifier() -> BERTClassifier:
         print("🚀 Inicializando BERTClassifier (primera vez)...")
         _classifier_instance = BERTClassifier()
     return _classifier_instance
+
+async def close_bert_classifier():
+    """Cierra las conexiones HTTP del clasificador si fue inicializado."""
+    if _classifier_instance is not None:
+        await _classifier_instance.aclose()
@@ -0,0 +1,143 @@
+"""
+Caché por comentario de los resultados de clasificación.
+
+Cada resultado binario o multiclase se guarda bajo una clave derivada del
+hash del texto normalizado y del nombre del modelo en MODEL_REGISTRY, de modo
+que un comentario ya clasificado no vuelve a enviarse a Hugging Face aunque
+cambien los parámetros de la petición (max_reviews, criterio, etc.).
+
+Las claves incluyen la generación del modelo en MODEL_REGISTRY y el número de
+generación del namespace en Redis, así que desplegar un modelo nuevo (o
+invalidar el namespace) descarta solo las predicciones de ese modelo.
+"""
+import hashlib
+import os
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+from app.core.redis_client import get_redis_client
+from app.core.model_config import get_model_generation, DEFAULT_MULTICLASS_MODEL
+
+# TTL de los resultados por comentario (7 días por defecto)
+CLASSIFICATION_CACHE_TTL = int(os.getenv('CLASSIFICATION_CACHE_TTL', str(7 * 24 * 3600)))
+
+# Nombre del modelo binario en MODEL_REGISTRY
+BINARY_MODEL_NAME = "binary"
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def get_models_generation(multiclass_model: Optional[str] = None) -> Dict[str, str]:
+    """
+    Obtiene la generación de los modelos usados por una petición, para
+    incluirla en las cache keys de resultados que dependen de ellos.
+
+    Args:
+        multiclass_model: Modelo multiclase de la petición (None = por defecto)
+
+    Returns:
+        Diccionario {modelo: generación}
+    """
+    model_name = (multiclass_model or DEFAULT_MULTICLASS_MODEL).lower()
+    return {
+        BINARY_MODEL_NAME: get_model_generation(BINARY_MODEL_NAME),
+        model_name: get_model_generation(model_name)
+    }
+
+
+def normalize_comment(text: str) -> str:
+    """
+    Normaliza un comentario para que variaciones triviales compartan resultado.
+
+    Los modelos son uncased, así que se aplica NFC, minúsculas y se colapsan
+    los espacios en blanco.
+
+    Args:
+        text: Texto del comentario
+
+    Returns:
+        Texto normalizado
+    """
+    text = unicodedata.normalize('NFC', text or '')
+    return _WHITESPACE_RE.sub(' ', text).strip().lower()
+
+
+class ClassificationCache:
+    """
+    Caché content-addressed de predicciones binarias y multiclase.
+    """
+
+    KEY_PREFIX = "clf"
+
+    def __init__(self, ttl: int = CLASSIFICATION_CACHE_TTL):
+        self.ttl = ttl
+        self.redis_client = get_redis_client()
+
+    async def _prefix(self, model_name: str) -> str:
+        # Ej: clf:beto:v0:1.61d0a746 (generación del namespace y del modelo)
+        namespace = await self.redis_client.versioned_prefix(f"{self.KEY_PREFIX}:{model_name}")
+        return f"{namespace}:{get_model_generation(model_name)}"
+
+    @staticmethod
+    def _key(prefix: str, text: str) -> str:
+        digest = hashlib.sha256(normalize_comment(text).encode('utf-8')).hexdigest()[:32]
+        return f"{prefix}:{digest}"
+
+    async def get_binary(self, texts: List[str]) -> List[Optional[bool]]:
+        """
+        Busca predicciones binarias en caché.
+
+        Args:
+            texts: Comentarios a buscar
+
+        Returns:
+            Lista con True/False (relevante o no) o None si no está en caché
+        """
+        prefix = await self._prefix(BINARY_MODEL_NAME)
+        cached = await self.redis_client.get_many([self._key(prefix, t) for t in texts])
+        return [entry['relevante'] if entry else None for entry in cached]
+
+    async def set_binary(self, predictions: Dict[str, bool]):
+        """
+        Guarda predicciones binarias.
+
+        Args:
+            predictions: Diccionario {comentario: es_relevante}
+        """
+        prefix = await self._prefix(BINARY_MODEL_NAME)
+        await self.redis_client.set_many(
+            {self._key(prefix, text): {"relevante": value} for text, value in predictions.items()},
+            ttl=self.ttl
+        )
+
+    async def get_multiclass(self, model_name: str, texts: List[str]) -> List[Optional[Tuple[str, float]]]:
+        """
+        Busca predicciones multiclase en caché.
+
+        Args:
+            model_name: Nombre del modelo multiclase (beto, robertuito, etc.)
+            texts: Comentarios a buscar
+
+        Returns:
+            Lista con (categoría, confianza) o None si no está en caché
+        """
+        prefix = await self._prefix(model_name)
+        cached = await self.redis_client.get_many([self._key(prefix, t) for t in texts])
+        return [(entry['categoria'], entry['confianza']) if entry else None for entry in cached]
+
+    async def set_multiclass(self, model_name: str, predictions: Dict[str, Tuple[str, float]]):
+        """
+        Guarda predicciones multiclase.
+
+        Args:
+            model_name: Nombre del modelo multiclase
+            predictions: Diccionario {comentario: (categoría, confianza)}
+        """
+        prefix = await self._prefix(model_name)
+        await self.redis_client.set_many(
+            {
+                self._key(prefix, text): {"categoria": category, "confianza": confidence}
+                for text, (category, confidence) in predictions.items()
+            },
+            ttl=self.ttl
+        )
@@ -0,0 +1,218 @@
+"""
+Condensación de comentarios antes de construir el prompt del LLM.
+
+Agrupa los comentarios casi idénticos de cada categoría con TF-IDF (solo CPU,
+sin dependencias externas) y clustering por líder con similitud coseno. El
+prompt lleva un representante por grupo con el número de comentarios y la
+confianza media, en lugar de todos los comentarios textuales.
+
+El umbral de similitud se elige automáticamente: se prueba de más estricto a
+más laxo hasta que el bloque de comentarios cabe en el presupuesto de tokens
+de la petición. Si ni con el umbral más laxo cabe, se omiten los grupos más
+pequeños, conservando siempre el mayor grupo de cada categoría.
+"""
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Tuple
+from dotenv import load_dotenv
+from app.services.token_budget import count_tokens
+
+load_dotenv()
+
+DEFAULT_CONDENSER_CONFIG = {
+    "enabled": os.getenv('REQUIREMENTS_CONDENSE', 'true').lower() == 'true',
+    # Tokens máximos del bloque de comentarios en cada prompt
+    "token_budget": int(os.getenv('REQUIREMENTS_PROMPT_TOKEN_BUDGET', '12000')),
+}
+
+# Umbrales de similitud coseno, del más estricto (casi idénticos) al más laxo
+SIMILARITY_THRESHOLDS = (0.9, 0.8, 0.7, 0.6, 0.5, 0.4, 0.3)
+
+# Tokens que ocupa cada línea del prompt además del texto del comentario
+LINE_OVERHEAD_TOKENS = 20
+
+STOPWORDS = {
+    "de", "la", "que", "el", "en", "y", "a", "los", "se", "del", "las", "un", "por", "con", "una",
+    "su", "para", "es", "al", "lo", "como", "mas", "o", "pero", "sus", "le", "ya", "me", "mi",
+    "si", "ni", "te", "tu", "nos", "muy", "esta", "este", "eso", "esto", "hay", "son", "fue",
+}
+
+
+def _tokenize(text: str) -> List[str]:
+    """Palabras normalizadas (minúsculas, sin tildes ni stopwords) y bigramas."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    words = [w for w in re.findall(r"\w+", text) if len(w) > 1 and w not in STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _tfidf_vectors(texts: List[str]) -> List[Dict[str, float]]:
+    """Vectores TF-IDF dispersos (tf sublineal) normalizados a norma 1."""
+    docs = [Counter(_tokenize(t)) for t in texts]
+    df = Counter(term for doc in docs for term in doc)
+    n = len(docs)
+    vectors = []
+    for doc in docs:
+        vector = {
+            term: (1 + math.log(tf)) * (math.log((1 + n) / (1 + df[term])) + 1)
+            for term, tf in doc.items()
+        }
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        vectors.append({term: w / norm for term, w in vector.items()})
+    return vectors
+
+
+def _cluster(vectors: List[Dict[str, float]], threshold: float) -> List[List[int]]:
+    """
+    Clustering por líder: cada vector se une al grupo cuyo líder es más
+    similar (si supera el umbral) o abre un grupo nuevo.
+
+    Los candidatos salen de un índice invertido término -> líderes, pero solo
+    se consultan los términos de mayor peso del vector hasta que la norma de
+    los restantes queda por debajo del umbral: un líder que no comparte
+    ninguno de ellos no puede alcanzar el umbral (filtrado por prefijo).
+    """
+    clusters: List[List[int]] = []
+    leaders: List[Dict[str, float]] = []
+    index: Dict[str, List[int]] = {}
+    for i, vector in enumerate(vectors):
+        terms = sorted(vector, key=vector.get, reverse=True)
+        residual = sum(w * w for w in vector.values())
+        candidates = set()
+        for term in terms:
+            if residual < threshold * threshold:
+                break
+            candidates.update(index.get(term, ()))
+            residual -= vector[term] * vector[term]
+
+        best, best_score = None, threshold
+        for cluster_id in candidates:
+            leader = leaders[cluster_id]
+            score = sum(w * leader.get(t, 0.0) for t, w in vector.items())
+            if score >= best_score:
+                best, best_score = cluster_id, score
+        if best is not None:
+            clusters[best].append(i)
+        else:
+            for term in vector:
+                index.setdefault(term, []).append(len(clusters))
+            leaders.append(vector)
+            clusters.append([i])
+    return clusters
+
+
+def _centroid(members: List[int], vectors: List[Dict[str, float]]) -> Dict[str, float]:
+    """Centroide normalizado de un grupo."""
+    centroid: Dict[str, float] = {}
+    for i in members:
+        for term, weight in vectors[i].items():
+            centroid[term] = centroid.get(term, 0.0) + weight
+    norm = math.sqrt(sum(w * w for w in centroid.values())) or 1.0
+    return {term: w / norm for term, w in centroid.items()}
+
+
+def _representative(members: List[int], vectors: List[Dict[str, float]]) -> int:
+    """Miembro más cercano al centroide del grupo."""
+    if len(members) == 1:
+        return members[0]
+    centroid = _centroid(members, vectors)
+    return max(members, key=lambda i: sum(w * centroid.get(t, 0.0) for t, w in vectors[i].items()))
+
+
+def _summarize(items: List[Dict], members: List[int], representative: int) -> Dict:
+    grupo = [items[i] for i in members]
+    return {
+        'comentario': items[representative]['comentario'],
+        'categoria': items[representative]['categoria'],
+        'confianza': sum(c['confianza'] for c in grupo) / len(grupo),
+        'calificacion': round(sum(c['calificacion'] for c in grupo) / len(grupo), 1),
+        'cantidad': len(grupo)
+    }
+
+
+def _block_tokens(grupos: List[Dict]) -> int:
+    return count_tokens('\n'.join(g['comentario'] for g in grupos)) + LINE_OVERHEAD_TOKENS * len(grupos)
+
+
+def condense_comments(comentarios_clasificados: List[Dict], token_budget: int) -> Tuple[List[Dict], Dict]:
+    """
+    Condensa los comentarios para que el bloque del prompt quepa en
+    token_budget.
+
+    Args:
+        comentarios_clasificados: Comentarios con comentario, categoria, confianza y calificacion
+        token_budget: Tokens máximos para el bloque de comentarios
+
+    Returns:
+        Tupla (grupos, estadísticas). Cada grupo tiene comentario
+        (representante), categoria, confianza media, calificacion media y
+        cantidad; los grupos van de mayor a menor dentro de cada categoría.
+    """
+    items = list(comentarios_clasificados)
+    stats = {
+        "comentarios": len(items),
+        "grupos": len(items),
+        "umbral": None,
+        "omitidos": 0,
+        "tokens_estimados": 0
+    }
+    grupos = [dict(item, cantidad=1) for item in items]
+    tokens = _block_tokens(grupos)
+    if tokens <= token_budget:
+        stats["tokens_estimados"] = tokens
+        return grupos, stats
+
+    por_categoria: Dict[str, List[int]] = {}
+    for i, item in enumerate(items):
+        por_categoria.setdefault(item['categoria'], []).append(i)
+    vectors = _tfidf_vectors([item['comentario'] for item in items])
+
+    # Cada umbral agrupa los centroides del anterior, así que las pasadas
+    # laxas trabajan sobre pocos vectores
+    niveles = {
+        categoria: ([[i] for i in indices], [vectors[i] for i in indices])
+        for categoria, indices in por_categoria.items()
+    }
+    for threshold in SIMILARITY_THRESHOLDS:
+        grupos = []
+        for categoria, (miembros, centroides) in niveles.items():
+            fusion = [[m for j in cluster for m in miembros[j]] for cluster in _cluster(centroides, threshold)]
+            niveles[categoria] = (fusion, [_centroid(m, vectors) for m in fusion])
+            categoria_grupos = [_summarize(items, m, _representative(m, vectors)) for m in fusion]
+            categoria_grupos.sort(key=lambda g: g['cantidad'], reverse=True)
+            grupos.extend(categoria_grupos)
+        tokens = _block_tokens(grupos)
+        stats["umbral"] = threshold
+        if tokens <= token_budget:
+            break
+
+    if tokens > token_budget:
+        # Ni con el umbral más laxo cabe: se quedan el mayor grupo de cada
+        # categoría (aunque excedan el presupuesto) y, con lo que sobre, los
+        # grupos más numerosos
+        conservados = set()
+        categorias = set()
+        for i, grupo in enumerate(grupos):
+            if grupo['categoria'] not in categorias:
+                categorias.add(grupo['categoria'])
+                conservados.add(i)
+        usados = _block_tokens([grupos[i] for i in conservados])
+        ordenados = sorted(range(len(grupos)), key=lambda i: grupos[i]['cantidad'], reverse=True)
+        for i in ordenados:
+            if i in conservados:
+                continue
+            costo = _block_tokens([grupos[i]])
+            if usados + costo > token_budget:
+                break
+            conservados.add(i)
+            usados += costo
+        stats["omitidos"] = sum(g['cantidad'] for i, g in enumerate(grupos) if i not in conservados)
+        grupos = [g for i, g in enumerate(grupos) if i in conservados]
+        tokens = usados
+
+    stats["grupos"] = len(grupos)
+    stats["tokens_estimados"] = tokens
+    return grupos, stats
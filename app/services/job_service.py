@@ -0,0 +1,210 @@
+"""
+Trabajos asíncronos de scraping con seguimiento de progreso.
+
+El estado de cada trabajo se guarda en Redis para que cualquier réplica de la
+API pueda responder a una consulta de estado. La réplica que ejecuta el
+trabajo mantiene además una copia en memoria, que es la más reciente: las
+escrituras de progreso en Redis se limitan a una cada JOB_PROGRESS_INTERVAL
+segundos (los cambios de estado y de etapa se escriben siempre), y si Redis no
+está disponible solo esa réplica puede responder. Las copias en memoria
+expiran con el mismo TTL que en Redis.
+"""
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from app.schemas.scraping_schemas import ScrapingRequest, JobStatus
+from app.services.scrape_pipeline_service import ScrapePipeline, get_cached_scrape_response
+from app.core.redis_client import get_redis_client
+
+# TTL del estado de un trabajo (24 horas)
+JOB_TTL = 86400
+
+# Intervalo mínimo (segundos) entre escrituras de progreso de un trabajo en Redis
+JOB_PROGRESS_INTERVAL = float(os.getenv('JOB_PROGRESS_INTERVAL', '1.0'))
+
+_FINAL_STATUSES = (JobStatus.COMPLETED.value, JobStatus.FAILED.value)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ScrapingJobManager:
+    """
+    Crea, ejecuta y consulta trabajos de scraping de larga duración.
+    """
+
+    KEY_PREFIX = "job"
+
+    def __init__(self, ttl: int = JOB_TTL, progress_interval: float = JOB_PROGRESS_INTERVAL):
+        self.ttl = ttl
+        self.progress_interval = progress_interval
+        self.redis_client = get_redis_client()
+        # Copia local de los trabajos de esta réplica (la versión más reciente)
+        self._local_jobs: Dict[str, Dict[str, Any]] = {}
+        # Última actualización de cada copia local (time.monotonic), para expirarlas
+        self._local_saved_at: Dict[str, float] = {}
+        # Última escritura en Redis de cada trabajo (time.monotonic)
+        self._last_write: Dict[str, float] = {}
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{job_id}"
+
+    def _forget_local(self, job_id: str):
+        self._local_jobs.pop(job_id, None)
+        self._local_saved_at.pop(job_id, None)
+        self._last_write.pop(job_id, None)
+
+    def _expire_local(self):
+        """Elimina las copias locales sin actualizar durante más de self.ttl segundos."""
+        limite = time.monotonic() - self.ttl
+        for job_id in [j for j, saved_at in self._local_saved_at.items() if saved_at < limite]:
+            self._forget_local(job_id)
+
+    async def _save(self, job: Dict[str, Any], force: bool = True):
+        """
+        Actualiza la copia local del trabajo y lo persiste en Redis.
+
+        Args:
+            job: Estado del trabajo
+            force: False para actualizaciones de progreso, que solo se
+                   escriben en Redis si pasó JOB_PROGRESS_INTERVAL desde la
+                   última escritura
+        """
+        job_id = job['job_id']
+        job['updated_at'] = _now()
+        now = time.monotonic()
+        self._expire_local()
+        self._local_jobs[job_id] = job
+        self._local_saved_at[job_id] = now
+
+        if not force and now - self._last_write.get(job_id, float('-inf')) < self.progress_interval:
+            return
+        self._last_write[job_id] = now
+
+        if await self.redis_client.set_cached(self._key(job_id), job, ttl=self.ttl):
+            if job['status'] in _FINAL_STATUSES:
+                # El estado final ya está en Redis: la copia local no hace falta
+                self._forget_local(job_id)
+
+    async def create_job(self, payload: ScrapingRequest) -> Dict[str, Any]:
+        """
+        Registra un nuevo trabajo en estado pendiente.
+
+        Args:
+            payload: Petición de scraping
+
+        Returns:
+            Estado inicial del trabajo
+        """
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": JobStatus.PENDING.value,
+            "etapa": None,
+            "app_id": payload.app_id,
+            "progreso": {
+                "paginas_procesadas": 0,
+                "comentarios_extraidos": 0,
+                "comentarios_clasificados": 0,
+                "comentarios_relevantes": 0,
+                "requisitos_generados": 0
+            },
+            "result": None,
+            "error": None,
+            "created_at": _now(),
+            "updated_at": None
+        }
+        await self._save(job)
+        return job
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene el estado de un trabajo.
+
+        Args:
+            job_id: Identificador del trabajo
+
+        Returns:
+            Estado del trabajo o None si no existe
+        """
+        # La copia local (trabajos en curso en esta réplica) nunca está
+        # atrasada respecto de Redis
+        self._expire_local()
+        job = self._local_jobs.get(job_id)
+        if job is None:
+            job = await self.redis_client.get_cached(self._key(job_id))
+        return job
+
+    async def run_job(self, job: Dict[str, Any], payload: ScrapingRequest):
+        """
+        Ejecuta el pipeline de un trabajo actualizando su progreso.
+
+        Args:
+            job: Estado del trabajo devuelto por create_job
+            payload: Petición de scraping
+        """
+        job['status'] = JobStatus.RUNNING.value
+        job['etapa'] = "scraping"
+        await self._save(job)
+        progreso = job['progreso']
+
+        async def on_event(evento: str, data: Dict[str, Any]):
+            etapa = job['etapa']
+            if evento == "pagina":
+                progreso['paginas_procesadas'] = data['pagina']
+                progreso['comentarios_extraidos'] = data['acumulados']
+            elif evento == "scraping_completado":
+                progreso['comentarios_extraidos'] = data['total']
+                job['etapa'] = "clasificacion"
+            elif evento in ("lote_binario", "lote_clasificado"):
+                # La clasificación empieza mientras el scraping continúa
+                if job['etapa'] == "scraping":
+                    job['etapa'] = "clasificacion"
+                if evento == "lote_binario":
+                    progreso['comentarios_clasificados'] = data['procesados']
+                else:
+                    progreso['comentarios_relevantes'] = data['procesados']
+            elif evento == "clasificacion_completada":
+                progreso['comentarios_relevantes'] = data['relevantes']
+                job['etapa'] = "requisitos"
+            elif evento == "requisito":
+                progreso['requisitos_generados'] = data['generados']
+            elif evento == "requisitos":
+                requirements = data.get('requirements') or {}
+                progreso['requisitos_generados'] = len(requirements.get('requisitos', []))
+            await self._save(job, force=job['etapa'] != etapa)
+
+        try:
+            cached = await get_cached_scrape_response(payload)
+            if cached is not None:
+                result = cached.dict()
+            else:
+                result = await ScrapePipeline(payload, on_event=on_event).run()
+
+            job['status'] = JobStatus.COMPLETED.value
+            job['etapa'] = "finalizado"
+            job['result'] = result
+        except Exception as e:
+            print(f"\n❌ ERROR en trabajo {job['job_id']}: {str(e)}")
+            job['status'] = JobStatus.FAILED.value
+            job['error'] = str(e)
+        finally:
+            await self._save(job)
+
+
+# Singleton para compartir el respaldo en memoria entre peticiones
+_job_manager_instance = None
+
+def get_job_manager() -> ScrapingJobManager:
+    """
+    Obtiene la instancia singleton del gestor de trabajos.
+
+    Returns:
+        Instancia de ScrapingJobManager
+    """
+    global _job_manager_instance
+    if _job_manager_instance is None:
+        _job_manager_instance = ScrapingJobManager()
+    return _job_manager_instance
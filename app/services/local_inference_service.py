@@ -0,0 +1,153 @@
+"""
+Backend de inferencia local en CPU para los modelos BERT.
+
+Carga desde un directorio local el mismo modelo que sirve el endpoint de
+Hugging Face, exportado a ONNX y cuantizado a int8, y ejecuta inferencia por
+lotes con ONNX Runtime. Evita los cold starts de los endpoints con
+scale-to-zero y el costo por llamada.
+
+El directorio del modelo debe contener el tokenizer, config.json (id2label
+con los nombres reales de las clases) y el archivo ONNX, por ejemplo generado
+con:
+
+    optimum-cli export onnx --model <modelo_entrenado> --task text-classification <path>
+    python -c "from onnxruntime.quantization import quantize_dynamic, QuantType; \
+quantize_dynamic('<path>/model.onnx', '<path>/model_quantized.onnx', weight_type=QuantType.QInt8)"
+
+Requiere las dependencias opcionales `onnxruntime` y `transformers`.
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+
+class LocalOnnxClassifier:
+    """
+    Clasificador de texto ejecutado con ONNX Runtime en CPU.
+
+    Devuelve las predicciones con el mismo formato que los Inference
+    Endpoints de Hugging Face: [{"label": ..., "score": ...}, ...].
+    """
+
+    def __init__(
+        self,
+        path: str,
+        labels: List[str],
+        onnx_file: str = "model_quantized.onnx",
+        max_length: int = 512,
+        intra_op_threads: int = 0,
+        id2label: Optional[Dict[int, str]] = None
+    ):
+        """
+        Carga el tokenizer y la sesión de ONNX Runtime.
+
+        Args:
+            path: Directorio local del modelo
+            labels: Etiquetas del modelo en MODEL_REGISTRY (las que debe
+                    predecir el modelo local)
+            onnx_file: Nombre del archivo ONNX dentro de path
+            max_length: Longitud máxima de tokens por comentario
+            intra_op_threads: Hilos de ONNX Runtime por inferencia (0 = automático)
+            id2label: Correspondencia índice → etiqueta explícita; obligatoria
+                      si config.json solo tiene LABEL_0, LABEL_1, ...
+
+        Raises:
+            ImportError: Si onnxruntime o transformers no están instalados
+            FileNotFoundError: Si el modelo no existe en path
+            ValueError: Si no se puede saber qué etiqueta corresponde a cada clase
+        """
+        import numpy as np
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_file = os.path.join(path, onnx_file)
+        if not os.path.isfile(model_file):
+            raise FileNotFoundError(f"Modelo ONNX no encontrado: {model_file}")
+
+        self._np = np
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+
+        options = ort.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.id2label = self._load_id2label(path, labels, id2label)
+
+        # El tokenizer de Hugging Face no es seguro entre hilos
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load_id2label(path: str, labels: List[str], id2label: Optional[Dict[int, str]] = None) -> Dict[int, str]:
+        """
+        Etiqueta de cada clase del modelo: la de `id2label` si se indica o la
+        de config.json.
+
+        Las etiquetas genéricas (LABEL_0, ...) no se traducen con el orden de
+        MODEL_REGISTRY: ese orden no tiene por qué coincidir con el del
+        entrenamiento, y un error así pasaría desapercibido.
+        """
+        if id2label is None:
+            config_file = os.path.join(path, "config.json")
+            if os.path.isfile(config_file):
+                with open(config_file, encoding="utf-8") as f:
+                    id2label = json.load(f).get("id2label")
+            if not id2label or all(str(label).upper().startswith("LABEL_") for label in id2label.values()):
+                raise ValueError(
+                    f"{config_file} no tiene los nombres de las etiquetas (id2label genérico o ausente); "
+                    "corrige config.json o define \"id2label\" en la sección \"local\" del modelo en MODEL_REGISTRY"
+                )
+
+        id2label = {int(k): v for k, v in id2label.items()}
+        if sorted(id2label.values()) != sorted(labels):
+            raise ValueError(
+                f"Las etiquetas del modelo local {sorted(id2label.values())} "
+                f"no coinciden con las de MODEL_REGISTRY {sorted(labels)}"
+            )
+        return id2label
+
+    def predict(self, texts: List[str]) -> List[Dict]:
+        """
+        Clasifica un lote de textos (llamada bloqueante, ejecutar en un pool).
+
+        Args:
+            texts: Lista de textos a clasificar
+
+        Returns:
+            Lista de predicciones {"label", "score"} con la clase de mayor score
+        """
+        if not texts:
+            return []
+
+        np = self._np
+        with self._lock:
+            encoded = self.tokenizer(
+                texts,
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+        inputs = {
+            name: value.astype(np.int64)
+            for name, value in encoded.items()
+            if name in self._input_names
+        }
+        logits = self.session.run(None, inputs)[0]
+
+        # Softmax estable numéricamente
+        logits = logits - logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+
+        predictions = []
+        for row in probabilities:
+            label_id = int(row.argmax())
+            predictions.append({
+                "label": self.id2label.get(label_id, str(label_id)),
+                "score": float(row[label_id])
+            })
+        return predictions
@@ -0,0 +1,106 @@
+"""
+Micro-batching de peticiones individuales de clasificación.
+
+Las peticiones concurrentes de /classify-single envían un solo comentario cada
+una. MicroBatcher las acumula durante unos milisegundos (o hasta N elementos),
+las procesa como un único lote y devuelve a cada petición su resultado.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+# Procesa un lote de elementos y devuelve los resultados en el mismo orden
+BatchProcessor = Callable[[List[Any]], Awaitable[List[Any]]]
+
+
+class MicroBatcher:
+    """
+    Agrupa llamadas concurrentes de un elemento en lotes.
+
+    Un lote se envía cuando alcanza `max_batch_size` elementos o cuando han
+    pasado `max_wait` segundos desde que llegó su primer elemento. Si el lote
+    falla, la excepción se propaga a todas las peticiones que lo componen.
+    """
+
+    def __init__(self, process_batch: BatchProcessor, max_batch_size: int = 32, max_wait: float = 0.01):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self._batches = 0
+        self._items = 0
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Agrega un elemento al lote en curso y espera su resultado.
+
+        Args:
+            item: Elemento a procesar
+
+        Returns:
+            Resultado del elemento
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Los futures de otro event loop (ya cerrado) no se pueden resolver
+            self._pending = []
+            self._timer = None
+            self._loop = loop
+
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Envía el lote acumulado."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = self._loop.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        self._batches += 1
+        self._items += len(batch)
+
+        try:
+            results = await self.process_batch([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # Las peticiones canceladas (cliente desconectado) ya tienen su future resuelto
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def get_stats(self) -> dict:
+        """
+        Obtiene las estadísticas del micro-batcher.
+
+        Returns:
+            Diccionario con lotes enviados, elementos y tamaño medio de lote
+        """
+        return {
+            "lotes": self._batches,
+            "comentarios": self._items,
+            "tamano_medio": round(self._items / self._batches, 2) if self._batches else None
+        }
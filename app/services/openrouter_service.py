@@ -1,7 +1,305 @@
-from openai import OpenAI
-from typing import List, Dict
+from openai import AsyncOpenAI, OpenAI
+from typing import Callable, List, Dict, Optional, Tuple
+import asyncio
 import os
 import json
+import time
+from pydantic import ValidationError
+from app.core.executors import Stage, run_in_stage
+from app.schemas.scraping_schemas import RequirementData
+from app.services.comment_condenser import DEFAULT_CONDENSER_CONFIG, condense_comments
+from app.services.token_budget import (
+    DEFAULT_TOKEN_BUDGET_CONFIG, completion_budget, count_tokens, fit_prompt_to_budget,
+    merge_token_usage, new_token_usage, record_completion_usage
+)
+
+# "completo": un único prompt con todos los comentarios
+# "categoria": un prompt por categoría ISO 25010 en paralelo y fusión local
+REQUIREMENTS_GENERATION_MODE = os.getenv('REQUIREMENTS_GENERATION_MODE', 'completo').lower()
+
+# Recibir la respuesta en streaming y emitir cada requisito al cerrarse su JSON
+LLM_STREAMING = os.getenv('LLM_STREAMING', 'true').lower() == 'true'
+
+DEFAULT_CATEGORY_GENERATION_CONFIG = {
+    "max_concurrency": int(os.getenv('REQUIREMENTS_MAX_CONCURRENCY', '6')),
+    "max_tokens": int(os.getenv('REQUIREMENTS_CATEGORY_MAX_TOKENS', '6000')),
+}
+
+EXTRA_HEADERS = {
+    "HTTP-Referer": "https://github.com/yourusername/requirements-elicitation",
+    "X-Title": "Requirements Elicitation System",
+}
+
+
+def extract_json(response_text: str) -> Dict:
+    """
+    Parsea la respuesta del modelo quitando los bloques de código markdown.
+
+    Raises:
+        json.JSONDecodeError: Si la respuesta no es JSON válido
+    """
+    if "```json" in response_text:
+        response_text = response_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in response_text:
+        response_text = response_text.split("```")[1].split("```")[0].strip()
+    return json.loads(response_text)
+
+
+def empty_requirements_result(error: Optional[str] = None) -> Dict:
+    """Resultado sin requisitos (con resumen en cero)."""
+    result = {"requisitos": [], "resumen": build_resumen([])}
+    if error:
+        result["error"] = error
+    return result
+
+
+def build_resumen(requisitos: List[Dict]) -> Dict:
+    """
+    Calcula el resumen (totales por categoría y prioridad) de una lista de requisitos.
+    """
+    resumen = {
+        "total_requisitos": len(requisitos),
+        "por_categoria": {},
+        "prioridad_alta": 0,
+        "prioridad_media": 0,
+        "prioridad_baja": 0
+    }
+    for requisito in requisitos:
+        categoria = requisito.get('categoria', '')
+        resumen["por_categoria"][categoria] = resumen["por_categoria"].get(categoria, 0) + 1
+        clave = f"prioridad_{str(requisito.get('prioridad', '')).strip().lower()}"
+        if clave in resumen:
+            resumen[clave] += 1
+    return resumen
+
+
+def merge_category_requirements(resultados: Dict[str, Dict]) -> Dict:
+    """
+    Fusiona los requisitos generados por categoría en un único resultado.
+
+    Los ids de cada categoría empiezan en NFR-001, así que se renumeran de
+    forma correlativa en el orden recibido y el resumen se recalcula
+    localmente en lugar de confiar en el que devuelve el modelo.
+
+    Args:
+        resultados: Resultado de generate_requirements por categoría
+
+    Returns:
+        Diccionario con requisitos, resumen, tokens usados (sumados) y
+        "error" si alguna categoría falló
+    """
+    requisitos = []
+    errores = []
+    raw_responses = []
+    uso = new_token_usage()
+    for categoria, resultado in resultados.items():
+        merge_token_usage(uso, resultado.get('uso_tokens', {}))
+        if resultado.get('error'):
+            errores.append(f"{categoria}: {resultado['error']}")
+            if resultado.get('raw_response'):
+                raw_responses.append(resultado['raw_response'])
+        for requisito in resultado.get('requisitos', []):
+            requisito = dict(requisito)
+            requisito.setdefault('categoria', categoria)
+            requisitos.append(requisito)
+
+    for i, requisito in enumerate(requisitos, 1):
+        requisito['id'] = f"NFR-{i:03d}"
+
+    merged = {"requisitos": requisitos, "resumen": build_resumen(requisitos), "uso_tokens": uso}
+    if errores:
+        merged["error"] = "; ".join(errores)
+    if raw_responses:
+        merged["raw_response"] = "\n\n".join(raw_responses)
+    return merged
+
+
+class RequirementsStreamParser:
+    """
+    Análisis incremental de la respuesta JSON del modelo.
+
+    Recorre el texto a medida que llega, siguiendo la profundidad de
+    llaves/corchetes y las cadenas, y devuelve cada objeto del arreglo de
+    requisitos en cuanto se cierra, ya validado con RequirementData. El
+    arreglo puede ser el valor de una clave "requisitos" (a cualquier
+    profundidad) o la raíz de la respuesta. Un valor raíz que se cierra sin
+    contener requisitos (p. ej. "{el}" en un texto previo al JSON) se descarta
+    y el análisis continúa.
+
+    Si al final no se obtuvo ningún requisito, result() analiza el texto
+    completo como respaldo.
+    """
+
+    def __init__(self, categoria: Optional[str] = None):
+        self.categoria = categoria
+        self.requisitos: List[Dict] = []
+        self.invalidos = 0
+        self.finish_reason: Optional[str] = None
+        self.interrupcion: Optional[str] = None
+        self._chunks: List[str] = []
+        self._buffer = ""
+        self._pos = 0
+        self._reset()
+
+    def _reset(self):
+        """Estado de análisis de un valor raíz."""
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._pending_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._object_start: Optional[int] = None
+        self._found = False
+        self._closed = False
+
+    @property
+    def text(self) -> str:
+        """Texto completo recibido hasta el momento."""
+        return "".join(self._chunks)
+
+    def feed(self, text: str) -> List[Dict]:
+        """
+        Procesa un fragmento de la respuesta.
+
+        Returns:
+            Requisitos que se completaron con este fragmento
+        """
+        self._chunks.append(text)
+        if self._closed:
+            return []
+        self._buffer += text
+        completos = []
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            char = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._pending_key = buffer[self._string_start + 1:i]
+                continue
+            if self._depth == 0 and char not in '{[':
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+                continue
+            if char in ' \t\r\n:':
+                continue
+
+            pending_key, self._pending_key = self._pending_key, None
+            if char in '{[':
+                self._depth += 1
+                if char == '[' and self._array_depth is None and (
+                        self._depth == 1 or pending_key == 'requisitos'):
+                    self._array_depth = self._depth
+                    self._found = True
+                elif char == '{' and self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._object_start = i
+            elif char in '}]':
+                if char == '}' and self._object_start is not None and self._depth == self._array_depth + 1:
+                    requisito = self._accept(buffer[self._object_start:i + 1])
+                    if requisito is not None:
+                        completos.append(requisito)
+                    self._object_start = None
+                elif char == ']' and self._depth == self._array_depth:
+                    self._array_depth = None
+                self._depth -= 1
+                if self._depth == 0:
+                    if self._found:
+                        self._closed = True
+                        break
+                    # Valor raíz sin requisitos (texto previo al JSON): seguir buscando
+                    self._reset()
+
+        # Conservar solo lo que aún puede formar parte de un requisito
+        cut = self._object_start if self._object_start is not None else len(buffer)
+        if self._in_string:
+            cut = min(cut, self._string_start)
+        self._buffer = buffer[cut:]
+        self._pos = len(buffer) - cut
+        if self._object_start is not None:
+            self._object_start -= cut
+        if self._in_string:
+            self._string_start -= cut
+        return completos
+
+    def _accept(self, object_text: str) -> Optional[Dict]:
+        try:
+            requisito = json.loads(object_text)
+        except json.JSONDecodeError as e:
+            self.invalidos += 1
+            print(f"⚠️  Requisito inválido descartado: {str(e)}")
+            return None
+        return self._validate(requisito)
+
+    def _validate(self, requisito) -> Optional[Dict]:
+        try:
+            if self.categoria:
+                requisito.setdefault('categoria', self.categoria)
+            requisito = RequirementData(**requisito).dict()
+        except (AttributeError, TypeError, ValidationError) as e:
+            self.invalidos += 1
+            print(f"⚠️  Requisito inválido descartado: {' '.join(str(e).split())[:160]}")
+            return None
+        self.requisitos.append(requisito)
+        return requisito
+
+    def _parse_text(self):
+        """
+        Analiza el texto completo: primero como extract_json y, si falla,
+        buscando el primer valor JSON que sea una lista o tenga "requisitos".
+        """
+        text = self.text
+        try:
+            return extract_json(text)
+        except json.JSONDecodeError:
+            pass
+        decoder = json.JSONDecoder()
+        for i, char in enumerate(text):
+            if char not in '{[':
+                continue
+            try:
+                value, _ = decoder.raw_decode(text, i)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(value, list) or (isinstance(value, dict) and 'requisitos' in value):
+                return value
+        raise json.JSONDecodeError("No se encontró el JSON de requisitos en la respuesta", text, 0)
+
+    def result(self) -> Dict:
+        """
+        Resultado final de la respuesta.
+
+        Si la respuesta quedó cortada (límite de tokens o error de red) se
+        devuelven los requisitos completos recibidos, con el resumen
+        recalculado y el motivo en "error".
+
+        Raises:
+            json.JSONDecodeError: Si no llegó ningún requisito completo y la
+                respuesta no es JSON válido
+        """
+        if not self.requisitos:
+            # Respaldo: el análisis incremental no encontró requisitos
+            data = self._parse_text()
+            items = data if isinstance(data, list) else data.get('requisitos') if isinstance(data, dict) else None
+            if not isinstance(items, list):
+                raise json.JSONDecodeError("La respuesta no contiene una lista de requisitos", self.text, 0)
+            for item in items:
+                self._validate(item)
+            return {"requisitos": self.requisitos, "resumen": build_resumen(self.requisitos)}
+
+        result = {"requisitos": self.requisitos, "resumen": build_resumen(self.requisitos)}
+        if not self._closed:
+            motivo = self.interrupcion or f"finish_reason={self.finish_reason}"
+            result["error"] = (f"Respuesta incompleta del modelo ({motivo}); "
+                               f"se conservan {len(self.requisitos)} requisitos completos")
+        return result
+
 
 class OpenRouterRequirementsGenerator:
     """
@@ -17,28 +315,88 @@ class OpenRouterRequirementsGenerator:
             base_url="https://openrouter.ai/api/v1",
             api_key=os.getenv("OPENROUTER_API_KEY"),
         )
+        # Cliente asíncrono para las peticiones concurrentes por categoría
+        self.async_client = AsyncOpenAI(
+            base_url="https://openrouter.ai/api/v1",
+            api_key=os.getenv("OPENROUTER_API_KEY"),
+        )
+        self.category_config = DEFAULT_CATEGORY_GENERATION_CONFIG.copy()
+        self.condenser_config = DEFAULT_CONDENSER_CONFIG.copy()
+        self.token_budget_config = DEFAULT_TOKEN_BUDGET_CONFIG.copy()
+        self.streaming = LLM_STREAMING
         self.model = "x-ai/grok-4-fast"
 
-    def _create_prompt(self, comentarios_clasificados: List[Dict]) -> str:
+    def _create_prompt(self, comentarios_clasificados: List[Dict], solo_categoria: Optional[str] = None) -> Tuple[str, Dict]:
         """
-        Crea el prompt para generar requisitos No Funcionales.
+        Crea el prompt para generar requisitos No Funcionales dentro del
+        presupuesto de tokens.
+
+        Los comentarios casi idénticos se condensan y, si el prompt aún
+        excede LLM_MAX_PROMPT_TOKENS, se recortan los de cada categoría.
 
         Args:
             comentarios_clasificados: Lista de comentarios con su categoría ISO 25010
+            solo_categoria: Si se indica, el prompt se limita a esa categoría
+
+        Returns:
+            Tupla (prompt, presupuesto) con los tokens estimados del prompt y
+            los comentarios omitidos
+        """
+        max_prompt_tokens = self.token_budget_config["max_prompt_tokens"]
+
+        # Condensar comentarios casi idénticos si no caben en el presupuesto de tokens
+        condensacion = {"omitidos": 0}
+        if self.condenser_config["enabled"]:
+            base_tokens = count_tokens(self._render_prompt([], solo_categoria))
+            grupos, condensacion = condense_comments(
+                comentarios_clasificados,
+                min(self.condenser_config["token_budget"], max_prompt_tokens - base_tokens)
+            )
+            if condensacion["grupos"] < condensacion["comentarios"]:
+                print(f"🗜️  Comentarios condensados: {condensacion['comentarios']} → {condensacion['grupos']} grupos "
+                      f"(umbral {condensacion['umbral']}, ~{condensacion['tokens_estimados']} tokens, "
+                      f"{condensacion['omitidos']} omitidos)")
+        else:
+            grupos = [dict(item, cantidad=1) for item in comentarios_clasificados]
+
+        prompt, grupos, omitidos, tokens = fit_prompt_to_budget(
+            grupos,
+            lambda g, n: self._render_prompt(g, solo_categoria, condensacion["omitidos"] + n),
+            max_prompt_tokens
+        )
+        if omitidos:
+            print(f"✂️  Prompt recortado a {tokens} tokens ({omitidos} comentarios omitidos)")
+
+        return prompt, {
+            "tokens_prompt_estimados": tokens,
+            "comentarios_omitidos": condensacion["omitidos"] + omitidos
+        }
+
+    def _render_prompt(self, grupos: List[Dict], solo_categoria: Optional[str] = None, omitidos: int = 0) -> str:
+        """
+        Construye el texto del prompt.
+
+        Args:
+            grupos: Comentarios (o grupos condensados con "cantidad") con su categoría
+            solo_categoria: Si se indica, el prompt se limita a esa categoría
+            omitidos: Comentarios que no entraron en el prompt
 
         Returns:
             Prompt formateado para el modelo
         """
+        condensado = any(item.get('cantidad', 1) > 1 for item in grupos)
+
         # Agrupar comentarios por categoría
         comentarios_por_categoria = {}
-        for item in comentarios_clasificados:
+        for item in grupos:
             categoria = item['categoria']
             if categoria not in comentarios_por_categoria:
                 comentarios_por_categoria[categoria] = []
             comentarios_por_categoria[categoria].append({
                 'comentario': item['comentario'],
                 'confianza': item['confianza'],
-                'calificacion': item['calificacion']
+                'calificacion': item['calificacion'],
+                'cantidad': item.get('cantidad', 1)
             })
 
         # Construir el prompt
@@ -59,10 +417,26 @@ Tu tarea es analizar comentarios de usuarios de una aplicación móvil que han s
 """
 
         for categoria, comentarios in comentarios_por_categoria.items():
-            prompt += f"\n### {categoria.upper()} ({len(comentarios)} comentarios)\n"
+            total = sum(item['cantidad'] for item in comentarios)
+            prompt += f"\n### {categoria.upper()} ({total} comentarios)\n"
             for i, item in enumerate(comentarios, 1):
-                prompt += f"{i}. \"{item['comentario']}\" (Confianza: {item['confianza']:.2f}, Rating: {item['calificacion']}★)\n"
+                if item['cantidad'] > 1:
+                    prompt += (f"{i}. \"{item['comentario']}\" (×{item['cantidad']} comentarios similares, "
+                               f"Confianza media: {item['confianza']:.2f}, Rating medio: {item['calificacion']}★)\n")
+                else:
+                    prompt += f"{i}. \"{item['comentario']}\" (Confianza: {item['confianza']:.2f}, Rating: {item['calificacion']}★)\n"
+
+        if condensado:
+            prompt += """
+**Nota:** Cada comentario marcado con "×N" representa N comentarios casi idénticos de usuarios distintos. Cuenta los N al calcular comentarios_relacionados y al asignar la prioridad.
+"""
+        if omitidos:
+            prompt += f"({omitidos} comentarios de grupos minoritarios se omitieron por el límite de tamaño del prompt)\n"
 
+        if solo_categoria:
+            prompt += f"""
+**Alcance:** Todos los comentarios pertenecen a la categoría "{solo_categoria}". Genera únicamente requisitos de esa categoría; la prioridad es relativa a estos comentarios.
+"""
         prompt += """
 
 **Instrucciones:**
@@ -182,7 +556,8 @@ Analiza los comentarios y genera requisitos No Funcionales siguiendo estos princ
     def generate_requirements(
         self,
         comentarios_clasificados: List[Dict],
-        max_retries: int = 3
+        max_retries: int = 3,
+        on_requirement: Optional[Callable[[Dict], None]] = None
     ) -> Dict:
         """
         Genera requisitos No Funcionales basados en comentarios clasificados.
@@ -190,6 +565,7 @@ Analiza los comentarios y genera requisitos No Funcionales siguiendo estos princ
         Args:
             comentarios_clasificados: Lista de diccionarios con comentarios y su clasificación
             max_retries: Número máximo de reintentos en caso de error
+            on_requirement: Callback con cada requisito validado en cuanto llega (streaming)
 
         Returns:
             Diccionario con requisitos generados y resumen
@@ -198,96 +574,336 @@ Analiza los comentarios y genera requisitos No Funcionales siguiendo estos princ
             Exception: Si no se puede generar requisitos después de max_retries intentos
         """
         if not comentarios_clasificados:
-            return {
-                "requisitos": [],
-                "resumen": {
-                    "total_requisitos": 0,
-                    "por_categoria": {},
-                    "prioridad_alta": 0,
-                    "prioridad_media": 0,
-                    "prioridad_baja": 0
-                },
-                "error": "No hay comentarios clasificados para procesar"
-            }
+            return empty_requirements_result("No hay comentarios clasificados para procesar")
 
         print(f"\n{'='*60}")
         print("🧠 GENERANDO REQUISITOS NO FUNCIONALES")
         print(f"{'='*60}")
         print(f"Total de comentarios a procesar: {len(comentarios_clasificados)}")
 
-        prompt = self._create_prompt(comentarios_clasificados)
+        prompt, presupuesto = self._create_prompt(comentarios_clasificados)
+        max_tokens = completion_budget(presupuesto["tokens_prompt_estimados"], 16000, self.model)
+        uso = new_token_usage()
+        merge_token_usage(uso, presupuesto)
+        print(f"Tokens estimados del prompt: {presupuesto['tokens_prompt_estimados']}")
 
         for attempt in range(max_retries):
             try:
                 print(f"\nIntento {attempt + 1}/{max_retries}...")
 
-                completion = self.client.chat.completions.create(
-                    extra_headers={
-                        "HTTP-Referer": "https://github.com/yourusername/requirements-elicitation",
-                        "X-Title": "Requirements Elicitation System",
-                    },
-                    extra_body={},
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    temperature=0.7,
-                    max_tokens=16000  # Aumentado para permitir 50-100+ requisitos detallados
-                )
-
-                response_text = completion.choices[0].message.content
-                print(f"\n✅ Respuesta recibida del modelo ({len(response_text)} caracteres)")
-
-                # Intentar parsear JSON
-                # Remover bloques de código markdown si existen
-                if "```json" in response_text:
-                    response_text = response_text.split("```json")[1].split("```")[0].strip()
-                elif "```" in response_text:
-                    response_text = response_text.split("```")[1].split("```")[0].strip()
-
-                requisitos_data = json.loads(response_text)
+                if self.streaming:
+                    parser = self._stream_completion(prompt, max_tokens, uso, on_requirement)
+                    response_text = parser.text
+                    print(f"\n✅ Respuesta recibida del modelo ({len(response_text)} caracteres)")
+                    requisitos_data = parser.result()
+                else:
+                    completion = self.client.chat.completions.create(
+                        extra_headers=EXTRA_HEADERS,
+                        extra_body={},
+                        model=self.model,
+                        messages=[
+                            {
+                                "role": "user",
+                                "content": prompt
+                            }
+                        ],
+                        temperature=0.7,
+                        max_tokens=max_tokens  # Hasta 16000 para permitir 50-100+ requisitos detallados
+                    )
+                    record_completion_usage(uso, getattr(completion, 'usage', None))
+
+                    response_text = completion.choices[0].message.content
+                    print(f"\n✅ Respuesta recibida del modelo ({len(response_text)} caracteres)")
+
+                    requisitos_data = extract_json(response_text)
 
                 print(f"✅ Requisitos generados exitosamente")
                 print(f"   Total: {requisitos_data.get('resumen', {}).get('total_requisitos', 0)} requisitos")
 
+                requisitos_data["uso_tokens"] = uso
                 return requisitos_data
 
             except json.JSONDecodeError as e:
                 print(f"⚠️  Error al parsear JSON (intento {attempt + 1}): {str(e)}")
                 if attempt == max_retries - 1:
                     # Último intento, retornar respuesta cruda
-                    return {
-                        "requisitos": [],
-                        "resumen": {
-                            "total_requisitos": 0,
-                            "por_categoria": {},
-                            "prioridad_alta": 0,
-                            "prioridad_media": 0,
-                            "prioridad_baja": 0
-                        },
-                        "error": "No se pudo parsear la respuesta del modelo",
-                        "raw_response": response_text
-                    }
+                    result = empty_requirements_result("No se pudo parsear la respuesta del modelo")
+                    result["raw_response"] = response_text
+                    result["uso_tokens"] = uso
+                    return result
             except Exception as e:
                 print(f"❌ Error en intento {attempt + 1}: {str(e)}")
                 if attempt == max_retries - 1:
                     raise Exception(f"No se pudieron generar requisitos después de {max_retries} intentos: {str(e)}")
 
+        return empty_requirements_result("No se pudieron generar requisitos")
+
+    async def agenerate_requirements(
+        self,
+        comentarios_clasificados: List[Dict],
+        on_requirement: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        Genera requisitos según REQUIREMENTS_GENERATION_MODE: por categoría
+        (map-reduce concurrente) o con un único prompt en el pool del LLM.
+
+        Args:
+            comentarios_clasificados: Lista de diccionarios con comentarios y su clasificación
+            on_requirement: Callback con cada requisito validado en cuanto llega;
+                siempre se invoca desde el event loop
+
+        Returns:
+            Diccionario con requisitos generados y resumen
+        """
+        if REQUIREMENTS_GENERATION_MODE == 'categoria':
+            return await self.generate_requirements_by_category(
+                comentarios_clasificados, on_requirement=on_requirement
+            )
+
+        callback = None
+        if on_requirement is not None:
+            loop = asyncio.get_running_loop()
+
+            def callback(requisito: Dict):
+                loop.call_soon_threadsafe(on_requirement, requisito)
+
+        return await run_in_stage(
+            Stage.LLM, self.generate_requirements, comentarios_clasificados, on_requirement=callback
+        )
+
+    async def generate_requirements_by_category(
+        self,
+        comentarios_clasificados: List[Dict],
+        max_retries: int = 3,
+        on_requirement: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        Genera requisitos con un prompt por categoría ISO 25010 y fusiona los
+        resultados.
+
+        Las categorías se piden en paralelo (hasta max_concurrency a la vez),
+        así que el tiempo total es el de la categoría más lenta y no el de
+        todo el conjunto. Cada categoría se reintenta por separado: un JSON
+        inválido solo repite esa categoría.
+
+        Args:
+            comentarios_clasificados: Lista de diccionarios con comentarios y su clasificación
+            max_retries: Número máximo de reintentos por categoría
+            on_requirement: Callback con cada requisito validado en cuanto llega
+                (con el id que asignó el modelo; los ids finales se asignan al fusionar)
+
+        Returns:
+            Diccionario con requisitos (ids NFR-xxx correlativos) y resumen
+        """
+        if not comentarios_clasificados:
+            return empty_requirements_result("No hay comentarios clasificados para procesar")
+
+        por_categoria = {}
+        for item in comentarios_clasificados:
+            # "error" marca los comentarios que el clasificador no pudo procesar
+            if item['categoria'] == 'error':
+                continue
+            por_categoria.setdefault(item['categoria'], []).append(item)
+        if not por_categoria:
+            return empty_requirements_result("No hay comentarios clasificados para procesar")
+        # Las categorías con más comentarios primero (suelen ser las más lentas)
+        categorias = sorted(por_categoria, key=lambda c: len(por_categoria[c]), reverse=True)
+
+        print(f"\n{'='*60}")
+        print("🧠 GENERANDO REQUISITOS NO FUNCIONALES POR CATEGORÍA")
+        print(f"{'='*60}")
+        print(f"Total de comentarios a procesar: {sum(len(c) for c in por_categoria.values())}")
+        print(f"Categorías: {', '.join(f'{c} ({len(por_categoria[c])})' for c in categorias)}")
+
+        semaphore = asyncio.Semaphore(max(1, self.category_config["max_concurrency"]))
+        start = time.perf_counter()
+
+        async def generate(categoria: str) -> Dict:
+            async with semaphore:
+                return await self._generate_category(
+                    categoria, por_categoria[categoria], max_retries, on_requirement
+                )
+
+        resultados = await asyncio.gather(*(generate(c) for c in categorias), return_exceptions=True)
+
+        por_resultado = {}
+        for categoria, resultado in zip(categorias, resultados):
+            if isinstance(resultado, Exception):
+                resultado = empty_requirements_result(str(resultado))
+            por_resultado[categoria] = resultado
+
+        merged = merge_category_requirements(por_resultado)
+        if not merged["requisitos"] and merged.get("error"):
+            raise Exception(f"No se pudieron generar requisitos: {merged['error']}")
+
+        print(f"\n✅ Requisitos fusionados: {merged['resumen']['total_requisitos']} "
+              f"en {time.perf_counter() - start:.2f}s")
+        if merged.get("error"):
+            print(f"⚠️  Categorías con error: {merged['error']}")
+        return merged
+
+    async def _generate_category(
+        self,
+        categoria: str,
+        comentarios: List[Dict],
+        max_retries: int,
+        on_requirement: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        Genera los requisitos de una sola categoría.
+
+        Returns:
+            Diccionario con requisitos, o con "error" y "raw_response" si el
+            modelo nunca devolvió JSON válido
+
+        Raises:
+            Exception: Si la petición falla en todos los intentos
+        """
+        # La condensación es CPU: se construye el prompt fuera del event loop
+        prompt, presupuesto = await run_in_stage(Stage.LLM, self._create_prompt, comentarios, categoria)
+        max_tokens = completion_budget(
+            presupuesto["tokens_prompt_estimados"], self.category_config["max_tokens"], self.model
+        )
+        uso = new_token_usage()
+        merge_token_usage(uso, presupuesto)
+        response_text = ""
+
+        for attempt in range(max_retries):
+            try:
+                start = time.perf_counter()
+                if self.streaming:
+                    parser = await self._astream_completion(prompt, max_tokens, uso, on_requirement, categoria)
+                    response_text = parser.text
+                    requisitos_data = parser.result()
+                else:
+                    completion = await self.async_client.chat.completions.create(
+                        extra_headers=EXTRA_HEADERS,
+                        extra_body={},
+                        model=self.model,
+                        messages=[
+                            {
+                                "role": "user",
+                                "content": prompt
+                            }
+                        ],
+                        temperature=0.7,
+                        max_tokens=max_tokens
+                    )
+                    record_completion_usage(uso, getattr(completion, 'usage', None))
+                    response_text = completion.choices[0].message.content
+                    requisitos_data = extract_json(response_text)
+                print(f"✅ {categoria}: {len(requisitos_data.get('requisitos', []))} requisitos "
+                      f"({time.perf_counter() - start:.2f}s, {len(comentarios)} comentarios, "
+                      f"{presupuesto['tokens_prompt_estimados']} tokens de prompt)")
+                requisitos_data["uso_tokens"] = uso
+                return requisitos_data
+
+            except json.JSONDecodeError as e:
+                print(f"⚠️  {categoria}: error al parsear JSON (intento {attempt + 1}/{max_retries}): {str(e)}")
+                if attempt == max_retries - 1:
+                    result = empty_requirements_result("No se pudo parsear la respuesta del modelo")
+                    result["raw_response"] = response_text
+                    result["uso_tokens"] = uso
+                    return result
+            except Exception as e:
+                print(f"❌ {categoria}: error en intento {attempt + 1}/{max_retries}: {str(e)}")
+                if attempt == max_retries - 1:
+                    raise
+
+        return empty_requirements_result("No se pudieron generar requisitos")
+
+    def _stream_request(self, prompt: str, max_tokens: int) -> Dict:
+        """Argumentos de una petición en streaming (con el uso de tokens en el último fragmento)."""
         return {
-            "requisitos": [],
-            "resumen": {
-                "total_requisitos": 0,
-                "por_categoria": {},
-                "prioridad_alta": 0,
-                "prioridad_media": 0,
-                "prioridad_baja": 0
-            },
-            "error": "No se pudieron generar requisitos"
+            "extra_headers": EXTRA_HEADERS,
+            "extra_body": {},
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.7,
+            "max_tokens": max_tokens,
+            "stream": True,
+            "stream_options": {"include_usage": True}
         }
 
+    @staticmethod
+    def _consume_chunk(parser: RequirementsStreamParser, chunk, start: float,
+                       on_requirement: Optional[Callable[[Dict], None]]):
+        """Pasa un fragmento al parser y emite los requisitos completados. Devuelve el uso si viene."""
+        if chunk.choices:
+            choice = chunk.choices[0]
+            if choice.finish_reason:
+                parser.finish_reason = choice.finish_reason
+            content = choice.delta.content if choice.delta else None
+            if content:
+                for requisito in parser.feed(content):
+                    if len(parser.requisitos) == 1:
+                        print(f"⚡ Primer requisito recibido en {time.perf_counter() - start:.2f}s")
+                    if on_requirement is not None:
+                        on_requirement(requisito)
+        return getattr(chunk, 'usage', None)
+
+    def _stream_completion(
+        self,
+        prompt: str,
+        max_tokens: int,
+        uso: Dict,
+        on_requirement: Optional[Callable[[Dict], None]] = None,
+        categoria: Optional[str] = None
+    ) -> RequirementsStreamParser:
+        """
+        Pide la respuesta en streaming y la analiza a medida que llega.
+
+        Si la conexión se corta después de recibir algún requisito completo,
+        no se relanza el error: el parser conserva esos requisitos (y no se
+        reintenta, para no emitirlos dos veces).
+
+        Returns:
+            Parser con el texto recibido y los requisitos validados
+        """
+        parser = RequirementsStreamParser(categoria)
+        usage = None
+        start = time.perf_counter()
+        try:
+            stream = self.client.chat.completions.create(**self._stream_request(prompt, max_tokens))
+            for chunk in stream:
+                usage = self._consume_chunk(parser, chunk, start, on_requirement) or usage
+        except Exception as e:
+            if not parser.requisitos:
+                raise
+            parser.interrupcion = str(e)
+        finally:
+            record_completion_usage(uso, usage)
+        return parser
+
+    async def _astream_completion(
+        self,
+        prompt: str,
+        max_tokens: int,
+        uso: Dict,
+        on_requirement: Optional[Callable[[Dict], None]] = None,
+        categoria: Optional[str] = None
+    ) -> RequirementsStreamParser:
+        """Versión asíncrona de _stream_completion (cliente AsyncOpenAI)."""
+        parser = RequirementsStreamParser(categoria)
+        usage = None
+        start = time.perf_counter()
+        try:
+            stream = await self.async_client.chat.completions.create(**self._stream_request(prompt, max_tokens))
+            async for chunk in stream:
+                usage = self._consume_chunk(parser, chunk, start, on_requirement) or usage
+        except Exception as e:
+            if not parser.requisitos:
+                raise
+            parser.interrupcion = str(e)
+        finally:
+            record_completion_usage(uso, usage)
+        return parser
+
     def _create_single_comment_prompt(self, comentario: str, categoria: str, confianza: float, calificacion: int) -> str:
         """
         Crea el prompt para generar un requisito basado en un solo comentario.
@@ -423,10 +1039,7 @@ Genera UN requisito No Funcional siguiendo la norma ISO/IEC/IEEE 29148:
                 print(f"\nIntento {attempt + 1}/{max_retries}...")
 
                 completion = self.client.chat.completions.create(
-                    extra_headers={
-                        "HTTP-Referer": "https://github.com/yourusername/requirements-elicitation",
-                        "X-Title": "Requirements Elicitation System",
-                    },
+                    extra_headers=EXTRA_HEADERS,
                     extra_body={},
                     model=self.model,
                     messages=[
@@ -442,14 +1055,7 @@ Genera UN requisito No Funcional siguiendo la norma ISO/IEC/IEEE 29148:
                 response_text = completion.choices[0].message.content
                 print(f"✅ Respuesta recibida del modelo ({len(response_text)} caracteres)")
 
-                # Intentar parsear JSON
-                # Remover bloques de código markdown si existen
-                if "```json" in response_text:
-                    response_text = response_text.split("```json")[1].split("```")[0].strip()
-                elif "```" in response_text:
-                    response_text = response_text.split("```")[1].split("```")[0].strip()
-
-                requisito_data = json.loads(response_text)
+                requisito_data = extract_json(response_text)
 
                 print(f"✅ Requisito generado exitosamente")
                 print(f"   ID: {requisito_data.get('id', 'N/A')}")
@@ -0,0 +1,410 @@
+"""
+Cliente asíncrono propio para los comentarios de Google Play Store.
+
+Reemplaza a google_play_scraper.reviews (urllib bloqueante, una conexión por
+página) con el mismo endpoint batchexecute sobre un cliente httpx con pool
+keep-alive. La respuesta se analiza a medida que llega y la lectura termina en
+cuanto se decodifica el sobre con los comentarios.
+
+El transporte es intercambiable (parámetro `transport` o PLAYSTORE_BASE_URL),
+de modo que un servidor falso de Play Store puede usarse en pruebas y
+benchmarks (ver benchmark_playstore_client.py).
+"""
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+import httpx
+from dotenv import load_dotenv
+from app.core.http_clients import close_client_from_other_loop
+
+load_dotenv()
+
+PLAYSTORE_BASE_URL = os.getenv('PLAYSTORE_BASE_URL', 'https://play.google.com')
+REVIEWS_PATH = "/_/PlayStoreUi/data/batchexecute"
+REVIEWS_RPC_ID = "oCPfdb"
+
+# Máximo de comentarios que el endpoint devuelve por petición
+MAX_COUNT_EACH_FETCH = 199
+
+# Prefijo anti-XSSI de las respuestas batchexecute
+XSSI_PREFIX = ")]}'"
+
+DEFAULT_PLAYSTORE_HTTP_CONFIG = {
+    "max_connections": int(os.getenv('PLAYSTORE_MAX_CONNECTIONS', '10')),
+    "max_keepalive_connections": int(os.getenv('PLAYSTORE_MAX_KEEPALIVE', '10')),
+    "keepalive_expiry": 30.0,
+    "connect_timeout": 10.0,
+    "read_timeout": float(os.getenv('PLAYSTORE_READ_TIMEOUT', '30')),
+}
+
+
+class PlayStoreError(Exception):
+    """Error HTTP del endpoint de comentarios (con el código de estado en `code`)"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"Status code {code} returned. {message}".strip())
+        self.code = code
+
+
+class PlayStoreNotFoundError(PlayStoreError):
+    """La aplicación no existe (404)"""
+
+
+class ReviewsContinuationToken:
+    """
+    Token de paginación con los parámetros de la petición original.
+
+    Mismo contrato que el de google_play_scraper: `token` es None cuando no
+    hay más páginas, y pedir una página con ese token devuelve una lista vacía.
+    """
+    __slots__ = ("token", "lang", "country", "sort", "count", "filter_score_with", "filter_device_with")
+
+    def __init__(self, token, lang, country, sort, count, filter_score_with=None, filter_device_with=None):
+        self.token = token
+        self.lang = lang
+        self.country = country
+        self.sort = sort
+        self.count = count
+        self.filter_score_with = filter_score_with
+        self.filter_device_with = filter_device_with
+
+
+# Cuerpo form-urlencoded (f.req) de la petición, con los mismos bytes que
+# envía google_play_scraper: los filtros ausentes van como "None" y el app_id
+# y el token sin codificar
+_REVIEWS_REQUEST = (
+    '[[["' + REVIEWS_RPC_ID + '","[null,[2,{sort},[{page}],null,'
+    '[null,{score},null,null,null,null,null,null,{device}]],'
+    '[\\"{app_id}\\",7]]",null,"generic"]]]\n'
+)
+REVIEWS_BODY_FORMAT = "f.req=" + quote(_REVIEWS_REQUEST, safe="{}")
+REVIEWS_PAGE_FORMAT = quote('{count},null,\\"', safe="{}") + "{token}" + quote('\\"', safe="")
+
+
+def build_reviews_body(
+    app_id: str,
+    sort: int,
+    count: int,
+    filter_score_with: Optional[int] = None,
+    filter_device_with: Optional[int] = None,
+    pagination_token: Optional[str] = None
+) -> str:
+    """
+    Construye el cuerpo form-urlencoded (f.req) de la petición de comentarios.
+
+    Returns:
+        Cuerpo de la petición
+    """
+    if pagination_token is not None:
+        page = REVIEWS_PAGE_FORMAT.format(count=count, token=pagination_token)
+    else:
+        page = f"{count}"
+    return REVIEWS_BODY_FORMAT.format(
+        sort=sort, page=page, score=filter_score_with, device=filter_device_with, app_id=app_id
+    )
+
+
+class BatchExecuteParser:
+    """
+    Analizador incremental de respuestas batchexecute.
+
+    Acepta el formato de un solo bloque (`)]}'` + un array de sobres) y el
+    formato por fragmentos (`rt=c`: líneas de longitud seguidas de arrays).
+    Cada sobre (["wrb.fr", rpc_id, payload, ...]) se entrega en cuanto está
+    completo, sin esperar al resto de la respuesta.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._prefix_done = False
+        self._in_array = False
+        self._decoder = json.JSONDecoder()
+
+    def _skip_whitespace(self):
+        while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+            self._pos += 1
+
+    def feed(self, text: str) -> Iterator[list]:
+        """
+        Agrega texto recibido y entrega los sobres completos.
+
+        Args:
+            text: Fragmento de la respuesta
+
+        Yields:
+            Sobres decodificados
+        """
+        self._buffer += text
+        if not self._prefix_done:
+            if len(self._buffer) < len(XSSI_PREFIX):
+                return
+            if self._buffer.startswith(XSSI_PREFIX):
+                self._pos = len(XSSI_PREFIX)
+            self._prefix_done = True
+
+        while True:
+            self._skip_whitespace()
+            if self._pos >= len(self._buffer):
+                break
+
+            char = self._buffer[self._pos]
+            if not self._in_array:
+                if char == "[":
+                    self._in_array = True
+                    self._pos += 1
+                    continue
+                # Línea de longitud del formato por fragmentos
+                end = self._buffer.find("\n", self._pos)
+                if end < 0:
+                    break
+                self._pos = end + 1
+                continue
+
+            if char == ",":
+                self._pos += 1
+                continue
+            if char == "]":
+                self._in_array = False
+                self._pos += 1
+                continue
+
+            try:
+                envelope, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # Sobre incompleto: esperar más datos
+                break
+            self._pos = end
+            yield envelope
+
+        # Descartar lo ya procesado
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+
+
+def _lookup(source: Any, path: List[int]) -> Any:
+    for key in path:
+        source = source[key]
+    return source
+
+
+def _utc_datetime(timestamp: int) -> datetime:
+    """Fecha UTC (con zona horaria) de un timestamp del payload."""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def parse_review(item: list) -> Dict[str, Any]:
+    """
+    Convierte un comentario del payload en el formato de google_play_scraper.
+
+    A diferencia de google_play_scraper, at y repliedAt son fechas UTC con
+    zona horaria y no dependen de la zona horaria del servidor.
+
+    Returns:
+        Dict con reviewId, userName, content, score, thumbsUpCount, at,
+        replyContent, repliedAt y appVersion
+    """
+    def get(path, post=None):
+        try:
+            value = _lookup(item, path)
+            return post(value) if post else value
+        except (IndexError, KeyError, TypeError, ValueError, OSError):
+            return None
+
+    return {
+        "reviewId": get([0]),
+        "userName": get([1, 0]),
+        "userImage": get([1, 1, 3, 2]),
+        "content": get([4]),
+        "score": get([2]),
+        "thumbsUpCount": get([6]),
+        "reviewCreatedVersion": get([10]),
+        "at": get([5, 0], _utc_datetime),
+        "replyContent": get([7, 1]),
+        "repliedAt": get([7, 2, 0], _utc_datetime),
+        "appVersion": get([10]),
+    }
+
+
+def parse_reviews_payload(payload: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Extrae los comentarios y el siguiente token del payload del sobre.
+
+    Returns:
+        Tupla (comentarios, token de la página siguiente o None)
+    """
+    try:
+        data = json.loads(payload)
+        items = data[0] or []
+        token = data[-2][-1]
+    except (TypeError, IndexError, ValueError):
+        return [], None
+    if not isinstance(token, str):
+        token = None
+    return [parse_review(item) for item in items], token
+
+
+class PlayStoreReviewsClient:
+    """
+    Cliente asíncrono del endpoint de comentarios de Play Store.
+
+    Usa un httpx.AsyncClient con pool keep-alive por event loop, de modo que
+    las páginas sucesivas (y los shards en paralelo) reutilizan conexiones.
+    """
+
+    def __init__(
+        self,
+        base_url: str = PLAYSTORE_BASE_URL,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        http_config: Optional[Dict] = None
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.transport = transport
+        self.http_config = dict(DEFAULT_PLAYSTORE_HTTP_CONFIG, **(http_config or {}))
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._requests = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            # Las conexiones de otro event loop no se pueden reutilizar
+            if self._client is not None:
+                close_client_from_other_loop(self._client, self._client_loop)
+            config = self.http_config
+            self._client = httpx.AsyncClient(
+                transport=self.transport,
+                headers={"content-type": "application/x-www-form-urlencoded;charset=UTF-8"},
+                limits=httpx.Limits(
+                    max_connections=config["max_connections"],
+                    max_keepalive_connections=config["max_keepalive_connections"],
+                    keepalive_expiry=config["keepalive_expiry"]
+                ),
+                timeout=httpx.Timeout(config["read_timeout"], connect=config["connect_timeout"])
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def _fetch_items(
+        self,
+        app_id: str,
+        lang: str,
+        country: str,
+        sort: int,
+        count: int,
+        filter_score_with: Optional[int],
+        filter_device_with: Optional[int],
+        pagination_token: Optional[str]
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        body = build_reviews_body(app_id, sort, count, filter_score_with, filter_device_with, pagination_token)
+        params = {"hl": lang, "gl": country}
+        self._requests += 1
+
+        async with self._get_client().stream(
+            "POST", f"{self.base_url}{REVIEWS_PATH}", params=params, content=body
+        ) as response:
+            if response.status_code == 404:
+                raise PlayStoreNotFoundError(404, "App not found.")
+            if response.status_code >= 400:
+                raise PlayStoreError(response.status_code, response.reason_phrase)
+
+            parser = BatchExecuteParser()
+            chunks = response.aiter_text()
+            async for text in chunks:
+                for envelope in parser.feed(text):
+                    if (isinstance(envelope, list) and len(envelope) > 2
+                            and envelope[0] == "wrb.fr" and envelope[1] == REVIEWS_RPC_ID):
+                        # El resto de la respuesta (metadatos) no se analiza, solo
+                        # se consume para devolver la conexión al pool
+                        async for _ in chunks:
+                            pass
+                        return parse_reviews_payload(envelope[2])
+        return [], None
+
+    async def reviews(
+        self,
+        app_id: str,
+        lang: str = "en",
+        country: str = "us",
+        sort: int = 2,
+        count: int = 100,
+        filter_score_with: Optional[int] = None,
+        filter_device_with: Optional[int] = None,
+        continuation_token: Optional[ReviewsContinuationToken] = None
+    ) -> Tuple[List[Dict[str, Any]], ReviewsContinuationToken]:
+        """
+        Descarga una página de comentarios (equivalente asíncrono de
+        google_play_scraper.reviews, con los mismos argumentos y resultado).
+
+        Args:
+            app_id: ID de la aplicación
+            lang: Idioma de los comentarios
+            country: País de origen
+            sort: Orden (google_play_scraper.Sort)
+            count: Número de comentarios de la página
+            continuation_token: Token devuelto por la página anterior
+
+        Returns:
+            Tupla (comentarios, continuation token)
+        """
+        if continuation_token is not None:
+            token = continuation_token.token
+            if token is None:
+                return [], continuation_token
+            lang = continuation_token.lang
+            country = continuation_token.country
+            sort = continuation_token.sort
+            count = continuation_token.count
+            filter_score_with = continuation_token.filter_score_with
+            filter_device_with = continuation_token.filter_device_with
+        else:
+            token = None
+
+        sort = int(sort)
+        result: List[Dict[str, Any]] = []
+        while len(result) < count:
+            items, token = await self._fetch_items(
+                app_id, lang, country, sort, min(count - len(result), MAX_COUNT_EACH_FETCH),
+                filter_score_with, filter_device_with, token
+            )
+            result.extend(items)
+            if token is None or not items:
+                break
+
+        return result, ReviewsContinuationToken(
+            token, lang, country, sort, count, filter_score_with, filter_device_with
+        )
+
+    def get_stats(self) -> Dict:
+        """Peticiones realizadas por el cliente."""
+        return {"peticiones": self._requests}
+
+    async def aclose(self):
+        """Cierra las conexiones del pool."""
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+
+# Singleton: un solo pool de conexiones hacia Play Store por proceso
+_playstore_client_instance = None
+
+def get_playstore_client() -> PlayStoreReviewsClient:
+    """
+    Obtiene la instancia singleton del cliente de Play Store.
+
+    Returns:
+        Instancia de PlayStoreReviewsClient
+    """
+    global _playstore_client_instance
+    if _playstore_client_instance is None:
+        _playstore_client_instance = PlayStoreReviewsClient()
+    return _playstore_client_instance
+
+async def close_playstore_client():
+    """Cierra las conexiones del cliente de Play Store si fue inicializado."""
+    if _playstore_client_instance is not None:
+        await _playstore_client_instance.aclose()
@@ -0,0 +1,318 @@
+"""
+Control de ritmo de las peticiones de scraping a Google Play.
+
+AdaptiveRateLimiter es un token bucket cuya tasa se ajusta según las señales
+de throttling que se observan (AIMD): cada página descargada sin problemas
+sube la tasa un poco y cada respuesta 429/503 (o una latencia muy superior a
+la habitual) la reduce a la mitad. backoff_delay calcula la espera entre
+reintentos con backoff exponencial y jitter.
+
+Con varias réplicas de la API, DistributedRateLimiter comparte el ritmo entre
+todos los procesos mediante un GCRA en Redis (una clave por host destino) y
+usa el token bucket local cuando Redis no está disponible.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+from dotenv import load_dotenv
+from app.core.redis_client import get_redis_client
+
+load_dotenv()
+
+# Códigos HTTP con los que Google indica que se deben espaciar las peticiones
+THROTTLING_STATUS_CODES = (429, 503)
+
+DEFAULT_RATE_LIMIT_CONFIG = {
+    "initial_rate": float(os.getenv('SCRAPING_RATE_INITIAL', '1.0')),  # peticiones/s
+    "min_rate": float(os.getenv('SCRAPING_RATE_MIN', '0.1')),
+    "max_rate": float(os.getenv('SCRAPING_RATE_MAX', '4.0')),
+    "burst": float(os.getenv('SCRAPING_RATE_BURST', '2')),
+}
+
+# Host al que se dirigen las peticiones de google-play-scraper
+PLAY_STORE_HOST = "play.google.com"
+
+# Si es false, cada proceso limita su ritmo por separado
+SCRAPING_DISTRIBUTED_RATE_LIMIT = os.getenv('SCRAPING_DISTRIBUTED_RATE_LIMIT', 'true').lower() == 'true'
+
+DEFAULT_RETRY_CONFIG = {
+    "max_retries": int(os.getenv('SCRAPING_MAX_RETRIES', '4')),
+    "backoff_base": float(os.getenv('SCRAPING_BACKOFF_BASE', '1.0')),  # segundos
+    "backoff_max": float(os.getenv('SCRAPING_BACKOFF_MAX', '30.0')),
+}
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """
+    Indica si un error de google-play-scraper corresponde a throttling.
+
+    google-play-scraper convierte los errores HTTP en ExtraHTTPError con el
+    código en el mensaje ("Status code 429 returned.").
+
+    Args:
+        error: Excepción lanzada al descargar una página
+
+    Returns:
+        True si el error es un 429/503
+    """
+    code = getattr(error, 'code', None)
+    if code in THROTTLING_STATUS_CODES:
+        return True
+    message = str(error)
+    return any(f"Status code {status}" in message for status in THROTTLING_STATUS_CODES)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Espera antes del reintento `attempt` (0, 1, 2...) con backoff exponencial
+    y jitter completo: un valor aleatorio entre 0 y min(cap, base * 2^attempt).
+
+    El jitter evita que varios shards throttleados reintenten a la vez.
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket con tasa adaptativa.
+
+    Cada petición consume un token; los tokens se reponen a `rate` por
+    segundo hasta un máximo de `burst`. acquire() reserva el token de forma
+    síncrona (el saldo puede quedar negativo) y luego espera lo necesario, de
+    modo que las peticiones concurrentes de varios shards quedan espaciadas
+    sin necesidad de un lock asíncrono.
+    """
+
+    def __init__(
+        self,
+        initial_rate: float = 1.0,
+        min_rate: float = 0.1,
+        max_rate: float = 4.0,
+        burst: float = 2,
+        increase_step: float = 0.25,
+        decrease_factor: float = 0.5,
+        slow_latency_factor: float = 3.0,
+        smoothing: float = 0.3
+    ):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = max(1.0, burst)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.slow_latency_factor = slow_latency_factor
+        self.smoothing = smoothing
+        self._rate = max(min_rate, min(initial_rate, max_rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+        # Latencia media de las páginas (media móvil exponencial)
+        self._latency = None
+
+        self._requests = 0
+        self._throttles = 0
+        self._wait_time = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'AdaptiveRateLimiter':
+        """Crea un limitador a partir de un diccionario de configuración."""
+        return cls(
+            initial_rate=config["initial_rate"],
+            min_rate=config["min_rate"],
+            max_rate=config["max_rate"],
+            burst=config["burst"]
+        )
+
+    @property
+    def rate(self) -> float:
+        """Tasa actual (peticiones por segundo)"""
+        return self._rate
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """
+        Reserva un token.
+
+        Returns:
+            Segundos que hay que esperar antes de hacer la petición
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            self._requests += 1
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self._rate
+            self._wait_time += wait
+            return wait
+
+    async def acquire(self) -> float:
+        """
+        Espera hasta que se pueda hacer la siguiente petición.
+
+        Returns:
+            Segundos esperados
+        """
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def record_success(self, latency: Optional[float] = None):
+        """
+        Registra una página descargada y sube la tasa (aumento aditivo).
+
+        Una latencia muy superior a la media se trata como señal temprana de
+        throttling y reduce la tasa en lugar de subirla.
+
+        Args:
+            latency: Duración de la petición en segundos
+        """
+        with self._lock:
+            slow = (latency is not None and self._latency is not None
+                    and latency > self._latency * self.slow_latency_factor)
+            if latency is not None:
+                if self._latency is None:
+                    self._latency = latency
+                else:
+                    self._latency = self.smoothing * latency + (1 - self.smoothing) * self._latency
+
+            if slow:
+                self._decrease()
+            else:
+                self._rate = min(self.max_rate, self._rate + self.increase_step)
+
+    def record_throttle(self):
+        """Registra un 429/503: reduce la tasa y vacía el bucket."""
+        with self._lock:
+            self._throttles += 1
+            self._decrease()
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0)
+
+    def _decrease(self):
+        self._rate = max(self.min_rate, self._rate * self.decrease_factor)
+
+    def get_stats(self) -> Dict:
+        """
+        Obtiene el estado actual del limitador.
+
+        Returns:
+            Diccionario con tasa, peticiones, throttling y tiempo de espera
+        """
+        with self._lock:
+            return {
+                "tasa_rps": round(self._rate, 3),
+                "peticiones": self._requests,
+                "throttling": self._throttles,
+                "espera_total": round(self._wait_time, 3),
+                "latencia_media": round(self._latency, 3) if self._latency is not None else None
+            }
+
+
+class DistributedRateLimiter:
+    """
+    Limitador compartido por todas las réplicas a través de Redis.
+
+    Cada petición reserva un turno con GCRA en la clave del host destino, de
+    modo que el ritmo total hacia Google Play no crece con el número de
+    réplicas. La tasa la sigue ajustando el AdaptiveRateLimiter local según
+    el throttling observado, y ese mismo limitador se usa como respaldo si
+    Redis no está disponible.
+
+    Expone la misma interfaz que AdaptiveRateLimiter (acquire,
+    record_success, record_throttle, rate, get_stats).
+    """
+
+    KEY_PREFIX = "ratelimit"
+
+    def __init__(self, local: AdaptiveRateLimiter, host: str = PLAY_STORE_HOST):
+        self.local = local
+        self.key = f"{self.KEY_PREFIX}:{host}"
+        self.redis_client = get_redis_client()
+
+        self._distributed = 0
+        self._fallback = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+
+    @property
+    def rate(self) -> float:
+        """Tasa actual (peticiones por segundo)"""
+        return self.local.rate
+
+    async def acquire(self) -> float:
+        """
+        Espera el siguiente turno del host (en Redis o, si no está
+        disponible, en el token bucket local).
+
+        Returns:
+            Segundos esperados en cola
+        """
+        wait = await self.redis_client.reserve_rate_slot(
+            self.key, 1.0 / self.local.rate, int(self.local.burst)
+        )
+        if wait is None:
+            self._fallback += 1
+            wait = self.local.reserve()
+        else:
+            self._distributed += 1
+
+        self._wait_time += wait
+        self._max_wait = max(self._max_wait, wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def record_success(self, latency: Optional[float] = None):
+        """Registra una página descargada (ver AdaptiveRateLimiter.record_success)."""
+        self.local.record_success(latency)
+
+    def record_throttle(self):
+        """Registra un 429/503 (ver AdaptiveRateLimiter.record_throttle)."""
+        self.local.record_throttle()
+
+    def get_stats(self) -> Dict:
+        """
+        Obtiene el estado del limitador, incluido el retardo en cola.
+
+        Returns:
+            Diccionario con tasa, peticiones por modo y espera en cola
+        """
+        peticiones = self._distributed + self._fallback
+        return {
+            "modo": "redis" if self.redis_client.is_available() else "local",
+            "host": self.key.split(":", 1)[1],
+            "tasa_rps": round(self.local.rate, 3),
+            "peticiones_distribuidas": self._distributed,
+            "peticiones_locales": self._fallback,
+            "espera_total": round(self._wait_time, 3),
+            "espera_media": round(self._wait_time / peticiones, 3) if peticiones else 0.0,
+            "espera_maxima": round(self._max_wait, 3),
+            "throttling": self.local.get_stats()["throttling"]
+        }
+
+
+# Singleton: todas las extracciones del proceso salen por la misma IP
+_rate_limiter_instance = None
+
+def get_scraping_rate_limiter():
+    """
+    Obtiene la instancia singleton del limitador de scraping.
+
+    Returns:
+        DistributedRateLimiter, o AdaptiveRateLimiter si
+        SCRAPING_DISTRIBUTED_RATE_LIMIT=false
+    """
+    global _rate_limiter_instance
+    if _rate_limiter_instance is None:
+        local = AdaptiveRateLimiter.from_config(DEFAULT_RATE_LIMIT_CONFIG)
+        if SCRAPING_DISTRIBUTED_RATE_LIMIT:
+            _rate_limiter_instance = DistributedRateLimiter(local)
+        else:
+            _rate_limiter_instance = local
+    return _rate_limiter_instance
@@ -0,0 +1,99 @@
+"""
+Cursor del scraping incremental por aplicación.
+
+Guarda, por app, idioma y país, el high-water mark (el comentario más nuevo
+visto) y si la última extracción llegó al final de los comentarios. Con el
+criterio 'recientes' el scraper solo descarga las páginas nuevas hasta
+alcanzar el high-water mark y completa el resultado con los comentarios
+guardados en el repositorio SQLite (app.core.review_store).
+
+Relación con el repositorio SQLite:
+    - ReviewStore guarda los comentarios y clasificaciones de cada instancia;
+      el scraper lee de ahí los comentarios anteriores al high-water mark.
+    - Este cursor está en Redis para que todas las réplicas compartan el
+      mismo high-water mark, y guarda lo que SQLite no tiene: la fecha y hora
+      del comentario más nuevo y si la extracción llegó al final.
+    - El scraper solo avanza el cursor después de guardar en SQLite los
+      comentarios nuevos; si esa escritura falla, el cursor no cambia y la
+      siguiente extracción los vuelve a descargar. Si el cursor expira, si
+      Redis no está disponible o si la base local no tiene el comentario del
+      high-water mark (otra réplica lo archivó), se hace una extracción
+      completa.
+"""
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional
+from app.core.redis_client import get_redis_client
+
+# TTL del cursor del scraping incremental (30 días por defecto)
+REVIEW_HISTORY_TTL = int(os.getenv('REVIEW_HISTORY_TTL', str(30 * 24 * 3600)))
+
+
+class ReviewHistoryStore:
+    """
+    Persistencia en Redis del cursor del scraping incremental por app.
+
+    Formato de cada entrada:
+        high_water_mark: {review_id, at} del comentario más nuevo
+        completo: True si la última extracción llegó al final de los comentarios
+        actualizado: fecha de la última actualización (ISO 8601)
+    """
+
+    KEY_PREFIX = "reviews"
+
+    def __init__(self, ttl: int = REVIEW_HISTORY_TTL):
+        self.ttl = ttl
+        self.redis_client = get_redis_client()
+
+    def _key(self, app_id: str, lang: str, country: str) -> str:
+        return f"{self.KEY_PREFIX}:{app_id}:{lang}:{country}"
+
+    async def load(self, app_id: str, lang: str, country: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene el cursor de una app.
+
+        Args:
+            app_id: ID de la aplicación
+            lang: Idioma de los comentarios
+            country: País de origen
+
+        Returns:
+            Cursor o None si no existe
+        """
+        return await self.redis_client.get_cached(self._key(app_id, lang, country))
+
+    async def save(
+        self,
+        app_id: str,
+        lang: str,
+        country: str,
+        newest_review_id: Optional[str],
+        newest_at: Optional[datetime],
+        completo: bool
+    ) -> bool:
+        """
+        Guarda el cursor de una app.
+
+        Args:
+            app_id: ID de la aplicación
+            lang: Idioma de los comentarios
+            country: País de origen
+            newest_review_id: ID del comentario más nuevo
+            newest_at: Fecha y hora del comentario más nuevo
+            completo: True si la extracción llegó al final de los comentarios
+
+        Returns:
+            True si se guardó correctamente
+        """
+        if not newest_review_id:
+            return False
+
+        history = {
+            "high_water_mark": {
+                "review_id": newest_review_id,
+                "at": newest_at.isoformat() if newest_at else None
+            },
+            "completo": completo,
+            "actualizado": datetime.now().isoformat()
+        }
+        return await self.redis_client.set_cached(self._key(app_id, lang, country), history, ttl=self.ttl)
@@ -0,0 +1,401 @@
+"""
+Pipeline completo de scraping, clasificación y generación de requisitos.
+
+Centraliza el flujo que antes vivía en el endpoint /scrape para que pueda
+reutilizarse desde el endpoint síncrono y desde los trabajos asíncronos,
+notificando el progreso de cada etapa mediante eventos.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.schemas.scraping_schemas import (
+    ScrapingRequest, ScrapingResponse, ReviewData, RequirementsData
+)
+from app.services.scraping_service import PlayStoreScraper, ScrapeShard
+from app.services.bert_classifier_service import get_bert_classifier
+from app.services.classification_cache import get_models_generation, BINARY_MODEL_NAME
+from app.services.openrouter_service import get_requirements_generator
+from app.core.redis_client import get_redis_client
+from app.core.review_store import get_review_store
+from app.core.model_config import get_model_generation, DEFAULT_MULTICLASS_MODEL
+from app.core.executors import Stage, run_in_stage
+
+# Callback de eventos: recibe (nombre del evento, datos) y se ejecuta en el event loop
+EventCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+# TTL del resultado completo de /scrape en caché (1 hora)
+SCRAPE_CACHE_TTL = 3600
+
+
+async def build_scrape_cache_key(payload: ScrapingRequest) -> str:
+    """
+    Genera la cache key de un resultado de /scrape a partir de la petición.
+
+    La key incluye la generación del namespace "scrape" y la de los modelos
+    usados, de modo que un modelo nuevo invalida los resultados que dependen de él.
+
+    Args:
+        payload: Petición de scraping
+
+    Returns:
+        Cache key
+    """
+    cache_key_data = {
+        "app_id": payload.app_id,
+        "max_reviews": payload.max_reviews,
+        "max_rating": payload.max_rating,
+        "criterios_busqueda": payload.criterios_busqueda,
+        "criterios_adicionales": payload.criterios_adicionales,
+        "paises": payload.paises,
+        "idioma": payload.idioma,
+        "since": payload.since.isoformat() if payload.since else None,
+        "until": payload.until.isoformat() if payload.until else None,
+        "objetivo_relevantes": payload.objetivo_relevantes,
+        "multiclass_model": payload.multiclass_model,
+        "modelos": get_models_generation(payload.multiclass_model)
+    }
+    redis_client = get_redis_client()
+    return redis_client.generate_cache_key(await redis_client.versioned_prefix("scrape"), cache_key_data)
+
+
+def build_scrape_shards(payload: ScrapingRequest) -> List[ScrapeShard]:
+    """
+    Genera los shards (criterio, país, idioma) de una petición de scraping.
+
+    Args:
+        payload: Petición de scraping
+
+    Returns:
+        Lista de shards, primero los del criterio principal
+    """
+    criterios = list(dict.fromkeys([payload.criterios_busqueda] + payload.criterios_adicionales))
+    return [
+        ScrapeShard(criterio, pais, payload.idioma)
+        for criterio in criterios
+        for pais in payload.paises
+    ]
+
+
+def build_scraping_response(data: Dict[str, Any], from_cache: bool = False) -> ScrapingResponse:
+    """
+    Convierte un resultado serializado (caché o pipeline) en ScrapingResponse.
+
+    Args:
+        data: Diccionario con el resultado del pipeline
+        from_cache: Indica si el resultado proviene del caché
+
+    Returns:
+        ScrapingResponse
+    """
+    reviews_data = [ReviewData(**r) for r in data['reviews']]
+    requirements_data = None
+    if data.get('requirements'):
+        requirements_data = RequirementsData(**data['requirements'])
+
+    return ScrapingResponse(
+        success=data.get('success', True),
+        app_id=data['app_id'],
+        total_reviews=data['total_reviews'],
+        reviews=reviews_data,
+        stats=data['stats'],
+        requirements=requirements_data,
+        from_cache=from_cache
+    )
+
+
+async def get_cached_scrape_response(payload: ScrapingRequest) -> Optional[ScrapingResponse]:
+    """
+    Busca en caché el resultado de una petición de scraping.
+
+    Args:
+        payload: Petición de scraping
+
+    Returns:
+        ScrapingResponse desde caché o None si no existe
+    """
+    cached_result = await get_redis_client().get_cached(await build_scrape_cache_key(payload))
+    if not cached_result:
+        return None
+
+    print(f"\n{'='*60}")
+    print("⚡ RESULTADO OBTENIDO DESDE CACHÉ")
+    print(f"{'='*60}\n")
+    return build_scraping_response(cached_result, from_cache=True)
+
+
+class ScrapePipeline:
+    """
+    Ejecuta scraping → filtro binario → clasificación multiclase → requisitos.
+
+    Las llamadas bloqueantes (páginas de Play Store, LLM) corren en sus pools
+    dedicados y la clasificación usa el cliente HTTP asíncrono del
+    clasificador. Los eventos de progreso se encolan y se entregan en orden al
+    callback `on_event`.
+
+    Eventos emitidos:
+        pagina: {pagina, reviews, acumulados}
+        scraping_completado: {total, stats}
+        lote_binario: {procesados, total}
+        lote_clasificado: {procesados, total, reviews}
+        clasificacion_completada: {relevantes}
+        requisito: {requisito, generados}
+        requisitos: {requirements}
+    """
+
+    def __init__(self, payload: ScrapingRequest, on_event: Optional[EventCallback] = None):
+        self.payload = payload
+        self.on_event = on_event
+        self._events: Optional[asyncio.Queue] = None
+        self._requisitos_generados = 0
+
+    def _emit(self, evento: str, data: Dict[str, Any]):
+        """Encola un evento desde el event loop."""
+        if self._events is not None:
+            self._events.put_nowait((evento, data))
+
+    async def _dispatch_events(self):
+        """Entrega los eventos encolados al callback en orden de llegada."""
+        while True:
+            item = await self._events.get()
+            if item is None:
+                return
+            evento, data = item
+            try:
+                await self.on_event(evento, data)
+            except Exception as e:
+                print(f"⚠️  Error al procesar evento '{evento}': {str(e)}")
+
+    def _on_page(self, pagina: int, nuevos: list, acumulados: int):
+        self._emit("pagina", {
+            "pagina": pagina,
+            "reviews": nuevos,
+            "acumulados": acumulados
+        })
+
+    def _on_batch(self, etapa: str, procesados: int, total: int, clasificados: list):
+        if etapa == 'binary':
+            self._emit("lote_binario", {"procesados": procesados, "total": total})
+        else:
+            self._emit("lote_clasificado", {
+                "procesados": procesados,
+                "total": total,
+                "reviews": clasificados
+            })
+
+    def _on_requirement(self, requisito: dict):
+        self._requisitos_generados += 1
+        self._emit("requisito", {
+            "requisito": requisito,
+            "generados": self._requisitos_generados
+        })
+
+    async def _store_classifications(self, reviews: list, classified_reviews: list):
+        """Guarda las predicciones binarias y multiclase en el repositorio local."""
+        multiclass_model = (self.payload.multiclass_model or DEFAULT_MULTICLASS_MODEL).lower()
+        relevant_ids = {r['id_original'] for r in classified_reviews}
+        store = get_review_store()
+
+        def save():
+            store.save_classifications(
+                BINARY_MODEL_NAME,
+                get_model_generation(BINARY_MODEL_NAME),
+                [(r['id_original'], r['id_original'] in relevant_ids, None, None) for r in reviews]
+            )
+            store.save_classifications(
+                multiclass_model,
+                get_model_generation(multiclass_model),
+                [
+                    (r['id_original'], None, r['categoria'], r['confianza'])
+                    for r in classified_reviews
+                    if r['categoria'] != "error"
+                ]
+            )
+
+        try:
+            await run_in_stage(Stage.CLASSIFICATION, save)
+        except Exception as e:
+            print(f"⚠️ No se pudieron guardar las clasificaciones en el repositorio local: {e}")
+
+    async def _scrape_and_classify(
+        self,
+        scraper: PlayStoreScraper,
+        classifier,
+        classification_stats: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], List[Dict], List[Dict]]:
+        """
+        Pasos 1 a 3: scraping, filtro binario y clasificación multiclase en streaming.
+
+        El scraper entrega las páginas de comentarios negativos a medida que
+        las descarga y el clasificador procesa cada una mientras se descarga
+        la siguiente. Con objetivo_relevantes el scraper deja de pedir páginas
+        en cuanto hay suficientes comentarios relevantes.
+
+        Returns:
+            Tupla (resultado del scraping, comentarios enviados a clasificar,
+            comentarios relevantes clasificados en el orden del scraping)
+        """
+        payload = self.payload
+        objetivo = payload.objetivo_relevantes
+
+        print(f"\n{'='*60}")
+        if objetivo:
+            print(f"🤖 CLASIFICACIÓN EN STREAMING (objetivo: {objetivo} relevantes)")
+        else:
+            print("🤖 CLASIFICACIÓN EN STREAMING CON MODELOS BERT")
+        print(f"{'='*60}")
+
+        stream = scraper.stream_negative_reviews(
+            app_id=payload.app_id,
+            num_comentarios_negativos=payload.max_reviews,
+            filtro_estrellas=payload.max_rating,
+            criterio_busqueda=payload.criterios_busqueda,
+            desde=payload.since,
+            hasta=payload.until,
+            on_page=self._on_page,
+            shards=build_scrape_shards(payload)
+        )
+        try:
+            classified = await classifier.classify_stream(
+                stream,
+                multiclass_model=payload.multiclass_model,
+                on_batch=self._on_batch,
+                stats=classification_stats,
+                max_relevant=objetivo
+            )
+        finally:
+            # No dejar la extracción corriendo si la clasificación falla
+            await stream.aclose()
+            scraping_result = await stream.wait()
+
+        print(f"\n✅ Scraping completado: {scraping_result['total_found']} comentarios extraídos")
+        self._emit("scraping_completado", {
+            "total": scraping_result['total_found'],
+            "stats": scraping_result['stats']
+        })
+
+        # Solo cuenta lo que forma parte del resultado del scraping, en su orden
+        posicion = {r['id_original']: i for i, r in enumerate(scraping_result['reviews'])}
+        classified_input = sorted(
+            (r for r in stream.reviews if r['id_original'] in posicion),
+            key=lambda r: posicion[r['id_original']]
+        )
+        classified_reviews = sorted(
+            (r for r in classified if r['id_original'] in posicion),
+            key=lambda r: posicion[r['id_original']]
+        )
+        return scraping_result, classified_input, classified_reviews
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Ejecuta el pipeline completo y guarda el resultado en caché.
+
+        Returns:
+            Diccionario serializable con el resultado (mismo formato que ScrapingResponse)
+        """
+        dispatcher = None
+        if self.on_event is not None:
+            self._events = asyncio.Queue()
+            dispatcher = asyncio.create_task(self._dispatch_events())
+
+        try:
+            return await self._run_stages()
+        finally:
+            if dispatcher is not None:
+                self._events.put_nowait(None)
+                await dispatcher
+
+    async def _run_stages(self) -> Dict[str, Any]:
+        payload = self.payload
+
+        # Paso 1: Scraping de comentarios
+        print(f"\n{'='*60}")
+        print("🚀 INICIANDO PROCESO DE SCRAPING Y CLASIFICACIÓN")
+        print(f"{'='*60}")
+
+        scraper = PlayStoreScraper()
+        classifier = get_bert_classifier()
+        classification_stats = {}
+        scraping_result, classified_input, classified_reviews = await self._scrape_and_classify(
+            scraper, classifier, classification_stats
+        )
+
+        print(f"\n{'='*60}")
+        print("✅ CLASIFICACIÓN COMPLETADA")
+        print(f"{'='*60}")
+        print(f"Total clasificado: {len(classified_input)}")
+        print(f"Total relevante: {len(classified_reviews)}")
+        if classified_input:
+            print(f"Tasa de relevancia: {len(classified_reviews)/len(classified_input)*100:.1f}%")
+        print(f"{'='*60}\n")
+        self._emit("clasificacion_completada", {"relevantes": len(classified_reviews)})
+        await self._store_classifications(classified_input, classified_reviews)
+
+        # Paso 4: Generación de requisitos No Funcionales
+        requirements_data = None
+        token_usage = None
+        try:
+            generator = get_requirements_generator()
+            requirements_result = await generator.agenerate_requirements(
+                classified_reviews, on_requirement=self._on_requirement
+            )
+            token_usage = requirements_result.get('uso_tokens') if requirements_result else None
+
+            # Convertir a RequirementsData si la generación fue exitosa
+            if requirements_result and 'requisitos' in requirements_result:
+                requirements_data = RequirementsData(**requirements_result)
+
+                print(f"\n{'='*60}")
+                print("✅ REQUISITOS GENERADOS EXITOSAMENTE")
+                print(f"{'='*60}")
+                print(f"Total de requisitos: {requirements_data.resumen.total_requisitos}")
+                print(f"Por categoría: {requirements_data.resumen.por_categoria}")
+                print(f"{'='*60}\n")
+        except Exception as e:
+            print(f"\n⚠️  Error al generar requisitos: {str(e)}")
+            print("Continuando sin requisitos...\n")
+
+        self._emit("requisitos", {
+            "requirements": requirements_data.dict() if requirements_data else None
+        })
+
+        # Convertir a ReviewData
+        reviews_data = [ReviewData(**r) for r in classified_reviews]
+
+        # Actualizar estadísticas
+        stats = scraping_result['stats'].copy()
+        stats['comentarios_antes_filtro'] = len(classified_input)
+        stats['comentarios_relevantes'] = len(classified_reviews)
+        stats['tasa_relevancia'] = round(len(classified_reviews) / len(classified_input), 4) if classified_input else 0
+        if payload.objetivo_relevantes:
+            stats['objetivo_relevantes'] = payload.objetivo_relevantes
+            stats['objetivo_alcanzado'] = len(classified_reviews) >= payload.objetivo_relevantes
+
+        # Agregar distribución de categorías
+        category_distribution = {}
+        for review in classified_reviews:
+            cat = review['categoria']
+            category_distribution[cat] = category_distribution.get(cat, 0) + 1
+        stats['distribucion_categorias'] = category_distribution
+        stats['lotes_adaptativos'] = classifier.get_batching_stats()
+        stats['cache_clasificacion'] = classification_stats
+        if token_usage:
+            stats['tokens_llm'] = token_usage
+
+        print(f"\n{'='*60}")
+        print("✅ PROCESO COMPLETO FINALIZADO")
+        print(f"{'='*60}\n")
+
+        # Preparar respuesta
+        response_data = {
+            "success": True,
+            "app_id": payload.app_id,
+            "total_reviews": len(classified_reviews),
+            "reviews": [r.dict() for r in reviews_data],
+            "stats": stats,
+            "requirements": requirements_data.dict() if requirements_data else None,
+            "from_cache": False
+        }
+
+        # Guardar en caché (TTL: 1 hora = 3600 segundos)
+        await get_redis_client().set_cached(await build_scrape_cache_key(payload), response_data, ttl=SCRAPE_CACHE_TTL)
+
+        return response_data
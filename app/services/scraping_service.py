@@ -1,13 +1,191 @@
 from google_play_scraper import reviews, Sort
+from google_play_scraper.exceptions import NotFoundError
+import asyncio
+import os
 import time
-from typing import List, Dict, Any
+from datetime import date, datetime, timezone
+from typing import List, Dict, Any, Awaitable, Callable, NamedTuple, Optional
 from ..schemas.scraping_schemas import ReviewData, CriteriosBusqueda
+from ..core.executors import Stage, run_in_stage, get_stage_executors
+from ..core.review_store import get_review_store
+from .review_history_service import ReviewHistoryStore
+from .playstore_client import PlayStoreNotFoundError, get_playstore_client
+from .rate_limiter import (
+    DEFAULT_RETRY_CONFIG,
+    backoff_delay,
+    get_scraping_rate_limiter,
+    is_throttling_error,
+)
+
+# Cliente de Play Store: "native" (httpx asíncrono con pool keep-alive) o
+# "library" (google_play_scraper en el pool de scraping)
+SCRAPING_CLIENT = os.getenv('SCRAPING_CLIENT', 'native').lower()
+
+
+class ScrapeShard(NamedTuple):
+    """Combinación de criterio, país e idioma que se extrae de forma independiente"""
+    criterio: CriteriosBusqueda
+    country: str = 'pe'
+    lang: str = 'es'
+
+
+def new_timing_stats() -> Dict[str, float]:
+    """Acumulador de tiempos (segundos) y reintentos de una extracción"""
+    return {'descarga': 0.0, 'espera_limitador': 0.0, 'backoff': 0.0, 'reintentos': 0, 'throttling': 0}
+
+
+def merge_timing_stats(tiempos: List[Dict[str, float]]) -> Dict[str, float]:
+    """Suma los tiempos de varias extracciones"""
+    total = new_timing_stats()
+    for t in tiempos:
+        for key in total:
+            total[key] += t.get(key, 0)
+    return total
+
+
+def round_timing_stats(tiempos: Dict[str, float]) -> Dict[str, float]:
+    return {key: round(value, 3) for key, value in tiempos.items()}
+
+
+def to_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Fecha con zona horaria UTC. Las fechas sin zona (google_play_scraper y
+    marcas guardadas por versiones anteriores) están en hora local.
+    """
+    if value is None:
+        return None
+    return value.astimezone(timezone.utc)
+
+
+def in_date_range(fecha: str, desde: Optional[date], hasta: Optional[date]) -> bool:
+    """Indica si una fecha YYYY-MM-DD está dentro del rango (inclusive)"""
+    if desde and fecha < desde.isoformat():
+        return False
+    if hasta and fecha > hasta.isoformat():
+        return False
+    return True
+
+
+class ReviewPageStream:
+    """
+    Iterador asíncrono de las páginas de comentarios negativos de una extracción.
+
+    La extracción corre en una tarea propia desde el primer __anext__, de modo
+    que el consumidor puede procesar la página N mientras se descarga la N+1.
+    Cada iteración devuelve los comentarios nuevos (sin duplicados) que
+    llegaron desde la anterior; si llegaron varias páginas mientras el
+    consumidor estaba ocupado, se entregan juntas. Al terminar se entregan
+    también los comentarios del resultado final que no pasaron por on_page
+    (p. ej. tras una extracción completa de respaldo).
+
+    Uso:
+        stream = scraper.stream_negative_reviews(app_id=...)
+        async for pagina in stream:
+            ...
+        resultado = await stream.wait()
+    """
+
+    def __init__(
+        self,
+        scrape: Callable[[Callable[[int, List[Dict], int], None], Callable[[], bool]], Awaitable[Dict[str, Any]]],
+        on_page: Optional[Callable[[int, List[Dict], int], None]] = None
+    ):
+        self._scrape = scrape
+        self._on_page = on_page
+        self._task: Optional[asyncio.Task] = None
+        self._pages: asyncio.Queue = asyncio.Queue()
+        self._ids = set()
+        self._stopped = False
+        self._finished = False
+        # Comentarios entregados, en orden
+        self.reviews: List[Dict] = []
+
+    def _page_received(self, pagina: int, nuevos: List[Dict], acumulados: int):
+        if self._on_page:
+            self._on_page(pagina, nuevos, acumulados)
+        if not self._stopped:
+            self._pages.put_nowait(nuevos)
+
+    async def _run(self) -> Dict[str, Any]:
+        try:
+            return await self._scrape(self._page_received, lambda: self._stopped)
+        finally:
+            self._pages.put_nowait(None)
+
+    def _take_new(self, reviews: List[Dict]) -> List[Dict]:
+        nuevos = []
+        for review in reviews:
+            if review['id_original'] not in self._ids:
+                self._ids.add(review['id_original'])
+                nuevos.append(review)
+        self.reviews.extend(nuevos)
+        return nuevos
+
+    def __aiter__(self) -> 'ReviewPageStream':
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __anext__(self) -> List[Dict]:
+        self.__aiter__()
+        while not self._finished:
+            pagina = []
+            item = await self._pages.get()
+            # Juntar las páginas que llegaron mientras el consumidor trabajaba
+            while True:
+                if item is None:
+                    self._finished = True
+                    if not self._stopped:
+                        resultado = await self._task
+                        pagina.extend(resultado['reviews'])
+                    break
+                pagina.extend(item)
+                if self._pages.empty():
+                    break
+                item = self._pages.get_nowait()
+
+            if self._stopped:
+                break
+            nuevos = self._take_new(pagina)
+            if nuevos:
+                return nuevos
+        raise StopAsyncIteration
+
+    async def aclose(self):
+        """
+        Deja de pedir páginas: la extracción termina tras la página en curso
+        y las páginas que lleguen ya no se entregan.
+        """
+        self._stopped = True
+
+    async def wait(self) -> Dict[str, Any]:
+        """
+        Espera el final de la extracción.
+
+        Returns:
+            Resultado de scrape_negative_reviews
+        """
+        self.__aiter__()
+        return await self._task
+
 
 class PlayStoreScraper:
     def __init__(self):
         self.max_intentos_por_criterio = 10  # Hasta 10 páginas (1000 comentarios potenciales)
         self.reviews_por_request = 100  # 100 comentarios por request
-        self.pausa_entre_requests = 2  # segundos
+        # Ritmo de peticiones adaptativo (compartido por todas las extracciones)
+        self.rate_limiter = get_scraping_rate_limiter()
+        self.max_reintentos = DEFAULT_RETRY_CONFIG["max_retries"]
+        self.backoff_base = DEFAULT_RETRY_CONFIG["backoff_base"]
+        self.backoff_max = DEFAULT_RETRY_CONFIG["backoff_max"]
+        self.history = ReviewHistoryStore()
+        self.playstore_client = get_playstore_client() if SCRAPING_CLIENT == 'native' else None
+        self.store = get_review_store()
+        # Shards extraídos en paralelo (por defecto, el tamaño del pool de scraping)
+        self.max_shards_paralelos = int(os.getenv(
+            'SCRAPING_MAX_PARALLEL_SHARDS',
+            str(get_stage_executors().get_pool_size(Stage.SCRAPING))
+        ))
 
     def _map_criterio_to_sort(self, criterio: CriteriosBusqueda) -> Sort:
         """
@@ -26,18 +204,285 @@ class PlayStoreScraper:
             # Fallback a más recientes
             return Sort.NEWEST
 
-    def scrape_negative_reviews(
+    async def _fetch_page(
+        self,
+        app_id: str,
+        lang: str,
+        country: str,
+        sort: Sort,
+        continuation_token: Any
+    ):
+        """
+        Descarga una página de comentarios con el cliente asíncrono propio o,
+        con SCRAPING_CLIENT=library, con google_play_scraper en el pool de
+        scraping.
+
+        Returns:
+            Tupla (comentarios de la página, continuation token)
+        """
+        if self.playstore_client is not None:
+            return await self.playstore_client.reviews(
+                app_id,
+                lang=lang,
+                country=country,
+                sort=sort,
+                count=self.reviews_por_request,
+                continuation_token=continuation_token
+            )
+        result, continuation_token = await run_in_stage(
+            Stage.SCRAPING,
+            reviews,
+            app_id,
+            lang=lang,
+            country=country,
+            sort=sort,
+            count=self.reviews_por_request,
+            continuation_token=continuation_token
+        )
+        for review in result:
+            review['at'] = to_utc(review.get('at'))
+        return result, continuation_token
+
+    async def _fetch_page_with_retry(
+        self,
+        app_id: str,
+        lang: str,
+        country: str,
+        sort: Sort,
+        continuation_token: Any,
+        tiempos: Dict[str, float]
+    ):
+        """
+        Descarga una página respetando el limitador de ritmo y reintentando
+        con backoff exponencial y jitter.
+
+        Los reintentos reutilizan el mismo continuation token, de modo que un
+        error transitorio no interrumpe la extracción. Un 404 no se reintenta.
+
+        Args:
+            tiempos: Acumulador de estadísticas de tiempos (se actualiza)
+
+        Returns:
+            Tupla (comentarios de la página, continuation token)
+        """
+        intento = 0
+        while True:
+            tiempos['espera_limitador'] += await self.rate_limiter.acquire()
+            inicio = time.perf_counter()
+            try:
+                resultado = await self._fetch_page(app_id, lang, country, sort, continuation_token)
+            except (NotFoundError, PlayStoreNotFoundError):
+                raise
+            except Exception as e:
+                tiempos['descarga'] += time.perf_counter() - inicio
+                if is_throttling_error(e):
+                    tiempos['throttling'] += 1
+                    self.rate_limiter.record_throttle()
+                if intento >= self.max_reintentos:
+                    raise
+
+                espera = backoff_delay(intento, self.backoff_base, self.backoff_max)
+                intento += 1
+                tiempos['reintentos'] += 1
+                tiempos['backoff'] += espera
+                print(f"🔁 Reintento {intento}/{self.max_reintentos} en {espera:.1f}s: {e}")
+                await asyncio.sleep(espera)
+                continue
+
+            latencia = time.perf_counter() - inicio
+            tiempos['descarga'] += latencia
+            self.rate_limiter.record_success(latencia)
+            return resultado
+
+    async def _paginate(
+        self,
+        app_id: str,
+        lang: str,
+        country: str,
+        sort: Sort,
+        num_comentarios_negativos: int,
+        filtro_estrellas: int,
+        historial: Optional[Dict[str, Any]] = None,
+        on_page: Optional[Callable[[int, List[Dict], int], None]] = None,
+        desde: Optional[date] = None,
+        hasta: Optional[date] = None,
+        should_stop: Optional[Callable[[], bool]] = None
+    ) -> Dict[str, Any]:
+        """
+        Recorre las páginas de comentarios hasta alcanzar el objetivo de
+        negativos, el máximo de páginas o, si se pasa un historial, el primer
+        comentario ya conocido (high-water mark).
+
+        Solo cuentan como negativos los comentarios dentro del rango
+        [desde, hasta]. Con orden cronológico la paginación termina en cuanto
+        una página queda entera antes de `desde`. `should_stop` se consulta
+        antes de descargar cada página y, si devuelve True, la paginación
+        termina (el consumidor ya tiene suficientes comentarios).
+
+        Returns:
+            Dict con los comentarios revisados (todas las calificaciones y
+            fechas, sin duplicados y en orden), páginas procesadas, duplicados
+            evitados, fecha del comentario más nuevo y si se alcanzó el
+            historial, la fecha `desde`, el final de los comentarios o se
+            interrumpió por un error o por `should_stop`
+        """
+        ids_conocidos = set()
+        marca_at = None
+        if historial:
+            ids_conocidos = {historial['high_water_mark']['review_id']}
+            if historial['high_water_mark'].get('at'):
+                marca_at = to_utc(datetime.fromisoformat(historial['high_water_mark']['at']))
+
+        revisados = []
+        ids_unicos = set()  # Para evitar duplicados
+        duplicados_evitados = 0
+        negativos = 0
+        continuation_token = None
+        intentos_criterio = 0
+        alcanzo_historial = False
+        alcanzo_desde = False
+        detenido = False
+        sin_mas_comentarios = False
+        error = False
+        mas_reciente_at = None
+        tiempos = new_timing_stats()
+
+        # Bucle de paginación
+        while (negativos < num_comentarios_negativos and
+               intentos_criterio < self.max_intentos_por_criterio):
+
+            if should_stop and should_stop():
+                print("🎯 El consumidor tiene suficientes comentarios, fin de la extracción")
+                detenido = True
+                break
+
+            try:
+                # Extracción de comentarios
+                result, continuation_token = await self._fetch_page_with_retry(
+                    app_id, lang, country, sort, continuation_token, tiempos
+                )
+
+                # Si no hay resultados, salir
+                if not result:
+                    print("⚠️ No hay más comentarios disponibles")
+                    sin_mas_comentarios = True
+                    break
+
+                # Contar negativos en este lote
+                negativos_lote = sum(1 for r in result if r['score'] <= filtro_estrellas)
+
+                # Página entera anterior a `desde`: las siguientes también lo son
+                if (desde and sort == Sort.NEWEST
+                        and all(r['at'].date() < desde for r in result)):
+                    print(f"📅 Página anterior a {desde.isoformat()}, fin de la extracción")
+                    alcanzo_desde = True
+                    break
+
+                print(f"📦 Lote {intentos_criterio + 1}: "
+                      f"{len(result)} recibidos, {negativos_lote} negativos")
+
+                nuevos_negativos = []
+                for review in result:
+                    review_id_original = review['reviewId']
+
+                    # Comentario ya conocido: el resto está en el historial
+                    if review_id_original in ids_conocidos or (marca_at and review['at'] < marca_at):
+                        alcanzo_historial = True
+                        continue
+
+                    # Evitar duplicados
+                    if review_id_original in ids_unicos:
+                        duplicados_evitados += 1
+                        continue
+                    ids_unicos.add(review_id_original)
+
+                    if mas_reciente_at is None or review['at'] > mas_reciente_at:
+                        mas_reciente_at = review['at']
+
+                    comentario = {
+                        'id_original': review_id_original,
+                        'comentario': review['content'] or '',
+                        'calificacion': review['score'],
+                        'fecha': review['at'].strftime('%Y-%m-%d'),
+                        'usuario': review['userName'] or 'Usuario anónimo'
+                    }
+                    revisados.append(comentario)
+
+                    # Filtro: Solo comentarios ≤ filtro_estrellas dentro del rango de fechas
+                    if (review['score'] <= filtro_estrellas and negativos < num_comentarios_negativos
+                            and in_date_range(comentario['fecha'], desde, hasta)):
+                        negativos += 1
+                        nuevos_negativos.append(comentario)
+
+                print(f"✅ Acumulados: {negativos}/{num_comentarios_negativos}")
+                intentos_criterio += 1
+
+                # Notificar progreso de la página
+                if on_page:
+                    on_page(intentos_criterio, nuevos_negativos, negativos)
+
+                if alcanzo_historial:
+                    print("⚡ Se alcanzaron comentarios ya extraídos anteriormente")
+                    break
+
+                # La página ya cruzó `desde`: el resto es más antiguo
+                if desde and sort == Sort.NEWEST and result[-1]['at'].date() < desde:
+                    print(f"📅 Se alcanzó la fecha {desde.isoformat()}, fin de la extracción")
+                    alcanzo_desde = True
+                    break
+
+                # Si no hay más páginas, salir
+                if not continuation_token:
+                    print("✅ No hay más comentarios disponibles")
+                    sin_mas_comentarios = True
+                    break
+
+            except Exception as e:
+                # Reintentos agotados o error no recuperable
+                print(f"❌ Error en lote {intentos_criterio + 1}: {e}")
+                error = True
+                break
+
+        return {
+            'revisados': revisados,
+            'paginas': intentos_criterio,
+            'duplicados_evitados': duplicados_evitados,
+            'mas_reciente_at': mas_reciente_at,
+            'alcanzo_historial': alcanzo_historial,
+            'alcanzo_desde': alcanzo_desde,
+            'detenido': detenido,
+            'sin_mas_comentarios': sin_mas_comentarios,
+            'error': error,
+            'tiempos': tiempos
+        }
+
+    async def scrape_negative_reviews(
         self,
         app_id: str,
         num_comentarios_negativos: int = 9000,
         filtro_estrellas: int = 3,
         criterio_busqueda: CriteriosBusqueda = CriteriosBusqueda.RECIENTES,
         lang: str = 'es',
-        country: str = 'pe'
+        country: str = 'pe',
+        desde: Optional[date] = None,
+        hasta: Optional[date] = None,
+        on_page: Optional[Callable[[int, List[Dict], int], None]] = None,
+        incremental: bool = True,
+        shards: Optional[List[ScrapeShard]] = None,
+        should_stop: Optional[Callable[[], bool]] = None
     ) -> Dict[str, Any]:
         """
         Extrae comentarios negativos de Google Play Store según criterio de búsqueda.
 
+        Con `shards` se extraen varias combinaciones de criterio, país e idioma
+        en paralelo (hasta SCRAPING_MAX_PARALLEL_SHARDS a la vez) y sus
+        resultados se combinan sin duplicados, en el orden de los shards.
+
+        Con el criterio 'recientes' la extracción es incremental: se descargan
+        solo las páginas con comentarios más nuevos que el high-water mark de
+        la extracción anterior y el resto se completa con el historial
+        guardado de la app.
+
         Args:
             app_id: ID de la aplicación (ej: com.bcp.bank.bcp)
             num_comentarios_negativos: Número máximo de comentarios a extraer
@@ -45,124 +490,330 @@ class PlayStoreScraper:
             criterio_busqueda: Criterio de ordenamiento ('recientes' o 'relevantes')
             lang: Idioma de los comentarios
             country: País de origen
+            desde: Fecha mínima de los comentarios (inclusive). Con 'recientes'
+                   la extracción termina al llegar a comentarios anteriores
+            hasta: Fecha máxima de los comentarios (inclusive)
+            on_page: Callback opcional invocado tras cada página con
+                     (número de página, comentarios nuevos, total acumulado).
+                     Los comentarios recuperados del historial se notifican
+                     como una página adicional.
+            incremental: Si es False, ignora el historial y descarga todas las páginas
+            shards: Lista de (criterio, país, idioma) a extraer. Si es None, se
+                    extrae solo (criterio_busqueda, country, lang).
+            should_stop: Función opcional consultada antes de cada página; si
+                         devuelve True la extracción termina con lo acumulado
+
+        Returns:
+            Dict con los comentarios extraídos y estadísticas (por shard en
+            stats['shards'] si hay más de uno)
+        """
+        if not shards:
+            shards = [ScrapeShard(criterio_busqueda, country, lang)]
+        if len(shards) == 1:
+            shard = shards[0]
+            return await self._scrape_shard(
+                app_id, num_comentarios_negativos, filtro_estrellas,
+                shard.criterio, shard.lang, shard.country, on_page, incremental,
+                desde, hasta, should_stop
+            )
+
+        print(f"🌎 Extrayendo {len(shards)} shards en paralelo "
+              f"(hasta {self.max_shards_paralelos} a la vez)")
+
+        semaforo = asyncio.Semaphore(max(1, self.max_shards_paralelos))
+        ids_unicos = set()  # Para evitar duplicados entre shards
+        enviados: List[Dict] = []  # Comentarios notificados por on_page, en orden de llegada
+        paginas = 0
+        detenido_externo = False
+
+        def on_shard_page(pagina: int, nuevos: List[Dict], acumulados: int):
+            # Numeración global de páginas y acumulado sin duplicados entre
+            # shards, sin pasar de num_comentarios_negativos en total
+            nonlocal paginas
+            paginas += 1
+            unicos = []
+            for review in nuevos:
+                if len(enviados) >= num_comentarios_negativos:
+                    break
+                if review['id_original'] not in ids_unicos:
+                    ids_unicos.add(review['id_original'])
+                    unicos.append(review)
+                    enviados.append(review)
+            if on_page:
+                on_page(paginas, unicos, len(enviados))
+
+        def shard_should_stop() -> bool:
+            # Los shards dejan de pedir páginas cuando entre todos ya llegaron al tope
+            nonlocal detenido_externo
+            if should_stop and should_stop():
+                detenido_externo = True
+                return True
+            return len(enviados) >= num_comentarios_negativos
+
+        async def run_shard(shard: ScrapeShard) -> Dict[str, Any]:
+            async with semaforo:
+                return await self._scrape_shard(
+                    app_id, num_comentarios_negativos, filtro_estrellas,
+                    shard.criterio, shard.lang, shard.country, on_shard_page, incremental,
+                    desde, hasta, shard_should_stop
+                )
+
+        resultados = await asyncio.gather(*(run_shard(shard) for shard in shards))
+
+        # Combinar resultados sin duplicados: primero lo ya notificado (en el
+        # mismo orden) y luego lo que no pasó por on_page, hasta el tope
+        comentarios_negativos_filtrados = list(enviados)
+        ids_combinados = {review['id_original'] for review in enviados}
+        vistos = set()
+        duplicados_entre_shards = 0
+        for resultado in resultados:
+            for review in resultado['reviews']:
+                if review['id_original'] in vistos:
+                    duplicados_entre_shards += 1
+                    continue
+                vistos.add(review['id_original'])
+                if review['id_original'] not in ids_combinados:
+                    ids_combinados.add(review['id_original'])
+                    comentarios_negativos_filtrados.append(review)
+        comentarios_negativos_filtrados = comentarios_negativos_filtrados[:num_comentarios_negativos]
+
+        stats_shards = [resultado['stats'] for resultado in resultados]
+        stats = {
+            'total_comentarios_revisados': sum(s['total_comentarios_revisados'] for s in stats_shards),
+            'duplicados_evitados': sum(s['duplicados_evitados'] for s in stats_shards) + duplicados_entre_shards,
+            'duplicados_entre_shards': duplicados_entre_shards,
+            'paginas_procesadas': sum(s['paginas_procesadas'] for s in stats_shards),
+            'comentarios_nuevos': sum(s['comentarios_nuevos'] for s in stats_shards),
+            'comentarios_desde_historial': sum(s['comentarios_desde_historial'] for s in stats_shards),
+            'filtro_estrellas': filtro_estrellas,
+            'desde': desde.isoformat() if desde else None,
+            'hasta': hasta.isoformat() if hasta else None,
+            'detenido_por_fecha': any(s['detenido_por_fecha'] for s in stats_shards),
+            'detenido_por_objetivo': detenido_externo,
+            'criterio_busqueda': sorted({s['criterio_busqueda'] for s in stats_shards}),
+            'pais': sorted({s['pais'] for s in stats_shards}),
+            'idioma': sorted({s['idioma'] for s in stats_shards}),
+            'tiempos': round_timing_stats(merge_timing_stats([s['tiempos'] for s in stats_shards])),
+            'tasa_requests': round(self.rate_limiter.rate, 3),
+            'limitador': self.rate_limiter.get_stats(),
+            'shards': [dict(s, total=r['total_found']) for s, r in zip(stats_shards, resultados)]
+        }
+
+        print(f"🎉 Extracción de {len(shards)} shards completada: "
+              f"{len(comentarios_negativos_filtrados)} comentarios únicos "
+              f"({duplicados_entre_shards} duplicados entre shards)")
+
+        return {
+            'reviews': comentarios_negativos_filtrados,
+            'stats': stats,
+            'total_found': len(comentarios_negativos_filtrados)
+        }
+
+    def stream_negative_reviews(self, **kwargs) -> ReviewPageStream:
+        """
+        Versión en streaming de scrape_negative_reviews.
+
+        Acepta los mismos argumentos (on_page se sigue invocando tras cada
+        página) y devuelve un ReviewPageStream que entrega los comentarios
+        negativos página a página mientras continúa la extracción.
+        Cerrar el stream (aclose) detiene la extracción.
+
+        Returns:
+            ReviewPageStream
+        """
+        on_page = kwargs.pop('on_page', None)
+        external_stop = kwargs.pop('should_stop', None)
+
+        def scrape(page_callback, stream_stopped):
+            def should_stop() -> bool:
+                return stream_stopped() or bool(external_stop and external_stop())
+            return self.scrape_negative_reviews(on_page=page_callback, should_stop=should_stop, **kwargs)
+
+        return ReviewPageStream(scrape, on_page=on_page)
+
+    async def _load_history(self, app_id: str, lang: str, country: str, limit: int) -> Optional[Dict[str, Any]]:
+        """
+        Carga el cursor del scraping incremental (Redis) y los comentarios
+        guardados de la app en el repositorio local (SQLite).
+
+        Returns:
+            Cursor con los comentarios guardados en 'reviews' (del más nuevo
+            al más antiguo), o None si no hay cursor o el repositorio local no
+            tiene el comentario del high-water mark
+        """
+        cursor = await self.history.load(app_id, lang, country)
+        if not cursor:
+            return None
+
+        try:
+            reviews = await run_in_stage(
+                Stage.SCRAPING,
+                self.store.get_reviews,
+                app_id, lang=lang, country=country, limit=limit
+            )
+        except Exception as e:
+            print(f"⚠️ No se pudo leer el repositorio local: {e}")
+            return None
+
+        if not any(r['id_original'] == cursor['high_water_mark']['review_id'] for r in reviews):
+            print("⚠️ El repositorio local no tiene los comentarios del historial, extracción completa")
+            return None
+
+        return dict(cursor, reviews=reviews)
+
+    async def _scrape_shard(
+        self,
+        app_id: str,
+        num_comentarios_negativos: int,
+        filtro_estrellas: int,
+        criterio_busqueda: CriteriosBusqueda,
+        lang: str,
+        country: str,
+        on_page: Optional[Callable[[int, List[Dict], int], None]],
+        incremental: bool,
+        desde: Optional[date] = None,
+        hasta: Optional[date] = None,
+        should_stop: Optional[Callable[[], bool]] = None
+    ) -> Dict[str, Any]:
+        """
+        Extrae los comentarios negativos de un shard (criterio, país, idioma).
 
         Returns:
-            Dict con los comentarios extraídos y estadísticas
+            Dict con los comentarios extraídos y estadísticas del shard
         """
         # Mapear criterio de búsqueda a Sort
         sort_criterio = self._map_criterio_to_sort(criterio_busqueda)
         criterio_nombre = "MÁS RECIENTES" if criterio_busqueda == CriteriosBusqueda.RECIENTES else "MÁS RELEVANTES"
-
-        # Variables de control
-        comentarios_negativos_filtrados = []
-        ids_unicos = set()  # Para evitar duplicados
-        total_comentarios_revisados = 0
-        duplicados_evitados = 0
+        # Comentarios que revisa como máximo una extracción completa
+        ventana = self.max_intentos_por_criterio * self.reviews_por_request
 
         print(f"🎯 Extrayendo {num_comentarios_negativos} comentarios negativos (≤ {filtro_estrellas}⭐)")
-        print(f"🏦 App: {app_id}")
-        print(f"📅 Criterio: {criterio_nombre}\n")
+        print(f"🏦 App: {app_id} ({country}/{lang})")
+        print(f"📅 Criterio: {criterio_nombre}")
+        if desde or hasta:
+            print(f"🗓️ Rango: {desde.isoformat() if desde else '...'} → {hasta.isoformat() if hasta else '...'}")
+        print()
 
-        # Extracción con criterio seleccionado
-        criterios_busqueda_lista = [sort_criterio]
-        for criterio in criterios_busqueda_lista:
-            if len(comentarios_negativos_filtrados) >= num_comentarios_negativos:
-                break
+        # El historial solo sirve con orden cronológico
+        historial = None
+        if incremental and sort_criterio == Sort.NEWEST:
+            historial = await self._load_history(app_id, lang, country, ventana)
+            if historial:
+                print(f"🗂️ Historial: {len(historial['reviews'])} comentarios "
+                      f"(último: {historial['high_water_mark']['review_id']})")
+
+        print(f"🔄 Procesando criterio: {criterio_nombre}")
+        resultado = await self._paginate(
+            app_id, lang, country, sort_criterio,
+            num_comentarios_negativos, filtro_estrellas,
+            historial=historial, on_page=on_page, desde=desde, hasta=hasta,
+            should_stop=should_stop
+        )
+        revisados = resultado['revisados']
+        comentarios_nuevos = len(revisados)
+        desde_historial = 0
+        sin_mas_comentarios = resultado['sin_mas_comentarios']
+        mas_reciente_at = resultado['mas_reciente_at']
+
+        if historial and resultado['alcanzo_historial']:
+            # Delta + historial, limitado a lo que vería una extracción completa
+            ids_nuevos = {r['id_original'] for r in revisados}
+            combinados = revisados + [r for r in historial['reviews'] if r['id_original'] not in ids_nuevos]
+            combinados = combinados[:ventana]
+            negativos_combinados = sum(
+                1 for r in combinados
+                if r['calificacion'] <= filtro_estrellas and in_date_range(r['fecha'], desde, hasta)
+            )
+            # El historial llega hasta antes de `desde`: cubre todo el rango
+            cubre_desde = bool(desde and combinados and combinados[-1]['fecha'] < desde.isoformat())
+
+            if (len(combinados) < ventana and not historial['completo'] and not cubre_desde
+                    and negativos_combinados < num_comentarios_negativos
+                    and not (should_stop and should_stop())):
+                # El historial no cubre lo que pide esta extracción
+                print("⚠️ Historial insuficiente, realizando extracción completa")
+                tiempos_delta = resultado['tiempos']
+                resultado = await self._paginate(
+                    app_id, lang, country, sort_criterio,
+                    num_comentarios_negativos, filtro_estrellas, on_page=on_page,
+                    desde=desde, hasta=hasta, should_stop=should_stop
+                )
+                resultado['tiempos'] = merge_timing_stats([tiempos_delta, resultado['tiempos']])
+                revisados = resultado['revisados']
+                comentarios_nuevos = len(revisados)
+                sin_mas_comentarios = resultado['sin_mas_comentarios']
+                mas_reciente_at = resultado['mas_reciente_at']
+            else:
+                desde_historial = len(combinados) - len(revisados)
+                revisados = combinados
+                sin_mas_comentarios = historial['completo'] and len(combinados) < ventana
+                if mas_reciente_at is None and historial['high_water_mark'].get('at'):
+                    mas_reciente_at = to_utc(datetime.fromisoformat(historial['high_water_mark']['at']))
+                print(f"⚡ {comentarios_nuevos} comentarios nuevos + {desde_historial} desde historial")
+
+        # Filtrado de comentarios negativos (en orden, hasta el objetivo)
+        comentarios_negativos_filtrados = [
+            r for r in revisados
+            if r['calificacion'] <= filtro_estrellas and in_date_range(r['fecha'], desde, hasta)
+        ][:num_comentarios_negativos]
+
+        if on_page and desde_historial:
+            ids_historial = {r['id_original'] for r in revisados[comentarios_nuevos:]}
+            on_page(
+                resultado['paginas'] + 1,
+                [r for r in comentarios_negativos_filtrados if r['id_original'] in ids_historial],
+                len(comentarios_negativos_filtrados)
+            )
+
+        # Guardar los comentarios descargados en el repositorio local
+        archivados = True
+        if comentarios_nuevos:
+            try:
+                await run_in_stage(
+                    Stage.SCRAPING,
+                    self.store.upsert_reviews,
+                    app_id, lang, country, revisados[:comentarios_nuevos]
+                )
+            except Exception as e:
+                archivados = False
+                print(f"⚠️ No se pudieron guardar los comentarios en el repositorio local: {e}")
+                print("⚠️ No se actualiza el historial: la próxima extracción los volverá a descargar")
+
+        # Actualizar historial (solo orden cronológico, si no hubo errores,
+        # para no reemplazarlo por una extracción parcial, y si los
+        # comentarios nuevos quedaron en el repositorio local)
+        if sort_criterio == Sort.NEWEST and revisados and not resultado['error'] and archivados:
+            await self.history.save(
+                app_id, lang, country, revisados[0]['id_original'], mas_reciente_at, sin_mas_comentarios
+            )
+
+        print(f"📊 Páginas procesadas: {resultado['paginas']}, "
+              f"Negativos únicos: {len(comentarios_negativos_filtrados)}")
 
-            print(f"🔄 Procesando criterio: {criterio_nombre}")
-            
-            continuation_token = None
-            intentos_criterio = 0
-            negativos_este_criterio = 0
-            
-            # Bucle de paginación
-            while (len(comentarios_negativos_filtrados) < num_comentarios_negativos and 
-                   intentos_criterio < self.max_intentos_por_criterio):
-                
-                try:
-                    # Extracción de comentarios
-                    result, continuation_token = reviews(
-                        app_id,
-                        lang=lang,
-                        country=country,
-                        sort=criterio,
-                        count=self.reviews_por_request,
-                        continuation_token=continuation_token
-                    )
-                    
-                    # Si no hay resultados, salir
-                    if not result:
-                        print("⚠️ No hay más comentarios disponibles")
-                        break
-                    
-                    # Contar negativos en este lote
-                    negativos_lote = sum(1 for r in result if r['score'] <= filtro_estrellas)
-                    
-                    print(f"📦 Lote {intentos_criterio + 1}: "
-                          f"{len(result)} recibidos, {negativos_lote} negativos")
-                    
-                    # Filtrado de comentarios negativos
-                    for review in result:
-                        total_comentarios_revisados += 1
-                        
-                        # Filtro: Solo comentarios ≤ filtro_estrellas
-                        if review['score'] <= filtro_estrellas:
-                            review_id_original = review['reviewId']
-                            
-                            # Evitar duplicados
-                            if review_id_original not in ids_unicos:
-                                ids_unicos.add(review_id_original)
-                                
-                                # Almacenar comentario
-                                comentarios_negativos_filtrados.append({
-                                    'id_original': review_id_original,
-                                    'comentario': review['content'] or '',
-                                    'calificacion': review['score'],
-                                    'fecha': review['at'].strftime('%Y-%m-%d'),
-                                    'usuario': review['userName'] or 'Usuario anónimo'
-                                })
-                                negativos_este_criterio += 1
-                            else:
-                                duplicados_evitados += 1
-                    
-                    print(f"✅ Acumulados: {len(comentarios_negativos_filtrados)}/{num_comentarios_negativos}")
-                    
-                    # Pausa para evitar bloqueos
-                    time.sleep(self.pausa_entre_requests)
-                    intentos_criterio += 1
-                    
-                    # Si no hay más páginas, salir
-                    if not continuation_token:
-                        print("✅ No hay más comentarios disponibles")
-                        break
-                        
-                except Exception as e:
-                    print(f"❌ Error en lote {intentos_criterio + 1}: {e}")
-                    time.sleep(5)
-                    break
-            
-            print(f"📊 Páginas procesadas: {intentos_criterio}, "
-                  f"Negativos únicos: {negativos_este_criterio}")
-        
-        # Limitar a objetivo
-        if len(comentarios_negativos_filtrados) > num_comentarios_negativos:
-            comentarios_negativos_filtrados = comentarios_negativos_filtrados[:num_comentarios_negativos]
-        
         # Estadísticas finales
         stats = {
-            'total_comentarios_revisados': total_comentarios_revisados,
-            'duplicados_evitados': duplicados_evitados,
-            'paginas_procesadas': intentos_criterio,
+            'total_comentarios_revisados': len(revisados),
+            'duplicados_evitados': resultado['duplicados_evitados'],
+            'paginas_procesadas': resultado['paginas'],
+            'comentarios_nuevos': comentarios_nuevos,
+            'comentarios_desde_historial': desde_historial,
             'filtro_estrellas': filtro_estrellas,
+            'desde': desde.isoformat() if desde else None,
+            'hasta': hasta.isoformat() if hasta else None,
+            'detenido_por_fecha': resultado['alcanzo_desde'],
+            'detenido_por_objetivo': resultado['detenido'],
             'criterio_busqueda': criterio_busqueda.value,  # 'recientes' o 'relevantes'
             'pais': country,
-            'idioma': lang
+            'idioma': lang,
+            'tiempos': round_timing_stats(resultado['tiempos']),
+            'tasa_requests': round(self.rate_limiter.rate, 3),
+            'limitador': self.rate_limiter.get_stats()
         }
-        
+
         print(f"🎉 Extracción completada: {len(comentarios_negativos_filtrados)} comentarios únicos")
-        
+
         return {
             'reviews': comentarios_negativos_filtrados,
             'stats': stats,
             'total_found': len(comentarios_negativos_filtrados)
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,191 @@
+"""
+Presupuesto de tokens de las peticiones a OpenRouter.
+
+Cuenta los tokens de los prompts antes de enviarlos (con tiktoken si está
+instalado; si no, con una aproximación por caracteres), recorta los
+comentarios de cada categoría hasta que el prompt cabe en
+LLM_MAX_PROMPT_TOKENS y limita max_tokens a lo que queda de la ventana de
+contexto del modelo. También acumula los tokens de prompt y de respuesta que
+informa la API para las estadísticas del scraping.
+"""
+import math
+import os
+from typing import Callable, Dict, List, Tuple
+from dotenv import load_dotenv
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+load_dotenv()
+
+DEFAULT_TOKEN_BUDGET_CONFIG = {
+    # Tokens máximos del prompt completo (instrucciones + comentarios)
+    "max_prompt_tokens": int(os.getenv('LLM_MAX_PROMPT_TOKENS', '24000')),
+    # Ventana de contexto del modelo (prompt + respuesta); sin definir se
+    # toma de MODEL_CONTEXT_WINDOWS
+    "context_window": int(os.getenv('LLM_CONTEXT_WINDOW')) if os.getenv('LLM_CONTEXT_WINDOW') else None,
+    "encoding": os.getenv('LLM_TOKENIZER_ENCODING', 'o200k_base'),
+}
+
+# Ventana de contexto publicada en OpenRouter para los modelos usados
+MODEL_CONTEXT_WINDOWS = {
+    "x-ai/grok-4-fast": 2000000,
+}
+
+# Ventana supuesta para un modelo que no está en la tabla
+CONSERVATIVE_CONTEXT_WINDOW = 32000
+
+# Aproximación de caracteres por token para texto en español (sin tiktoken)
+CHARS_PER_TOKEN = 3.5
+
+# Tokens que se dejan libres en la ventana de contexto (formato del chat)
+CONTEXT_MARGIN = 256
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding(DEFAULT_TOKEN_BUDGET_CONFIG["encoding"])
+        except Exception as e:
+            print(f"⚠️  No se pudo cargar el tokenizador {DEFAULT_TOKEN_BUDGET_CONFIG['encoding']}: {str(e)}")
+            return None
+    return _encoding
+
+
+def tokenizer_name() -> str:
+    """Nombre del tokenizador usado para contar ("aproximado" sin tiktoken)."""
+    return DEFAULT_TOKEN_BUDGET_CONFIG["encoding"] if _get_encoding() is not None else "aproximado"
+
+
+def _approximate_tokens(text: str) -> int:
+    """Estimación rápida del número de tokens de un texto (por caracteres)."""
+    return int(math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def count_tokens(text: str) -> int:
+    """
+    Cuenta los tokens de un texto.
+
+    El modelo de OpenRouter no publica su tokenizador; o200k_base da una
+    cuenta cercana y, sobre todo, estable entre peticiones.
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return _approximate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def context_window(model: str) -> int:
+    """
+    Ventana de contexto del modelo: LLM_CONTEXT_WINDOW si está definida; si
+    no, la de MODEL_CONTEXT_WINDOWS o, para modelos desconocidos,
+    CONSERVATIVE_CONTEXT_WINDOW.
+    """
+    if DEFAULT_TOKEN_BUDGET_CONFIG["context_window"]:
+        return DEFAULT_TOKEN_BUDGET_CONFIG["context_window"]
+    return MODEL_CONTEXT_WINDOWS.get(model, CONSERVATIVE_CONTEXT_WINDOW)
+
+
+def completion_budget(prompt_tokens: int, max_tokens: int, model: str) -> int:
+    """max_tokens limitado a lo que queda de la ventana de contexto del modelo tras el prompt."""
+    available = context_window(model) - prompt_tokens - CONTEXT_MARGIN
+    return max(1, min(max_tokens, available))
+
+
+def fit_prompt_to_budget(
+    grupos: List[Dict],
+    render: Callable[[List[Dict], int], str],
+    max_prompt_tokens: int,
+    max_rounds: int = 8
+) -> Tuple[str, List[Dict], int, int]:
+    """
+    Recorta los comentarios hasta que el prompt cabe en max_prompt_tokens.
+
+    En cada ronda se conserva en todas las categorías la misma proporción de
+    comentarios (al menos uno por categoría), elegidos por número de
+    comentarios que representan y por confianza, y se mantiene su orden
+    original.
+
+    Args:
+        grupos: Comentarios (o grupos condensados) con categoria, confianza y cantidad
+        render: Construye el prompt a partir de los grupos y del número de comentarios omitidos
+        max_prompt_tokens: Tokens máximos del prompt
+
+    Returns:
+        Tupla (prompt, grupos conservados, comentarios omitidos, tokens del prompt)
+    """
+    prompt = render(grupos, 0)
+    tokens = count_tokens(prompt)
+    if tokens <= max_prompt_tokens:
+        return prompt, grupos, 0, tokens
+
+    base = count_tokens(render([], 0))
+    total = sum(g.get('cantidad', 1) for g in grupos)
+    conservados = grupos
+    for _ in range(max_rounds):
+        if tokens <= max_prompt_tokens:
+            break
+        # Proporción de comentarios que cabría, con un 5% de margen
+        ratio = max(0.0, (max_prompt_tokens - base) / max(1, tokens - base)) * 0.95
+
+        por_categoria: Dict[str, List[int]] = {}
+        for i, grupo in enumerate(conservados):
+            por_categoria.setdefault(grupo['categoria'], []).append(i)
+        seleccion = set()
+        for indices in por_categoria.values():
+            limite = max(1, int(len(indices) * ratio))
+            mejores = sorted(
+                indices,
+                key=lambda i: (conservados[i].get('cantidad', 1), conservados[i].get('confianza', 0.0)),
+                reverse=True
+            )
+            seleccion.update(mejores[:limite])
+        if len(seleccion) == len(conservados):
+            break
+
+        conservados = [g for i, g in enumerate(conservados) if i in seleccion]
+        omitidos = total - sum(g.get('cantidad', 1) for g in conservados)
+        prompt = render(conservados, omitidos)
+        tokens = count_tokens(prompt)
+
+    if tokens > max_prompt_tokens:
+        print(f"⚠️  El prompt sigue excediendo el presupuesto ({tokens} > {max_prompt_tokens} tokens)")
+    return prompt, conservados, total - sum(g.get('cantidad', 1) for g in conservados), tokens
+
+
+def new_token_usage() -> Dict:
+    """Contadores de tokens de una generación."""
+    return {
+        "tokenizador": tokenizer_name(),
+        "peticiones": 0,
+        "tokens_prompt_estimados": 0,
+        "tokens_prompt": 0,
+        "tokens_completion": 0,
+        "comentarios_omitidos": 0
+    }
+
+
+def record_completion_usage(uso: Dict, usage) -> None:
+    """
+    Suma los tokens que informa la API para una petición.
+
+    Args:
+        uso: Contadores de new_token_usage
+        usage: completion.usage (o el del último fragmento en streaming); puede ser None
+    """
+    uso["peticiones"] += 1
+    if usage is not None:
+        uso["tokens_prompt"] += getattr(usage, 'prompt_tokens', 0) or 0
+        uso["tokens_completion"] += getattr(usage, 'completion_tokens', 0) or 0
+
+
+def merge_token_usage(total: Dict, parcial: Dict) -> None:
+    """Acumula los contadores de `parcial` en `total`."""
+    for key, value in parcial.items():
+        if isinstance(value, int):
+            total[key] = total.get(key, 0) + value
@@ -0,0 +1,113 @@
+"""
+Benchmark de los codecs del caché de Redis.
+
+Compara tamaño y tiempos de codificación/decodificación de un resultado de
+/scrape sintético con 9000 comentarios usando cada codec disponible (según
+las dependencias opcionales instaladas: msgpack, zstandard, lz4).
+
+Uso:
+    python benchmark_cache_codec.py
+"""
+import json
+import random
+import time
+from app.core.redis_client import CacheCodec, msgpack, zstandard, lz4
+
+NUM_REVIEWS = 9000
+REPETICIONES = 5
+
+CATEGORIAS = ["autenticidad", "confidencialidad", "integridad", "no_repudio", "resistencia", "responsabilidad"]
+FRASES = [
+    "no puedo iniciar sesión desde la última actualización",
+    "la app se cierra sola cuando intento pagar",
+    "me pide el código de verificación y nunca llega",
+    "cobraron dos veces la misma transferencia",
+    "mis datos personales aparecen en otra cuenta",
+    "el token de seguridad no funciona",
+    "muy lenta y se cuelga al abrir los movimientos",
+    "no reconoce mi huella digital",
+]
+
+
+def build_payload(num_reviews: int = NUM_REVIEWS) -> dict:
+    """Genera un resultado de /scrape con el mismo formato que ScrapingResponse."""
+    rng = random.Random(42)
+    reviews = []
+    for i in range(num_reviews):
+        comentario = " ".join(rng.choice(FRASES) for _ in range(rng.randint(1, 4)))
+        reviews.append({
+            "id_original": f"gp:AOqpTO{rng.getrandbits(64):016x}",
+            "comentario": comentario.capitalize() + ".",
+            "calificacion": rng.randint(1, 2),
+            "fecha": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "usuario": f"Usuario {rng.randint(1, 50000)}",
+            "categoria": rng.choice(CATEGORIAS),
+            "confianza": round(rng.random(), 4)
+        })
+
+    requisitos = [
+        {
+            "id": f"NFR-{i + 1:03d}",
+            "categoria": CATEGORIAS[i % len(CATEGORIAS)],
+            "requisito": "El sistema debe validar la identidad del usuario mediante un segundo factor.",
+            "prioridad": "Alta",
+            "justificacion": "Múltiples usuarios reportan accesos no autorizados."
+        }
+        for i in range(12)
+    ]
+
+    return {
+        "success": True,
+        "app_id": "com.bcp.innovacxion.yapeapp",
+        "total_reviews": num_reviews,
+        "reviews": reviews,
+        "stats": {"comentarios_antes_filtro": num_reviews * 3, "comentarios_relevantes": num_reviews},
+        "requirements": {
+            "requisitos": requisitos,
+            "resumen": {"total_requisitos": len(requisitos), "por_categoria": {}}
+        },
+        "from_cache": False
+    }
+
+
+def available_codecs() -> list:
+    serializers = ["json"] + (["msgpack"] if msgpack is not None else [])
+    compressors = ["none", "zlib"]
+    if zstandard is not None:
+        compressors.append("zstd")
+    if lz4 is not None:
+        compressors.append("lz4")
+    return [f"{s}+{c}" for s in serializers for c in compressors]
+
+
+def measure(func, *args) -> float:
+    """Mejor tiempo (ms) de REPETICIONES ejecuciones."""
+    best = float("inf")
+    for _ in range(REPETICIONES):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+if __name__ == "__main__":
+    payload = build_payload()
+    legacy = json.dumps(payload).encode("utf-8")
+
+    print("=" * 72)
+    print(f"BENCHMARK DE CODECS DE CACHÉ ({NUM_REVIEWS} comentarios)")
+    print("=" * 72)
+    print(f"{'codec':<16}{'tamaño (KB)':>14}{'ratio':>10}{'encode (ms)':>14}{'decode (ms)':>14}")
+    print(f"{'legacy json':<16}{len(legacy) / 1024:>14.1f}{1:>10.2f}"
+          f"{measure(json.dumps, payload):>14.1f}{measure(json.loads, legacy):>14.1f}")
+
+    for name in available_codecs():
+        codec = CacheCodec.from_name(name)
+        encoded = codec.encode(payload)
+        assert codec.decode(encoded) == payload
+        print(f"{name:<16}{len(encoded) / 1024:>14.1f}{len(legacy) / len(encoded):>10.2f}"
+              f"{measure(codec.encode, payload):>14.1f}{measure(codec.decode, encoded):>14.1f}")
+
+    # Las entradas antiguas (JSON plano) se siguen pudiendo leer
+    assert CacheCodec.from_name(available_codecs()[-1]).decode(legacy) == payload
+    print("=" * 72)
@@ -0,0 +1,148 @@
+"""
+Benchmark del cliente de comentarios de Play Store contra un servidor falso local.
+
+Levanta un servidor HTTP local que imita el endpoint batchexecute de Play
+Store (páginas sintéticas con latencia configurable) y mide la descarga de
+PAGINAS páginas con:
+    - google_play_scraper.reviews (urllib, una conexión por página, en hilos)
+    - PlayStoreReviewsClient (httpx asíncrono con pool keep-alive)
+
+El servidor también sirve para probar el scraper sin salir a internet:
+    PLAYSTORE_BASE_URL=http://127.0.0.1:8765 SCRAPING_RATE_INITIAL=50 ...
+
+Uso:
+    python benchmark_playstore_client.py
+"""
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+from google_play_scraper import Sort, reviews
+from google_play_scraper.constants.request import Formats
+from app.services.playstore_client import PlayStoreReviewsClient
+
+PUERTO = 8765
+PAGINAS = 30
+LATENCIA = 0.05  # segundos por respuesta del servidor falso
+# Costo de abrir una conexión (TCP + TLS con play.google.com son varios RTT);
+# el servidor falso lo simula al aceptar cada conexión nueva
+HANDSHAKE = 0.1
+TOTAL_COMENTARIOS = 5000
+
+
+def build_items(app_id: str, inicio: int, cantidad: int) -> list:
+    """Comentarios sintéticos con el formato del payload de Play Store."""
+    base = datetime(2025, 6, 1)
+    items = []
+    for i in range(inicio, min(inicio + cantidad, TOTAL_COMENTARIOS)):
+        at = int((base - timedelta(hours=i)).timestamp())
+        items.append([
+            f"gp:{app_id}:{i:06d}",
+            [f"Usuario {i}", [None, None, None, [None, None, "https://example.com/u.png"]]],
+            1 + i % 5,
+            None,
+            f"Comentario {i}: no puedo iniciar sesión después de la actualización",
+            [at, 0],
+            i % 7,
+            None,
+            None,
+            None,
+            "3.2.1"
+        ])
+    return items
+
+
+def build_response(app_id: str, count: int, token: str) -> bytes:
+    """Respuesta batchexecute con una página de comentarios."""
+    inicio = int(token) if token else 0
+    items = build_items(app_id, inicio, count)
+    siguiente = str(inicio + count) if inicio + count < TOTAL_COMENTARIOS else None
+    payload = json.dumps([items, None, [None, siguiente], None])
+    envelopes = [["wrb.fr", "oCPfdb", payload, None, None, None, "generic"], ["di", 42], ["af.httprm", 41, "-1", 7]]
+    return (")]}'\n\n" + json.dumps(envelopes)).encode("utf-8")
+
+
+class FakePlayStoreHandler(BaseHTTPRequestHandler):
+    """Imita POST /_/PlayStoreUi/data/batchexecute (solo el RPC de comentarios)."""
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        time.sleep(HANDSHAKE)
+        super().setup()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        f_req = parse_qs(self.rfile.read(length).decode("utf-8"))["f.req"][0]
+        # google_play_scraper envía los filtros ausentes como None (no es JSON)
+        request = json.loads(json.loads(f_req)[0][0][1].replace("None", "null"))
+        page = request[1][2]
+        count, token = page[0], (page[2] if len(page) > 2 else None)
+        app_id = request[2][0]
+
+        time.sleep(LATENCIA)
+        body = build_response(app_id, count, token)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        # Enviar en fragmentos para ejercitar el análisis incremental
+        for i in range(0, len(body), 16384):
+            self.wfile.write(body[i:i + 16384])
+            self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_fake_playstore_server(port: int = PUERTO) -> ThreadingHTTPServer:
+    """Inicia el servidor falso en un hilo y lo devuelve (cerrar con shutdown())."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakePlayStoreHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_library(app_id: str, base_url: str) -> tuple:
+    Formats.Reviews.URL_FORMAT = base_url + "/_/PlayStoreUi/data/batchexecute?hl={lang}&gl={country}"
+    total, token = 0, None
+    start = time.perf_counter()
+    for _ in range(PAGINAS):
+        # int(): en Python 3.11 google_play_scraper formatea Sort como "Sort.NEWEST"
+        result, token = reviews(app_id, lang="es", country="pe", sort=int(Sort.NEWEST), count=100,
+                                continuation_token=token)
+        total += len(result)
+    return total, time.perf_counter() - start
+
+
+async def bench_native(app_id: str, base_url: str) -> tuple:
+    client = PlayStoreReviewsClient(base_url=base_url)
+    total, token = 0, None
+    start = time.perf_counter()
+    for _ in range(PAGINAS):
+        result, token = await client.reviews(app_id, lang="es", country="pe", sort=Sort.NEWEST, count=100,
+                                             continuation_token=token)
+        total += len(result)
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+    return total, elapsed
+
+
+if __name__ == "__main__":
+    server = run_fake_playstore_server()
+    base_url = f"http://127.0.0.1:{PUERTO}"
+    app_id = "com.bcp.innovacxion.yapeapp"
+
+    print("=" * 60)
+    print(f"BENCHMARK CLIENTE PLAY STORE ({PAGINAS} páginas de 100, latencia {LATENCIA * 1000:.0f} ms, "
+          f"conexión {HANDSHAKE * 1000:.0f} ms)")
+    print("=" * 60)
+    total_lib, t_lib = bench_library(app_id, base_url)
+    total_nat, t_nat = asyncio.run(bench_native(app_id, base_url))
+    assert total_lib == total_nat
+    print(f"{'google_play_scraper':<22}{total_lib:>8} comentarios{t_lib:>10.2f} s")
+    print(f"{'PlayStoreReviewsClient':<22}{total_nat:>8} comentarios{t_nat:>10.2f} s")
+    print("=" * 60)
+    server.shutdown()
@@ -1,6 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import health, scraping
+from app.core.executors import get_stage_executors
+from app.core.redis_client import get_redis_client
+from app.services.bert_classifier_service import close_bert_classifier
+from app.services.playstore_client import close_playstore_client
 from dotenv import load_dotenv
 import os
 
@@ -33,6 +37,22 @@ app.add_middleware(
 app.include_router(health.router, prefix="/api", tags=["health"])
 app.include_router(scraping.router, prefix="/api/scraping", tags=["scraping"])
 
+@app.on_event("startup")
+async def startup_redis():
+    # Verificar la conexión a Redis (el caché se desactiva si no responde)
+    await get_redis_client().ping()
+
+@app.on_event("shutdown")
+async def shutdown_executors():
+    # Cerrar los pools de hilos de scraping, clasificación y LLM
+    get_stage_executors().shutdown()
+    # Cerrar las conexiones keep-alive con Hugging Face
+    await close_bert_classifier()
+    # Cerrar las conexiones keep-alive con Play Store
+    await close_playstore_client()
+    # Cerrar el pool de conexiones de Redis
+    await get_redis_client().close()
+
 @app.get("/")
 async def root():
     return {"message": "Bienvenido a la API"}
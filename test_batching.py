@@ -0,0 +1,218 @@
+"""
+Pruebas del tamaño de lote adaptativo (AdaptiveBatcher), de la división de
+lotes ante sobrecarga del endpoint y del micro-batching (MicroBatcher).
+
+El endpoint de Hugging Face se reemplaza por una consulta asíncrona falsa,
+así que no se necesita HF_TOKEN ni red.
+
+Uso:
+    python -m pytest -q test_batching.py
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.adaptive_batcher import AdaptiveBatcher, estimate_tokens
+from app.services.bert_classifier_service import BERTClassifier
+from app.services.micro_batcher import MicroBatcher
+
+ENDPOINT = "https://endpoint.test/binary"
+
+
+def http_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", ENDPOINT)
+    return httpx.HTTPStatusError(f"HTTP {status}", request=request, response=httpx.Response(status, request=request))
+
+
+class FakeEndpoint:
+    """Consulta falsa: rechaza lotes grandes (413) y falla con los textos marcados."""
+
+    def __init__(self, max_texts: int = 1000, failing=(), status: int = 503):
+        self.max_texts = max_texts
+        self.failing = set(failing)
+        self.status = status
+        self.calls = []
+
+    async def __call__(self, endpoint_url: str, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(0)
+        if len(texts) > self.max_texts:
+            raise http_error(413)
+        if self.failing & set(texts):
+            if self.status == 0:
+                raise httpx.ReadTimeout("timeout")
+            raise http_error(self.status)
+        return [{"label": f"label-{text}", "score": 0.9} for text in texts]
+
+
+def classifier(endpoint: FakeEndpoint, batcher: AdaptiveBatcher) -> BERTClassifier:
+    """BERTClassifier sin __init__ (sin HF_TOKEN ni modelos) con la consulta falsa."""
+    instance = BERTClassifier.__new__(BERTClassifier)
+    instance._batchers = {ENDPOINT: batcher}
+    instance._query_hf_endpoint = endpoint
+    return instance
+
+
+# --- AdaptiveBatcher ---
+
+def test_crece_como_maximo_al_doble_y_hasta_max_size():
+    batcher = AdaptiveBatcher(initial_size=8, min_size=4, max_size=64, target_latency=2.0)
+    tamanos = [batcher.batch_size]
+    for _ in range(20):
+        # Endpoint muy rápido: el tamaño deseado es muy superior a max_size
+        batcher.record_success(batcher.batch_size, batcher.batch_size * 50, 0.01)
+        tamanos.append(batcher.batch_size)
+    assert all(b <= 2 * a for a, b in zip(tamanos, tamanos[1:]))
+    assert tamanos[-1] == 64 and max(tamanos) == 64
+
+
+def test_converge_a_la_latencia_objetivo():
+    batcher = AdaptiveBatcher(initial_size=8, min_size=1, max_size=512, target_latency=2.0)
+    for _ in range(40):
+        tokens = batcher.batch_size * 50
+        batcher.record_success(batcher.batch_size, tokens, tokens * 0.001)
+    # 0.001 s/token y 50 tokens por texto: 2 s / 0.05 s = 40 textos
+    assert 36 <= batcher.batch_size <= 44
+
+
+def test_se_reduce_a_la_mitad_sin_bajar_de_min_size():
+    batcher = AdaptiveBatcher(initial_size=64, min_size=4, max_size=128)
+    tamanos = []
+    for _ in range(6):
+        batcher.record_failure(batcher.batch_size)
+        tamanos.append(batcher.batch_size)
+    assert tamanos == [32, 16, 8, 4, 4, 4]
+    assert batcher.get_stats()["fallos"] == 6
+
+
+def test_413_fija_un_techo():
+    batcher = AdaptiveBatcher(initial_size=64, min_size=4, max_size=128)
+    batcher.record_failure(64, payload_too_large=True)
+    assert batcher.batch_size == 32
+    for _ in range(20):
+        batcher.record_success(batcher.batch_size, batcher.batch_size * 50, 0.01)
+    assert batcher.batch_size == 48  # 3/4 del lote rechazado
+
+
+def test_take_respeta_max_tokens_y_toma_al_menos_uno():
+    batcher = AdaptiveBatcher(initial_size=32, min_size=1, max_size=32, max_tokens=100)
+    textos = ["x" * 120] * 10  # 32 tokens estimados cada uno
+    assert estimate_tokens(textos[0]) == 32
+    assert batcher.take(textos) == 3
+    assert batcher.take(["x" * 4000]) == 1
+    assert batcher.take([]) == 0
+
+
+# --- División de lotes ante sobrecarga ---
+
+def test_413_divide_el_lote_y_conserva_el_orden():
+    endpoint = FakeEndpoint(max_texts=4)
+    batcher = AdaptiveBatcher(initial_size=32, min_size=1, max_size=32)
+    textos = [str(i) for i in range(13)]
+    resultados = asyncio.run(classifier(endpoint, batcher)._query_with_split(ENDPOINT, textos))
+    assert [r["label"] for r in resultados] == [f"label-{t}" for t in textos]
+    assert [len(lote) for lote in endpoint.calls] == [13, 6, 3, 3, 7, 3, 4]
+    assert batcher.get_stats()["fallos"] == 3
+    assert batcher._ceiling == 4  # 3/4 del menor lote rechazado (6)
+
+
+@pytest.mark.parametrize("status", [500, 503, 0])
+def test_5xx_y_timeout_aislan_el_comentario_que_falla(status):
+    endpoint = FakeEndpoint(failing={"5"}, status=status)
+    batcher = AdaptiveBatcher(initial_size=8, min_size=1, max_size=8)
+    textos = [str(i) for i in range(8)]
+    resultados = asyncio.run(classifier(endpoint, batcher)._query_with_split(ENDPOINT, textos))
+    assert resultados[5] is None
+    assert [r["label"] for i, r in enumerate(resultados) if i != 5] == [f"label-{t}" for t in textos if t != "5"]
+    assert batcher.get_stats()["batch_size"] == 1
+
+
+def test_error_del_cliente_no_divide():
+    endpoint = FakeEndpoint(failing={"1"}, status=400)
+    batcher = AdaptiveBatcher(initial_size=8, min_size=1, max_size=8)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(classifier(endpoint, batcher)._query_with_split(ENDPOINT, ["0", "1", "2"]))
+    assert len(endpoint.calls) == 1 and batcher.get_stats()["fallos"] == 0
+
+
+# --- MicroBatcher ---
+
+def test_cada_llamada_recibe_su_resultado():
+    lotes = []
+
+    async def process(items):
+        lotes.append(list(items))
+        await asyncio.sleep(0.001 * (len(lotes) % 3))
+        return [item * 10 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(process, max_batch_size=8, max_wait=0.005)
+
+        async def llamada(i):
+            await asyncio.sleep(0.0005 * (i % 7))
+            return i, await batcher.submit(i)
+
+        return await asyncio.gather(*(llamada(i) for i in range(50))), batcher.get_stats()
+
+    resultados, stats = asyncio.run(run())
+    assert all(resultado == i * 10 for i, resultado in resultados)
+    assert sorted(item for lote in lotes for item in lote) == list(range(50))
+    assert all(len(lote) <= 8 for lote in lotes)
+    assert stats["comentarios"] == 50 and stats["lotes"] == len(lotes)
+
+
+def test_lote_lleno_se_envia_sin_esperar():
+    async def process(items):
+        return items
+
+    async def run():
+        batcher = MicroBatcher(process, max_batch_size=4, max_wait=60)
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(8))), 1)
+
+    assert asyncio.run(run()) == list(range(8))
+
+
+def test_excepcion_solo_en_las_llamadas_de_su_lote():
+    async def process(items):
+        if "malo" in items:
+            raise RuntimeError("lote fallido")
+        return [f"ok-{item}" for item in items]
+
+    async def run():
+        batcher = MicroBatcher(process, max_batch_size=2, max_wait=60)
+        return await asyncio.gather(
+            batcher.submit("a"), batcher.submit("malo"),
+            batcher.submit("b"), batcher.submit("c"),
+            return_exceptions=True
+        )
+
+    a, malo, b, c = asyncio.run(run())
+    assert isinstance(a, RuntimeError) and isinstance(malo, RuntimeError)
+    assert (b, c) == ("ok-b", "ok-c")
+
+
+def test_llamada_cancelada_no_afecta_al_resto():
+    async def process(items):
+        await asyncio.sleep(0.01)
+        return [item.upper() for item in items]
+
+    async def run():
+        batcher = MicroBatcher(process, max_batch_size=10, max_wait=0.001)
+        cancelada = asyncio.ensure_future(batcher.submit("x"))
+        otras = [asyncio.ensure_future(batcher.submit(t)) for t in ("y", "z")]
+        await asyncio.sleep(0.005)
+        cancelada.cancel()
+        return await asyncio.gather(*otras), cancelada.cancelled()
+
+    resultados, cancelada = asyncio.run(run())
+    assert resultados == ["Y", "Z"] and cancelada
+
+
+def test_nuevo_event_loop():
+    async def process(items):
+        return items
+
+    batcher = MicroBatcher(process, max_batch_size=4, max_wait=0.001)
+    assert asyncio.run(batcher.submit(1)) == 1
+    assert asyncio.run(batcher.submit(2)) == 2
@@ -0,0 +1,109 @@
+"""
+Pruebas del codec de valores de caché (CacheCodec en app/core/redis_client.py).
+
+Las combinaciones con msgpack, zstandard o lz4 se omiten si la dependencia
+opcional no está instalada; el respaldo cuando faltan se prueba quitándolas
+del módulo.
+
+Uso:
+    python -m pytest -q test_cache_codec.py
+"""
+import json
+
+import pytest
+
+from app.core import redis_client
+from app.core.redis_client import CacheCodec
+
+VALOR = {
+    "categoria": "integridad",
+    "confianza": 0.9731,
+    "comentario": "La app se cierra al pagar 💳 y pierdo el carrito",
+    "etiquetas": ["pago", "cierre", None, True],
+    "total": 3,
+}
+VALOR_GRANDE = [dict(VALOR, total=i) for i in range(200)]
+
+DISPONIBLES = {
+    "msgpack": redis_client.msgpack is not None,
+    "zstd": redis_client.zstandard is not None,
+    "lz4": redis_client.lz4 is not None,
+}
+
+
+@pytest.mark.parametrize("serializer", ["json", "msgpack"])
+@pytest.mark.parametrize("compression", ["none", "zlib", "zstd", "lz4"])
+def test_ida_y_vuelta(serializer, compression):
+    faltantes = [n for n in (serializer, compression) if not DISPONIBLES.get(n, True)]
+    if faltantes:
+        pytest.skip(f"{', '.join(faltantes)} no instalado")
+    codec = CacheCodec(serializer, compression, min_compress_size=64)
+    assert codec.name == f"{serializer}+{compression}"
+
+    for valor in (VALOR, VALOR_GRANDE, [], "texto", 42, None):
+        codificado = codec.encode(valor)
+        assert codificado[0] & 0x80
+        assert codec.decode(codificado) == valor
+        # Cualquier otro codec decodifica la entrada (la cabecera indica el formato)
+        assert CacheCodec("json", "none").decode(codificado) == valor
+
+
+def test_valores_pequenos_sin_comprimir():
+    codec = CacheCodec("json", "zlib", min_compress_size=1024)
+    assert codec.encode(VALOR)[0] & 0x03 == redis_client.COMPRESSION_NONE
+    assert codec.encode(VALOR_GRANDE)[0] & 0x03 == redis_client.COMPRESSION_ZLIB
+    assert len(codec.encode(VALOR_GRANDE)) < len(json.dumps(VALOR_GRANDE))
+
+
+def test_entradas_json_anteriores():
+    """Las entradas guardadas como JSON plano antes del codec se siguen leyendo."""
+    codec = CacheCodec("json", "zlib")
+    texto = json.dumps(VALOR, ensure_ascii=False)
+    assert codec.decode(texto) == VALOR
+    assert codec.decode(texto.encode("utf-8")) == VALOR
+    assert codec.decode(json.dumps([1, 2])) == [1, 2]
+    assert codec.decode(b'"texto"') == "texto"
+
+
+def test_version_desconocida():
+    cabecera = 0x80 | (5 << 4) | (redis_client.SERIALIZER_JSON << 2)
+    with pytest.raises(ValueError):
+        CacheCodec().decode(bytes([cabecera]) + b"{}")
+
+
+def test_from_name():
+    assert CacheCodec.from_name("json").name == "json+none"
+    assert CacheCodec.from_name("JSON+ZLIB").name == "json+zlib"
+
+
+@pytest.mark.parametrize("modulo,nombre,esperado", [
+    ("msgpack", "msgpack+zlib", "json+zlib"),
+    ("zstandard", "json+zstd", "json+zlib"),
+    ("lz4", "json+lz4", "json+zlib"),
+])
+def test_respaldo_sin_dependencia(monkeypatch, modulo, nombre, esperado):
+    monkeypatch.setattr(redis_client, modulo, None)
+    codec = CacheCodec.from_name(nombre, min_compress_size=0)
+    assert codec.name == esperado
+    assert codec.decode(codec.encode(VALOR_GRANDE)) == VALOR_GRANDE
+
+
+def test_codec_por_defecto_sin_dependencias(monkeypatch):
+    monkeypatch.setattr(redis_client, "msgpack", None)
+    monkeypatch.setattr(redis_client, "zstandard", None)
+    assert redis_client._default_codec_name() == "json+zlib"
+
+
+@pytest.mark.parametrize("modulo,nombre", [
+    ("msgpack", "msgpack+none"),
+    ("zstandard", "json+zstd"),
+    ("lz4", "json+lz4"),
+])
+def test_entrada_de_dependencia_ausente(monkeypatch, modulo, nombre):
+    """Una entrada escrita con una dependencia que ya no está da ValueError (se trata como fallo de caché)."""
+    if getattr(redis_client, modulo) is None:
+        pytest.skip(f"{modulo} no instalado")
+    codificado = CacheCodec.from_name(nombre, min_compress_size=0).encode(VALOR)
+    monkeypatch.setattr(redis_client, modulo, None)
+    with pytest.raises(ValueError):
+        CacheCodec("json", "zlib").decode(codificado)
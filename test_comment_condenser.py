@@ -0,0 +1,106 @@
+"""
+Pruebas de la condensación de comentarios (comment_condenser).
+
+Uso:
+    python -m pytest -q test_comment_condenser.py
+"""
+from app.services.comment_condenser import SIMILARITY_THRESHOLDS, _block_tokens, condense_comments
+
+TEMAS = [
+    "no puedo iniciar sesión con mi cuenta de google",
+    "la aplicación se cierra al abrir el carrito de compras",
+    "el pago con tarjeta de crédito siempre es rechazado",
+    "las notificaciones llegan con horas de retraso",
+    "la app consume demasiada batería en segundo plano",
+    "los mapas no cargan cuando uso datos móviles",
+]
+
+
+def comentario(texto: str, categoria: str = "fiabilidad", confianza: float = 0.8, calificacion: int = 1) -> dict:
+    return {"comentario": texto, "categoria": categoria, "confianza": confianza, "calificacion": calificacion}
+
+
+def casi_identicos(tema: str, n: int, categoria: str = "fiabilidad") -> list:
+    """Variaciones mínimas de un mismo comentario."""
+    variantes = ["", " otra vez", " desde ayer", " ayuda", " por favor"]
+    return [comentario(tema + variantes[i % len(variantes)], categoria, 0.6 + 0.1 * (i % 3), 1 + i % 2) for i in range(n)]
+
+
+def total(grupos: list) -> int:
+    return sum(g["cantidad"] for g in grupos)
+
+
+def test_sin_condensar_si_cabe():
+    items = [comentario(t) for t in TEMAS]
+    grupos, stats = condense_comments(items, token_budget=10_000)
+    assert [g["comentario"] for g in grupos] == TEMAS
+    assert all(g["cantidad"] == 1 for g in grupos)
+    assert stats["umbral"] is None and stats["grupos"] == len(TEMAS) and stats["omitidos"] == 0
+
+
+def test_agrupa_casi_identicos_con_el_umbral_mas_estricto():
+    items = [c for tema in TEMAS for c in casi_identicos(tema, 10)]
+    # Presupuesto para un grupo por tema, pero no para todos los comentarios
+    grupos, stats = condense_comments(items, token_budget=_block_tokens([comentario(t) for t in TEMAS]) + 60)
+    assert len(grupos) == len(TEMAS)
+    assert stats["umbral"] in SIMILARITY_THRESHOLDS[:3]
+    assert all(g["cantidad"] == 10 for g in grupos)
+    assert sorted(g["comentario"].split(" otra")[0].split(" desde")[0].split(" ayuda")[0].split(" por favor")[0]
+                  for g in grupos) == sorted(TEMAS)
+
+
+def test_temas_distintos_no_se_mezclan():
+    items = [c for tema in TEMAS for c in casi_identicos(tema, 4)]
+    for presupuesto in (_block_tokens(items) - 1, _block_tokens([comentario(t) for t in TEMAS]) + 60):
+        grupos, stats = condense_comments(items, token_budget=presupuesto)
+        # Ningún grupo reúne comentarios de dos temas
+        assert all(g["cantidad"] <= 4 for g in grupos)
+        assert {t for t in TEMAS for g in grupos if g["comentario"].startswith(t)} == set(TEMAS)
+        assert total(grupos) == len(items) and stats["omitidos"] == 0
+
+
+def test_no_agrupa_entre_categorias():
+    items = casi_identicos(TEMAS[0], 6, "seguridad") + casi_identicos(TEMAS[0], 4, "usabilidad")
+    grupos, stats = condense_comments(items, token_budget=_block_tokens(items) // 2)
+    assert sorted((g["categoria"], g["cantidad"]) for g in grupos) == [("seguridad", 6), ("usabilidad", 4)]
+    assert total(grupos) + stats["omitidos"] == stats["comentarios"] == 10
+
+
+def test_promedios_del_grupo():
+    items = [comentario(TEMAS[0], confianza=0.6, calificacion=1), comentario(TEMAS[0], confianza=0.9, calificacion=2)]
+    grupos, _ = condense_comments(items * 10, token_budget=_block_tokens(items))
+    assert len(grupos) == 1 and grupos[0]["cantidad"] == 20
+    assert abs(grupos[0]["confianza"] - 0.75) < 1e-9 and grupos[0]["calificacion"] == 1.5
+
+
+def test_cantidades_se_conservan_en_cada_umbral():
+    items = [comentario(f"{tema} {extra}") for tema in TEMAS for extra in ("", "hoy", "en android", "tras actualizar")]
+    for presupuesto in (_block_tokens(items) // d for d in (2, 3, 4, 6, 10)):
+        grupos, stats = condense_comments(items, token_budget=presupuesto)
+        assert total(grupos) + stats["omitidos"] == len(items), presupuesto
+        assert stats["grupos"] == len(grupos)
+
+
+def test_desborde_conserva_una_categoria_cada_una():
+    """Sin espacio para todo, la categoría pequeña conserva su mayor grupo."""
+    grande = [comentario(f"{tema} número {i} {'x' * 40}", "fiabilidad") for i, tema in enumerate(TEMAS * 8)]
+    pequena = [comentario("los datos de mi perfil aparecen en otra cuenta", "confidencialidad")] * 2
+    items = grande + pequena
+    presupuesto = _block_tokens(grande[:3])
+    grupos, stats = condense_comments(items, token_budget=presupuesto)
+
+    categorias = {g["categoria"] for g in grupos}
+    assert categorias == {"fiabilidad", "confidencialidad"}
+    confidencialidad = [g for g in grupos if g["categoria"] == "confidencialidad"]
+    assert len(confidencialidad) == 1 and confidencialidad[0]["cantidad"] == 2
+    assert stats["omitidos"] > 0
+    assert total(grupos) + stats["omitidos"] == len(items)
+    assert stats["tokens_estimados"] == _block_tokens(grupos) <= presupuesto
+
+
+def test_desborde_con_presupuesto_minimo():
+    """Aunque el presupuesto no alcance ni para un grupo, cada categoría conserva uno."""
+    items = [comentario(t, c) for t in TEMAS for c in ("fiabilidad", "seguridad", "usabilidad")]
+    grupos, stats = condense_comments(items, token_budget=1)
+    assert sorted(g["categoria"] for g in grupos) == ["fiabilidad", "seguridad", "usabilidad"]
+    assert total(grupos) + stats["omitidos"] == len(items)
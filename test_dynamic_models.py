@@ -1,6 +1,7 @@
 """
 Script de prueba para verificar la selección dinámica de modelos multiclase.
 """
+import asyncio
 import sys
 import io
 
@@ -43,7 +44,7 @@ def test_beto_model():
         print(f"  {i}. {comment}")
 
     print("\nClasificando con BETO...")
-    results = classifier.classify_multiclass(test_comments, model_name="beto")
+    results = asyncio.run(classifier.classify_multiclass(test_comments, model_name="beto"))
 
     print("\nResultados:")
     for comment, (category, confidence) in zip(test_comments, results):
@@ -69,7 +70,7 @@ def test_robertuito_model():
         print(f"  {i}. {comment}")
 
     print("\nClasificando con Robertuito...")
-    results = classifier.classify_multiclass(test_comments, model_name="robertuito")
+    results = asyncio.run(classifier.classify_multiclass(test_comments, model_name="robertuito"))
 
     print("\nResultados:")
     for comment, (category, confidence) in zip(test_comments, results):
@@ -91,12 +92,12 @@ def test_model_comparison():
 
     # Clasificar con BETO
     print("\nClasificando con BETO...")
-    beto_result = classifier.classify_multiclass([test_comment], model_name="beto")
+    beto_result = asyncio.run(classifier.classify_multiclass([test_comment], model_name="beto"))
     beto_category, beto_confidence = beto_result[0]
 
     # Clasificar con Robertuito
     print("Clasificando con Robertuito...")
-    robertuito_result = classifier.classify_multiclass([test_comment], model_name="robertuito")
+    robertuito_result = asyncio.run(classifier.classify_multiclass([test_comment], model_name="robertuito"))
     robertuito_category, robertuito_confidence = robertuito_result[0]
 
     print("\nComparacion de resultados:")
@@ -129,7 +130,7 @@ def test_default_model():
     print("Clasificando sin especificar modelo (usa el modelo por defecto)...")
 
     # No especificar modelo (debería usar BETO por defecto)
-    result = classifier.classify_multiclass([test_comment])
+    result = asyncio.run(classifier.classify_multiclass([test_comment]))
     category, confidence = result[0]
 
     print(f"\nResultado: [{category.upper()}] ({confidence:.2%})")
@@ -1,6 +1,7 @@
 """
 Script de prueba para verificar la integración con Hugging Face endpoints.
 """
+import asyncio
 import sys
 import io
 
@@ -31,7 +32,7 @@ def test_binary_classification():
         print(f"  {i}. {comment}")
 
     print("\nClasificando...")
-    results = classifier.classify_binary(test_comments)
+    results = asyncio.run(classifier.classify_binary(test_comments))
 
     print("\nResultados:")
     for comment, is_relevant in zip(test_comments, results):
@@ -61,7 +62,7 @@ def test_multiclass_classification():
         print(f"  {i}. {comment}")
 
     print("\nClasificando...")
-    results = classifier.classify_multiclass(test_comments)
+    results = asyncio.run(classifier.classify_multiclass(test_comments))
 
     print("\nResultados:")
     for comment, (category, confidence) in zip(test_comments, results):
@@ -91,7 +92,7 @@ def test_full_pipeline():
         print(f"  {i}. [{review['calificacion']} estrellas] {review['comentario']}")
 
     print("\nProcesando pipeline completo...")
-    results = classifier.filter_and_classify(test_reviews)
+    results = asyncio.run(classifier.filter_and_classify(test_reviews))
 
     print(f"\nTotal de reviews: {len(test_reviews)}")
     print(f"Reviews relevantes: {len(results)}")
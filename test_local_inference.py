@@ -0,0 +1,74 @@
+"""
+Pruebas de la correspondencia de etiquetas del backend local (LocalOnnxClassifier)
+y de la generación de caché de cada backend.
+
+No necesitan onnxruntime ni transformers: solo se prueba la lectura de
+config.json.
+
+Uso:
+    python -m pytest -q test_local_inference.py
+"""
+import json
+
+import pytest
+
+from app.core import model_config
+from app.core.model_config import InferenceBackend, get_local_model_config, get_model_generation
+from app.services.local_inference_service import LocalOnnxClassifier
+
+ETIQUETAS = ["relevante", "no_relevante"]
+
+
+def escribir_config(path, id2label):
+    (path / "config.json").write_text(json.dumps({"id2label": id2label}), encoding="utf-8")
+
+
+def test_etiquetas_de_config_json(tmp_path):
+    escribir_config(tmp_path, {"0": "no_relevante", "1": "relevante"})
+    assert LocalOnnxClassifier._load_id2label(str(tmp_path), ETIQUETAS) == {0: "no_relevante", 1: "relevante"}
+
+
+def test_etiquetas_genericas_sin_id2label_explicito(tmp_path):
+    escribir_config(tmp_path, {"0": "LABEL_0", "1": "LABEL_1"})
+    with pytest.raises(ValueError, match="id2label"):
+        LocalOnnxClassifier._load_id2label(str(tmp_path), ETIQUETAS)
+
+
+def test_sin_config_json(tmp_path):
+    with pytest.raises(ValueError):
+        LocalOnnxClassifier._load_id2label(str(tmp_path), ETIQUETAS)
+
+
+def test_id2label_explicito(tmp_path):
+    escribir_config(tmp_path, {"0": "LABEL_0", "1": "LABEL_1"})
+    explicito = {1: "relevante", 0: "no_relevante"}
+    assert LocalOnnxClassifier._load_id2label(str(tmp_path), ETIQUETAS, explicito) == {0: "no_relevante", 1: "relevante"}
+    # Claves como texto (p. ej. leídas de JSON)
+    assert LocalOnnxClassifier._load_id2label(str(tmp_path), ETIQUETAS, {"0": "relevante", "1": "no_relevante"}) == {
+        0: "relevante", 1: "no_relevante"
+    }
+
+
+def test_etiquetas_distintas_al_registro(tmp_path):
+    escribir_config(tmp_path, {"0": "positivo", "1": "negativo"})
+    with pytest.raises(ValueError, match="MODEL_REGISTRY"):
+        LocalOnnxClassifier._load_id2label(str(tmp_path), ETIQUETAS)
+
+
+def test_max_length_igual_al_endpoint_remoto():
+    assert get_local_model_config("binary")["max_length"] == 512
+    assert get_local_model_config("beto")["max_length"] == 512
+
+
+def test_generacion_distinta_por_backend(monkeypatch):
+    monkeypatch.setattr(model_config, "_active_backends", {})
+    monkeypatch.setenv("BETO_BACKEND", "remote")
+    remota = get_model_generation("beto")
+    monkeypatch.setenv("BETO_BACKEND", "local")
+    local = get_model_generation("beto")
+    assert remota != local
+    assert remota.split(".")[0] == local.split(".")[0]  # misma cache_version
+
+    # Si el modelo local no se pudo cargar, se sirve (y se guarda) como remoto
+    model_config.set_active_backend("beto", InferenceBackend.REMOTE)
+    assert get_model_generation("beto") == remota
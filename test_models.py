@@ -1,6 +1,7 @@
 """
 Script de prueba para verificar la carga y funcionamiento de los modelos BERT
 """
+import asyncio
 from app.services.bert_classifier_service import BERTClassifier
 
 def test_models():
@@ -31,7 +32,7 @@ def test_models():
         print(f"\n{'='*80}")
         print("📊 PASO 1: CLASIFICACIÓN BINARIA")
         print("="*80)
-        binary_results = classifier.classify_binary(test_comments)
+        binary_results = asyncio.run(classifier.classify_binary(test_comments))
 
         for comment, is_relevant in zip(test_comments, binary_results):
             status = "✅ RELEVANTE" if is_relevant else "❌ NO RELEVANTE"
@@ -48,7 +49,7 @@ def test_models():
             print(f"\n{'='*80}")
             print("📊 PASO 2: CLASIFICACIÓN MULTICLASE")
             print("="*80)
-            multiclass_results = classifier.classify_multiclass(relevant_comments)
+            multiclass_results = asyncio.run(classifier.classify_multiclass(relevant_comments))
 
             for comment, (category, confidence) in zip(relevant_comments, multiclass_results):
                 print(f"\n📌 {category.upper()} (confianza: {confidence:.2%})")
@@ -70,7 +71,7 @@ def test_models():
             for i, comment in enumerate(test_comments, 1)
         ]
 
-        classified_reviews = classifier.filter_and_classify(test_reviews)
+        classified_reviews = asyncio.run(classifier.filter_and_classify(test_reviews))
 
         print(f"\n📈 RESULTADOS:")
         print(f"  Total de comentarios: {len(test_reviews)}")
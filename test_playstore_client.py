@@ -0,0 +1,169 @@
+"""
+Pruebas del cliente nativo de Play Store (playstore_client).
+
+Comparan el cuerpo de la petición con el de google_play_scraper y analizan
+una respuesta batchexecute grabada, sin salir a internet.
+
+Uso:
+    python -m pytest -q test_playstore_client.py
+"""
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import httpx
+from google_play_scraper.constants.element import ElementSpecs
+from google_play_scraper.constants.request import Formats
+
+from app.services.playstore_client import (
+    BatchExecuteParser,
+    PlayStoreNotFoundError,
+    PlayStoreReviewsClient,
+    ReviewsContinuationToken,
+    build_reviews_body,
+    parse_reviews_payload,
+)
+
+# Respuesta grabada del RPC oCPfdb (dos comentarios y token de la página siguiente)
+RESPUESTA_GRABADA = r""")]}'
+
+[["wrb.fr","oCPfdb","[[[\"gp:AOqpTOFmAVORqfWGcaqfF39ftwFjGkjecjvcP6fi\",[\"Ana Pérez\",[null,2,[96,96],[null,null,\"https://play-lh.googleusercontent.com/a/ACg8ocK\"]]],1,null,\"No puedo iniciar sesión desde la última \\\"actualización\\\"\",[1717236000,123000000],3,[null,\"Hola Ana, ya lo estamos revisando\",[1717322400,0]],null,\"4.2.0\",null,null,null,null,null,null,null,null,null,null,null,\"4.2.0\"],[\"gp:AOqpTOH2pLkDqk3a0yBqXcP5cZ1x8wJ0a9cGQ2lm\",[\"Luis\",[null,2,[96,96],[null,null,\"https://play-lh.googleusercontent.com/a/ACg8ocL\"]]],2,null,\"Se cierra sola\",[1717149600,0],0,null,null,null]],null,[null,\"CpEBAUqz1tB7p2yR-_x\"],null]",null,null,null,"generic"],["di",61],["af.httprm",60,"-6424484281423441591",12]]"""
+
+# Última página: Play Store devuelve una lista en lugar del token
+RESPUESTA_ULTIMA_PAGINA = r""")]}'
+
+[["wrb.fr","oCPfdb","[[[\"gp:AOqpTOE3\",[\"Eva\",[null,2]],5,null,\"Bien\",[1717000000,0],1]],null,[null,[]],null]",null,null,null,"generic"],["di",40]]"""
+
+# Página vacía (la aplicación no tiene más comentarios)
+RESPUESTA_VACIA = r""")]}'
+
+[["wrb.fr","oCPfdb","[null,null,[null,null],null]",null,null,null,"generic"],["di",35]]"""
+
+
+def sobres(texto: str, tamano: int) -> list:
+    parser = BatchExecuteParser()
+    resultado = []
+    for i in range(0, len(texto), tamano):
+        resultado.extend(parser.feed(texto[i:i + tamano]))
+    return resultado
+
+
+def test_cuerpo_igual_a_google_play_scraper():
+    casos = [
+        ("com.whatsapp", 2, 199, None, None, None),
+        ("com.whatsapp", 2, 100, None, None, "CpEBAUqz1tB7p2yR-_x"),
+        ("com.bcp.bank.bcp", 1, 50, 1, None, None),
+        ("com.bcp.bank.bcp", 3, 199, 2, 1, "CpEBAUqz1tB7p2yR-_x"),
+    ]
+    for app_id, sort, count, score, device, token in casos:
+        esperado = Formats.Reviews.build_body(app_id, sort, count, score, device, token)
+        assert build_reviews_body(app_id, sort, count, score, device, token).encode() == esperado
+
+
+def test_prefijo_xssi_en_cualquier_corte():
+    for tamano in (1, 2, 3, 5, 64, len(RESPUESTA_GRABADA)):
+        recibidos = sobres(RESPUESTA_GRABADA, tamano)
+        assert [s[0] for s in recibidos] == ["wrb.fr", "di", "af.httprm"], tamano
+        assert recibidos[0][1] == "oCPfdb"
+
+
+def test_formato_por_fragmentos():
+    """Formato rt=c: cada array va precedido de una línea con su longitud."""
+    sobre = json.dumps([["wrb.fr", "oCPfdb", "[null,null,[null,null]]", None, None, None, "generic"]])
+    texto = ")]}'\n" + f"{len(sobre)}\n{sobre}\n" + "25\n[[\"di\",35],[\"e\",4,null]]\n"
+    recibidos = sobres(texto, 7)
+    assert [s[0] for s in recibidos] == ["wrb.fr", "di", "e"]
+
+
+def test_payload_grabado():
+    payload = sobres(RESPUESTA_GRABADA, 4096)[0][2]
+    reviews, token = parse_reviews_payload(payload)
+    assert token == "CpEBAUqz1tB7p2yR-_x"
+    assert [r["reviewId"] for r in reviews] == [
+        "gp:AOqpTOFmAVORqfWGcaqfF39ftwFjGkjecjvcP6fi", "gp:AOqpTOH2pLkDqk3a0yBqXcP5cZ1x8wJ0a9cGQ2lm"
+    ]
+    ana, luis = reviews
+    assert ana["content"] == 'No puedo iniciar sesión desde la última "actualización"'
+    assert ana["at"] == datetime(2024, 6, 1, 10, 0, tzinfo=timezone.utc)
+    assert ana["repliedAt"] == datetime(2024, 6, 2, 10, 0, tzinfo=timezone.utc)
+    assert luis["replyContent"] is None and luis["repliedAt"] is None
+
+    # Mismos campos que google_play_scraper (salvo las fechas, que aquí son UTC)
+    item = json.loads(payload)[0][0]
+    for campo in ("reviewId", "userName", "userImage", "content", "score",
+                  "thumbsUpCount", "reviewCreatedVersion", "replyContent", "appVersion"):
+        assert ana[campo] == ElementSpecs.Review[campo].extract_content(item), campo
+    assert ana["at"].timestamp() == ElementSpecs.Review["at"].extract_content(item).timestamp()
+
+
+def test_ultima_pagina_con_token_lista():
+    reviews, token = parse_reviews_payload(sobres(RESPUESTA_ULTIMA_PAGINA, 4096)[0][2])
+    assert [r["reviewId"] for r in reviews] == ["gp:AOqpTOE3"]
+    assert token is None
+
+
+def test_pagina_vacia():
+    assert parse_reviews_payload(sobres(RESPUESTA_VACIA, 4096)[0][2]) == ([], None)
+    assert parse_reviews_payload("[]") == ([], None)
+
+
+def test_cliente_pagina_con_transporte_falso():
+    peticiones = []
+    respuestas = [RESPUESTA_GRABADA, RESPUESTA_ULTIMA_PAGINA]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        peticiones.append(request)
+        return httpx.Response(200, text=respuestas[len(peticiones) - 1])
+
+    async def run():
+        client = PlayStoreReviewsClient(base_url="http://playstore.test", transport=httpx.MockTransport(handler))
+        try:
+            primera, token = await client.reviews("com.whatsapp", lang="es", country="pe", count=2)
+            segunda, fin = await client.reviews("com.whatsapp", continuation_token=token)
+            vacia, _ = await client.reviews("com.whatsapp", continuation_token=fin)
+        finally:
+            await client.aclose()
+        return primera, token, segunda, fin, vacia
+
+    primera, token, segunda, fin, vacia = asyncio.run(run())
+    assert len(primera) == 2 and token.token == "CpEBAUqz1tB7p2yR-_x"
+    assert len(segunda) == 1 and fin.token is None
+    assert vacia == [] and len(peticiones) == 2
+    assert peticiones[0].url.params["hl"] == "es" and peticiones[0].url.params["gl"] == "pe"
+    assert peticiones[1].content == Formats.Reviews.build_body("com.whatsapp", 2, 2, None, None, "CpEBAUqz1tB7p2yR-_x")
+
+
+def test_app_inexistente():
+    async def run():
+        client = PlayStoreReviewsClient(
+            base_url="http://playstore.test",
+            transport=httpx.MockTransport(lambda request: httpx.Response(404))
+        )
+        try:
+            await client.reviews("com.no.existe")
+        finally:
+            await client.aclose()
+
+    try:
+        asyncio.run(run())
+    except PlayStoreNotFoundError as e:
+        assert e.code == 404
+        return
+    raise AssertionError("Se esperaba PlayStoreNotFoundError")
+
+
+def test_token_final_no_hace_peticiones():
+    async def run():
+        client = PlayStoreReviewsClient(transport=httpx.MockTransport(lambda request: httpx.Response(500)))
+        fin = ReviewsContinuationToken(None, "es", "pe", 2, 100)
+        return await client.reviews("com.whatsapp", continuation_token=fin)
+
+    reviews, token = asyncio.run(run())
+    assert reviews == [] and token.token is None
+
+
+if __name__ == "__main__":
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("test_") and callable(prueba):
+            prueba()
+            print(f"[OK] {nombre}")
@@ -2,11 +2,17 @@
 Script para probar la conexión a Redis y las funcionalidades de caché.
 """
 from app.core.redis_client import get_redis_client
+import asyncio
 import json
 
 
 def test_redis_connection():
     """Prueba la conexión a Redis."""
+    return asyncio.run(_check_redis_connection())
+
+
+async def _check_redis_connection():
+    """Verifica disponibilidad, escritura, lectura y limpieza en Redis."""
     print("="*60)
     print("PRUEBA DE CONEXIÓN A REDIS")
     print("="*60)
@@ -14,7 +20,7 @@ def test_redis_connection():
     redis_client = get_redis_client()
 
     # 1. Verificar disponibilidad
-    if redis_client.is_available():
+    if await redis_client.ping():
         print("[OK] Redis esta disponible y conectado")
     else:
         print("[ERROR] Redis NO esta disponible")
@@ -36,7 +42,7 @@ def test_redis_connection():
         "data": [1, 2, 3, 4, 5]
     }
     print(f"\n[WRITE] Guardando en cache...")
-    success = redis_client.set_cached(cache_key, test_value, ttl=60)
+    success = await redis_client.set_cached(cache_key, test_value, ttl=60)
     if success:
         print("[OK] Datos guardados exitosamente")
     else:
@@ -45,7 +51,7 @@ def test_redis_connection():
 
     # 4. Probar lectura
     print(f"\n[READ] Leyendo desde cache...")
-    cached_data = redis_client.get_cached(cache_key)
+    cached_data = await redis_client.get_cached(cache_key)
     if cached_data:
         print("[OK] Datos recuperados exitosamente:")
         print(f"   {json.dumps(cached_data, indent=2)}")
@@ -64,13 +70,13 @@ def test_redis_connection():
     print(f"\n{'='*60}")
     print("ESTADÍSTICAS DE REDIS")
     print("="*60)
-    stats = redis_client.get_stats()
+    stats = await redis_client.get_stats()
     for key, value in stats.items():
         print(f"   {key}: {value}")
 
     # 7. Limpiar datos de prueba
     print(f"\n[CLEANUP] Limpiando datos de prueba...")
-    redis_client.delete_cached(cache_key)
+    await redis_client.delete_cached(cache_key)
 
     print(f"\n{'='*60}")
     print("[SUCCESS] TODAS LAS PRUEBAS PASARON")
@@ -0,0 +1,165 @@
+"""
+Pruebas del análisis incremental de la respuesta del LLM (RequirementsStreamParser).
+
+No necesitan OpenRouter: se alimenta al parser con respuestas simuladas
+partidas en fragmentos arbitrarios.
+
+Uso:
+    python -m pytest -q test_requirements_stream_parser.py
+"""
+import json
+import os
+import random
+
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+
+from app.services.openrouter_service import RequirementsStreamParser
+
+
+def requisito(i: int, categoria: str = "autenticidad") -> dict:
+    """Requisito válido con llaves, corchetes, comillas y barras dentro de las cadenas."""
+    return {
+        "id": f"NFR-{i:03d}",
+        "categoria": categoria,
+        "requisito": f"El servicio \"{i}\" deberá responder {{en}} [2] s \\ sin errores",
+        "prioridad": ["Alta", "Media", "Baja"][i % 3],
+        "justificacion": "Usuarios reportan } y ] en los mensajes",
+        "criterios_aceptacion": ["El servicio deberá responder", "Con \"comillas\" y ]"],
+        "comentarios_relacionados": i
+    }
+
+
+def respuesta(n: int = 5) -> str:
+    data = {"requisitos": [requisito(i) for i in range(1, n + 1)], "resumen": {"total_requisitos": n}}
+    return "```json\n" + json.dumps(data, ensure_ascii=False, indent=2) + "\n```"
+
+
+def alimentar(parser: RequirementsStreamParser, texto: str, tamanos) -> list:
+    emitidos, i = [], 0
+    for tamano in tamanos:
+        emitidos += parser.feed(texto[i:i + tamano])
+        i += tamano
+    emitidos += parser.feed(texto[i:])
+    return emitidos
+
+
+def ids(requisitos: list) -> list:
+    return [r["id"] for r in requisitos]
+
+
+def test_fragmentos_aleatorios():
+    """Los requisitos se emiten completos sin importar dónde se corten los fragmentos."""
+    texto = respuesta()
+    rng = random.Random(7)
+    for _ in range(200):
+        parser = RequirementsStreamParser()
+        emitidos = alimentar(parser, texto, [rng.randint(1, 30) for _ in range(len(texto))])
+        assert ids(emitidos) == [f"NFR-{i:03d}" for i in range(1, 6)]
+        resultado = parser.result()
+        assert resultado["resumen"]["total_requisitos"] == 5
+        assert "error" not in resultado
+
+
+def test_corte_en_cada_posicion():
+    """Dos fragmentos cortados en cada posición posible (dentro de cadenas y escapes)."""
+    texto = json.dumps({"requisitos": [requisito(1), requisito(2)]})
+    for corte in range(len(texto) + 1):
+        parser = RequirementsStreamParser()
+        emitidos = parser.feed(texto[:corte]) + parser.feed(texto[corte:])
+        assert ids(emitidos) == ["NFR-001", "NFR-002"], corte
+        assert emitidos[0]["requisito"] == requisito(1)["requisito"]
+
+
+def test_emite_en_cuanto_cierra_el_objeto():
+    texto = json.dumps({"requisitos": [requisito(1), requisito(2)]})
+    fin_primero = texto.index("}", texto.index('"comentarios_relacionados"')) + 1
+    parser = RequirementsStreamParser()
+    assert parser.feed(texto[:fin_primero - 1]) == []
+    assert ids(parser.feed(texto[fin_primero - 1:fin_primero])) == ["NFR-001"]
+
+
+def test_respuesta_truncada_conserva_requisitos_completos():
+    texto = respuesta(5)
+    corte = texto.index('"NFR-004"') + 20
+    parser = RequirementsStreamParser()
+    emitidos = parser.feed(texto[:corte])
+    parser.finish_reason = "length"
+    resultado = parser.result()
+    assert ids(emitidos) == ["NFR-001", "NFR-002", "NFR-003"]
+    assert resultado["resumen"]["total_requisitos"] == 3
+    assert "finish_reason=length" in resultado["error"]
+
+
+def test_truncada_sin_requisitos_lanza_error_de_json():
+    parser = RequirementsStreamParser()
+    parser.feed('{"requisitos": [{"id": "NFR-0')
+    try:
+        parser.result()
+    except json.JSONDecodeError:
+        return
+    raise AssertionError("Se esperaba JSONDecodeError")
+
+
+def test_texto_previo_con_llaves():
+    texto = "Aquí está {el} JSON: " + json.dumps({"requisitos": [requisito(1), requisito(2)]})
+    parser = RequirementsStreamParser()
+    emitidos = alimentar(parser, texto, [5] * 200)
+    assert ids(emitidos) == ["NFR-001", "NFR-002"]
+    assert "error" not in parser.result()
+
+
+def test_arreglo_en_la_raiz():
+    texto = json.dumps([requisito(1), requisito(2), requisito(3)])
+    parser = RequirementsStreamParser()
+    emitidos = alimentar(parser, texto, [7] * 200)
+    assert ids(emitidos) == ["NFR-001", "NFR-002", "NFR-003"]
+    assert parser.result()["resumen"]["total_requisitos"] == 3
+
+
+def test_clave_requisitos_anidada():
+    """Acepta "requisitos" dentro de otro objeto e ignora claves homónimas dentro de un requisito."""
+    interno = dict(requisito(2), detalle={"requisitos": [{"id": "x"}]})
+    texto = json.dumps({"resultado": {"requisitos": [requisito(1), interno]}, "resumen": {}})
+    parser = RequirementsStreamParser()
+    emitidos = alimentar(parser, texto, [3] * 1000)
+    assert ids(emitidos) == ["NFR-001", "NFR-002"]
+    assert parser.invalidos == 0
+
+
+def test_requisito_invalido_se_descarta():
+    texto = json.dumps({"requisitos": [requisito(1), {"id": "NFR-002"}, requisito(3)]})
+    parser = RequirementsStreamParser()
+    emitidos = parser.feed(texto)
+    assert ids(emitidos) == ["NFR-001", "NFR-003"]
+    assert parser.invalidos == 1
+
+
+def test_categoria_por_defecto():
+    sin_categoria = {k: v for k, v in requisito(1).items() if k != "categoria"}
+    parser = RequirementsStreamParser(categoria="integridad")
+    emitidos = parser.feed(json.dumps({"requisitos": [sin_categoria]}))
+    assert emitidos[0]["categoria"] == "integridad"
+
+
+def test_respaldo_analiza_el_texto_completo():
+    """Un corchete sin cerrar antes del JSON confunde al análisis incremental; el respaldo lo recupera."""
+    texto = "Respuesta [ver abajo:\n" + json.dumps({"requisitos": [requisito(1), requisito(2)]})
+    parser = RequirementsStreamParser()
+    assert alimentar(parser, texto, [11] * 200) == []
+    resultado = parser.result()
+    assert ids(resultado["requisitos"]) == ["NFR-001", "NFR-002"]
+    assert resultado["resumen"]["total_requisitos"] == 2
+
+
+def test_lista_vacia_no_es_error():
+    parser = RequirementsStreamParser()
+    parser.feed('```json\n{"requisitos": [], "resumen": {}}\n```')
+    resultado = parser.result()
+    assert resultado["requisitos"] == [] and resultado["resumen"]["total_requisitos"] == 0
+
+
+if __name__ == "__main__":
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("test_") and callable(prueba):
+            prueba()
+            print(f"[OK] {nombre}")
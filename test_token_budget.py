@@ -0,0 +1,121 @@
+"""
+Pruebas del presupuesto de tokens de los prompts (token_budget).
+
+Uso:
+    python -m pytest -q test_token_budget.py
+"""
+from app.services import token_budget
+from app.services.token_budget import (
+    CONSERVATIVE_CONTEXT_WINDOW, completion_budget, context_window, count_tokens, fit_prompt_to_budget
+)
+
+CABECERA = "Instrucciones del prompt para generar requisitos no funcionales. " * 20
+
+
+def grupo(i: int, categoria: str, cantidad: int = 1, confianza: float = 0.8) -> dict:
+    return {
+        "comentario": f"comentario {i} sobre {categoria}: la aplicación falla al guardar los cambios del perfil",
+        "categoria": categoria,
+        "confianza": confianza,
+        "cantidad": cantidad,
+    }
+
+
+class Render:
+    """Prompt de prueba: cabecera, una línea por grupo y nota de omitidos."""
+
+    def __init__(self, nota_por_omitido: str = ""):
+        self.llamadas = []
+        self.nota_por_omitido = nota_por_omitido
+
+    def __call__(self, grupos, omitidos: int) -> str:
+        self.llamadas.append((len(grupos), omitidos))
+        lineas = [f"[{g['categoria']}] {g['comentario']} (x{g['cantidad']})" for g in grupos]
+        nota = f"\n({omitidos} comentarios omitidos) " + self.nota_por_omitido * omitidos if omitidos else ""
+        return CABECERA + "\n" + "\n".join(lineas) + nota
+
+
+def grupos_de_prueba() -> list:
+    grupos = [grupo(i, "fiabilidad", cantidad=1 + i % 4, confianza=0.5 + i / 100) for i in range(40)]
+    grupos += [grupo(100 + i, "seguridad", cantidad=2) for i in range(10)]
+    grupos += [grupo(200, "portabilidad", cantidad=1)]
+    return grupos
+
+
+def test_sin_recorte_si_cabe():
+    grupos = grupos_de_prueba()
+    render = Render()
+    prompt, conservados, omitidos, tokens = fit_prompt_to_budget(grupos, render, max_prompt_tokens=10**6)
+    assert conservados is grupos and omitidos == 0
+    assert tokens == count_tokens(prompt) and render.llamadas == [(len(grupos), 0)]
+
+
+def test_recorte_cabe_y_conserva_orden_y_categorias():
+    grupos = grupos_de_prueba()
+    render = Render()
+    completo = count_tokens(render(grupos, 0))
+    base = count_tokens(render([], 0))
+    presupuesto = base + (completo - base) // 3
+
+    prompt, conservados, omitidos, tokens = fit_prompt_to_budget(grupos, render, presupuesto)
+    assert tokens == count_tokens(prompt) <= presupuesto
+    assert {g["categoria"] for g in conservados} == {"fiabilidad", "seguridad", "portabilidad"}
+    # Se mantiene el orden original
+    posiciones = [grupos.index(g) for g in conservados]
+    assert posiciones == sorted(posiciones)
+    # Dentro de cada categoría se conservan los grupos más numerosos
+    fiabilidad = [g for g in conservados if g["categoria"] == "fiabilidad"]
+    descartados = [g for g in grupos if g["categoria"] == "fiabilidad" and g not in fiabilidad]
+    assert min(g["cantidad"] for g in fiabilidad) >= max(g["cantidad"] for g in descartados)
+
+
+def test_omitidos_cuenta_comentarios_y_no_grupos():
+    grupos = grupos_de_prueba()
+    render = Render()
+    base = count_tokens(render([], 0))
+    _, conservados, omitidos, _ = fit_prompt_to_budget(grupos, render, base + 200)
+    total = sum(g["cantidad"] for g in grupos)
+    assert omitidos == total - sum(g["cantidad"] for g in conservados)
+    assert omitidos > len(grupos) - len(conservados)
+    # El prompt final informa los mismos omitidos
+    assert render.llamadas[-1] == (len(conservados), omitidos)
+
+
+def test_minimo_un_grupo_por_categoria():
+    """Aunque el presupuesto no alcance ni para la cabecera, cada categoría conserva un grupo."""
+    grupos = grupos_de_prueba()
+    prompt, conservados, omitidos, tokens = fit_prompt_to_budget(grupos, Render(), max_prompt_tokens=10)
+    assert sorted(g["categoria"] for g in conservados) == ["fiabilidad", "portabilidad", "seguridad"]
+    assert tokens > 10
+    assert omitidos == sum(g["cantidad"] for g in grupos) - sum(g["cantidad"] for g in conservados)
+
+
+def test_limite_de_rondas():
+    """La nota de omitidos crece al recortar: el recorte no converge y se detiene en max_rounds."""
+    grupos = grupos_de_prueba()
+    base = count_tokens(Render()([], 0))
+
+    render = Render(nota_por_omitido="omitido ")
+    _, conservados, _, tokens = fit_prompt_to_budget(grupos, render, base + 150, max_rounds=1)
+    # Prompt completo + prompt sin comentarios + una ronda
+    assert len(render.llamadas) == 3 and tokens > base + 150
+    assert len(conservados) > 3
+
+    # Con más rondas se llega al mínimo de un grupo por categoría y se para
+    render = Render(nota_por_omitido="omitido ")
+    _, conservados, _, tokens = fit_prompt_to_budget(grupos, render, base + 150, max_rounds=8)
+    assert len(conservados) == 3 and len(render.llamadas) < 2 + 8
+    assert tokens > base + 150
+
+
+def test_ventana_de_contexto_por_modelo(monkeypatch):
+    monkeypatch.setitem(token_budget.DEFAULT_TOKEN_BUDGET_CONFIG, "context_window", None)
+    assert context_window("x-ai/grok-4-fast") == 2000000
+    assert context_window("modelo/desconocido") == CONSERVATIVE_CONTEXT_WINDOW
+    assert completion_budget(1000, 16000, "modelo/desconocido") == 16000
+    assert completion_budget(CONSERVATIVE_CONTEXT_WINDOW - 2000, 16000, "modelo/desconocido") == 2000 - token_budget.CONTEXT_MARGIN
+    assert completion_budget(CONSERVATIVE_CONTEXT_WINDOW + 5000, 16000, "modelo/desconocido") == 1
+
+    monkeypatch.setitem(token_budget.DEFAULT_TOKEN_BUDGET_CONFIG, "context_window", 8000)
+    assert context_window("x-ai/grok-4-fast") == 8000
+    assert completion_budget(7000, 16000, "x-ai/grok-4-fast") == 1000 - token_budget.CONTEXT_MARGIN